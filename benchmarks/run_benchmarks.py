@@ -0,0 +1,333 @@
+'''
+Benchmarks of brian2docs on synthetic brian2 networks.
+
+Every scenario builds and runs a Network of the given size, writes a synthetic brian2 log,
+and documents the network with generate_tex_file, or with create_NN_pdf and --latex, in a folder
+of its own. The stages are timed by an instrument.Profile, the same way as with the profile
+argument of create_NN_pdf:
+
+    generate_log_dict, generate_network_graph, every generate_*_latex function (summed over
+    the objects of its kind), generate_constant_list, render_figures, generate_tex_file, create_pdf
+
+The results are written as json, so that the numbers of two versions can be compared with --compare.
+create_pdf is only run with --latex, the other stages do not need a TeX installation.
+
+Examples:
+
+    python benchmarks/run_benchmarks.py --preset small --preset medium -o bench.json
+    python benchmarks/run_benchmarks.py --preset small --sweep n_groups=1,10,100 --memory
+    python benchmarks/run_benchmarks.py --preset small --latex --compare bench.json
+'''
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+PRESETS = {
+    'small': {
+        'n_groups': 2,  # NeuronGroups
+        'group_size': 100,  # neurons per NeuronGroup
+        'n_subgroups': 1,  # Subgroups per NeuronGroup, used as sources and targets of synapses and monitors
+        'n_synapses': 2,  # Synapses objects
+        'connections': 1000,  # connections of every Synapses object
+        'n_state_monitors': 2,
+        'n_spike_monitors': 1,
+        'recorded': 5,  # neurons recorded by every StateMonitor
+        'duration': 100.,  # ms, length of the recordings
+        'n_poisson': 1,  # PoissonInputs
+        'n_regularly': 1,  # run_regularly CodeRunners
+        'log_bytes': 10 ** 6,  # size of the synthetic log
+    },
+    'medium': {
+        'n_groups': 10,
+        'group_size': 1000,
+        'n_subgroups': 2,
+        'n_synapses': 10,
+        'connections': 20000,
+        'n_state_monitors': 10,
+        'n_spike_monitors': 5,
+        'recorded': 20,
+        'duration': 500.,
+        'n_poisson': 5,
+        'n_regularly': 5,
+        'log_bytes': 10 ** 7,
+    },
+    'large': {
+        'n_groups': 50,
+        'group_size': 5000,
+        'n_subgroups': 4,
+        'n_synapses': 50,
+        'connections': 200000,
+        'n_state_monitors': 20,
+        'n_spike_monitors': 20,
+        'recorded': 50,
+        'duration': 1000.,
+        'n_poisson': 20,
+        'n_regularly': 20,
+        'log_bytes': 10 ** 8,
+    },
+}
+
+
+def build_network(params, seed=0):
+    '''
+    build and run a Network with the sizes given in params
+    '''
+    from brian2 import (start_scope, prefs, defaultclock, Network, NeuronGroup, Synapses, StateMonitor,
+                        SpikeMonitor, PoissonInput, ms, Hz)
+    prefs.codegen.target = 'numpy'
+    start_scope()
+    defaultclock.dt = 0.1 * ms
+    rng = np.random.RandomState(seed)
+    net = Network()
+
+    groups = []
+    sources = []
+    for i in range(params['n_groups']):
+        group = NeuronGroup(params['group_size'], '''dv/dt = (I - v)/tau : 1
+                                                     I : 1
+                                                     tau : second (constant)''',
+                            threshold='v > 1', reset='v = 0', refractory=2 * ms, method='exact',
+                            name='group_%d' % i)
+        group.I = 'rand() * 2'
+        group.tau = 10 * ms
+        net.add(group)
+        groups.append(group)
+        sources.append(group)
+        size = max(1, params['group_size'] // (params['n_subgroups'] + 1))
+        for k in range(params['n_subgroups']):
+            sources.append(group[k * size:(k + 1) * size])
+
+    for i in range(params['n_synapses']):
+        source = sources[rng.randint(len(sources))]
+        target = sources[rng.randint(len(sources))]
+        syn = Synapses(source, target, 'w : 1', on_pre='v_post += w', name='synapses_%d' % i)
+        n = params['connections']
+        syn.connect(i=rng.randint(len(source), size=n), j=rng.randint(len(target), size=n))
+        syn.w = 'rand() * 0.1'
+        net.add(syn)
+
+    for i in range(params['n_state_monitors']):
+        source = sources[i % len(sources)]
+        net.add(StateMonitor(source, 'v', record=list(range(min(params['recorded'], len(source)))),
+                             name='statemonitor_%d' % i))
+    for i in range(params['n_spike_monitors']):
+        net.add(SpikeMonitor(sources[i % len(sources)], name='spikemonitor_%d' % i))
+    for i in range(params['n_poisson']):
+        net.add(PoissonInput(groups[i % len(groups)], 'v', 10, 5 * Hz, weight=0.05))
+    for i in range(params['n_regularly']):
+        net.add(groups[i % len(groups)].run_regularly('v = v * 0.99', dt=1 * ms, name='regularly_%d' % i))
+
+    net.run(params['duration'] * ms)
+    return net
+
+
+def write_log(path, params, log_bytes):
+    '''
+    write a log in the format of the brian2 diagnostic log, with assignments to the groups
+    interleaved with unrelated lines, until it is log_bytes long
+    '''
+    names = ['group_%d' % i for i in range(max(1, params['n_groups']))]
+    stamp = '2020-01-01 00:00:00,000 DIAGNOSTIC '
+    written = 0
+    n = 0
+    with open(path, 'w') as f:
+        while written < log_bytes:
+            name = names[n % len(names)]
+            text = (stamp + 'brian2.codegen.codeobject: Creating code object (group=%s, template name='
+                    'group_variable_set_conditional) for abstract code:\n'
+                    '    Key condition:\n'
+                    '        _cond = True\n'
+                    '    Key statement:\n'
+                    '        I = %d * 0.001 + rand()\n' % (name, n) +
+                    stamp + 'brian2.devices.device: %s_group_variable_set_conditional_codeobject abstract code:\n'
+                    '    _cond = True\n'
+                    '    I = %d * 0.001 + rand()\n' % (name, n) +
+                    stamp + 'brian2.codegen.generators.base: Variable I is modified, writing it back\n')
+            f.write(text)
+            written += len(text)
+            n += 1
+    return written
+
+
+def run_scenario(name, params, workdir, latex=False, memory=False, figure_workers=None):
+    '''
+    build the network of a scenario and document it in workdir, the stages are timed by an instrument.Profile
+    '''
+    from brian2 import Synapses, ms, mV
+    import brian2docs.brian2docs as bd
+    from brian2docs.instrument import Profile, max_rss
+
+    bd.configure_latex_memo()
+    start = time.perf_counter()
+    net = build_network(params)
+    build_seconds = time.perf_counter() - start
+    log = os.path.join(workdir, 'brian_debug.log')
+    log_bytes = write_log(log, params, params['log_bytes'])
+    constants = {'tau': 10 * ms, 'v_th': 1 * mV, 'n_groups': params['n_groups']}
+
+    if memory:
+        tracemalloc.reset_peak()
+    error = None
+    with Profile() as profile:
+        try:
+            if latex:
+                bd.create_NN_pdf(net, name, constants, log, figure_workers, root=workdir)
+            else:
+                bd.generate_tex_file(net, os.path.join(workdir, 'tmp', name + '.tex'), constants,
+                                     bd.generate_log_dict(log), name, figure_workers, root=workdir)
+        except Exception as e:
+            # e.g. the graphviz executables or latex are not installed, the stages run so far are reported
+            error = '%s: %s' % (type(e).__name__, e)
+
+    stages = {'build_network': {'seconds': build_seconds, 'cpu_seconds': None, 'calls': 1, 'output_bytes': None,
+                                'max_rss_bytes': None}}
+    for stage, total in profile.stages().items():
+        stages[stage] = {'seconds': total['wall_seconds'], 'cpu_seconds': total['cpu_seconds'],
+                         'calls': total['calls'], 'output_bytes': total['output_bytes'],
+                         'max_rss_bytes': total['max_rss_bytes']}
+    tmp = os.path.join(workdir, 'tmp')
+    # the files of the figures, without the network graph
+    figures = [f for f in (os.listdir(tmp) if os.path.exists(tmp) else [])
+               if os.path.splitext(f)[1] in ('.png', '.pdf') and f != name + '.pdf']
+    return {'name': name,
+            'params': params,
+            'network': {'objects': len(net.objects),
+                        'connections': int(sum(len(obj) for obj in net.objects if isinstance(obj, Synapses))),
+                        'figures': len(figures),
+                        'log_bytes': log_bytes,
+                        'tex_bytes': _size(os.path.join(workdir, 'tmp', name + '.tex'))},
+            'stages': stages,
+            'error': error,
+            'max_rss_bytes': max_rss(),
+            'peak_bytes': tracemalloc.get_traced_memory()[1] if memory else None,
+            # the stages called from another stage are included in its time
+            'seconds': sum(event['wall_seconds'] for event in profile.events if event['depth'] == 0)}
+
+
+def _size(path):
+    return os.path.getsize(path) if os.path.exists(path) else None
+
+
+def _environment():
+    def version(module):
+        try:
+            return __import__(module).__version__
+        except Exception:
+            return None
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=root,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        commit = None
+    return {'commit': commit, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'platform': platform.platform(), 'brian2': version('brian2'), 'numpy': version('numpy'),
+            'matplotlib': version('matplotlib'), 'sympy': version('sympy')}
+
+
+def _value(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def scenarios(presets, settings, sweeps):
+    '''
+    (name, params) of every combination of preset and swept value
+    '''
+    for preset in presets:
+        params = dict(PRESETS[preset])
+        for key, value in settings:
+            if key not in params:
+                raise SystemExit('unknown parameter ' + key)
+            params[key] = value
+        combinations = [(preset, params)]
+        for key, values in sweeps:
+            if key not in params:
+                raise SystemExit('unknown parameter ' + key)
+            combinations = [('%s_%s=%s' % (name, key, value), dict(p, **{key: value}))
+                            for name, p in combinations for value in values]
+        for name, params in combinations:
+            yield name, params
+
+
+def compare(old, new):
+    '''
+    print the time of every stage in both reports and their ratio
+    '''
+    old_scenarios = dict((s['name'], s) for s in old['scenarios'])
+    for scenario in new['scenarios']:
+        previous = old_scenarios.get(scenario['name'])
+        if previous is None:
+            continue
+        print('%s (%s -> %s)' % (scenario['name'], old['environment']['commit'], new['environment']['commit']))
+        for stage, result in sorted(scenario['stages'].items()):
+            if stage not in previous['stages']:
+                continue
+            before = previous['stages'][stage]['seconds']
+            ratio = result['seconds'] / before if before else float('nan')
+            print('    %-28s %10.4f s %10.4f s  x%.2f' % (stage, before, result['seconds'], ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmarks of brian2docs on synthetic networks')
+    parser.add_argument('--preset', action='append', choices=sorted(PRESETS),
+                        help='size of the networks, can be given several times (default: small)')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='change a parameter of the presets, e.g. n_groups=20')
+    parser.add_argument('--sweep', action='append', default=[], metavar='KEY=V1,V2,...',
+                        help='one scenario for every value of a parameter')
+    parser.add_argument('--latex', action='store_true', help='also time create_pdf, needs a TeX installation')
+    parser.add_argument('--memory', action='store_true',
+                        help='record the peak memory allocated by python while the network is documented '
+                             '(slows the stages down)')
+    parser.add_argument('--figure-workers', type=int, help='number of processes drawing the figures')
+    parser.add_argument('--workdir', help='folder of the generated files, by default a temporary folder')
+    parser.add_argument('-o', '--output', default='benchmark.json', help='json file of the results')
+    parser.add_argument('--compare', metavar='JSON', help='results of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    settings = [(key, _value(value)) for key, value in (s.split('=', 1) for s in args.set)]
+    sweeps = [(key, [_value(v) for v in values.split(',')]) for key, values in (s.split('=', 1) for s in args.sweep)]
+    report = {'environment': _environment(), 'latex': args.latex, 'memory': args.memory, 'scenarios': []}
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='brian2docs_bench_')
+    if args.memory:
+        tracemalloc.start()
+    try:
+        for name, params in scenarios(args.preset or ['small'], settings, sweeps):
+            folder = os.path.join(workdir, name)
+            if os.path.exists(folder):
+                shutil.rmtree(folder)
+            os.makedirs(folder)
+            print('%s ...' % name, end=' ', flush=True)
+            result = run_scenario(name, params, folder, args.latex, args.memory, args.figure_workers)
+            print('%.2f s' % result['seconds'] + (' (stopped by %s)' % result['error'] if result['error'] else ''))
+            report['scenarios'].append(result)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,3 @@
+__version__ = '1.0.0'
+
 from .brian2docs import create_NN_pdf
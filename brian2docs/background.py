@@ -0,0 +1,225 @@
+'''
+Documentation in a background process, so that a script can go on with the simulation, e.g.
+
+>>> job = document_in_background(net, 'phase1')
+>>> run(10*second)  # the document is built meanwhile
+>>> print(job.progress())
+>>> pdf = job.result()
+
+The network is described (see snapshot.describe_network) when the job is started, so the document
+shows the state of the network at that moment even if the simulation goes on. The log is copied
+for the same reason. The job runs create_NN_pdf in a worker process and reports the finished
+stages back through a queue. In a coroutine the job can be awaited:
+
+>>> pdf = await document_in_background(net, 'phase1')
+'''
+import os
+import queue
+import shutil
+import signal
+import time
+import asyncio
+import traceback
+import multiprocessing
+from concurrent.futures import CancelledError, TimeoutError
+
+from .instrument import add_tracer
+from .snapshot import describe_network, load_snapshot
+
+
+class DocumentationError(RuntimeError):
+    '''
+    raised by DocumentJob.result when the document could not be built
+    '''
+
+
+def _run(snapshot, name, constant_dict, log, root, options, events):
+    from .brian2docs import create_NN_pdf
+
+    if hasattr(os, 'setsid'):
+        # own process group, so that cancel also stops the figure workers and latex
+        os.setsid()
+
+    def tracer(event):
+        if event['depth'] == 0 or event['object'] is not None:
+            events.put(('stage', event['stage'], event['object']))
+
+    add_tracer(tracer)
+    try:
+        result = create_NN_pdf(snapshot, name, constant_dict, log, root=root, **options)
+        events.put(('done', result))
+    except BaseException:
+        events.put(('error', traceback.format_exc()))
+
+
+class DocumentJob(object):
+    '''
+    handle of a document built by document_in_background
+    '''
+
+    def __init__(self, process, events, name, root, n_objects):
+        self.name = name
+        self.root = root
+        self.pdf = os.path.join(root, 'pdf', name + '.pdf')
+        self.latex = None  # result of create_pdf, once the job is done
+        self.error = None  # traceback of a failed job
+        self._process = process
+        self._events = events
+        self._state = 'running'
+        self._stage = None
+        self._objects = set()
+        self._n_objects = n_objects
+
+    def _handle(self, message):
+        if message[0] == 'stage':
+            self._stage = message[1]
+            if message[2] is not None:
+                self._objects.add(message[2])
+        elif message[0] == 'done':
+            self.latex = message[1]
+            if self.latex['returncode'] == 0 and os.path.exists(self.pdf):
+                self._state = 'finished'
+            else:
+                self._state = 'failed'
+                self.error = 'latex failed with exit status %s, see %s' % (self.latex['returncode'],
+                                                                          self.latex['log'])
+        else:
+            self._state = 'failed'
+            self.error = message[1]
+
+    def _poll(self, timeout=0):
+        '''
+        handle the messages of the worker until it is done, or for at most timeout seconds
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        while self._state == 'running':
+            remaining = None if deadline is None else deadline - time.time()
+            try:
+                self._handle(self._events.get(timeout=0.5 if remaining is None else min(max(remaining, 0), 0.5)))
+            except queue.Empty:
+                if not self._process.is_alive():
+                    # the worker can send its last message and exit after get timed out
+                    self._drain()
+                    if self._state == 'running':
+                        self._state = 'failed'
+                        self.error = 'the worker process exited with code %s' % self._process.exitcode
+                elif remaining is not None and remaining <= 0:
+                    return
+        self._process.join()
+
+    def _drain(self):
+        '''
+        handle the messages left in the queue by a worker that has exited
+        '''
+        while True:
+            try:
+                self._handle(self._events.get(block=False))
+            except queue.Empty:
+                return
+
+    def running(self):
+        self._poll(0)
+        return self._state == 'running'
+
+    def done(self):
+        return not self.running()
+
+    def cancelled(self):
+        return self._state == 'cancelled'
+
+    def progress(self):
+        '''
+        dict with the 'state' of the job ('running', 'finished', 'failed' or 'cancelled'), the last
+        finished 'stage', and the number of documented objects ('objects_done', 'objects_total').
+        Objects taken from the cache are not counted.
+        '''
+        self._poll(0)
+        return {'state': self._state, 'stage': self._stage, 'objects_done': len(self._objects),
+                'objects_total': self._n_objects}
+
+    def cancel(self):
+        '''
+        stop the worker process, returns False if the job was already done
+        '''
+        if self.done():
+            return False
+        try:
+            os.killpg(self._process.pid, signal.SIGTERM)
+        except (AttributeError, OSError):
+            self._process.terminate()
+        self._process.join()
+        self._state = 'cancelled'
+        return True
+
+    def result(self, timeout=None):
+        '''
+        wait for the job and return the path of the pdf.
+        Raises DocumentationError if the job failed, CancelledError if it was cancelled
+        and TimeoutError if it is not done after timeout seconds.
+        '''
+        self._poll(timeout)
+        if self._state == 'running':
+            raise TimeoutError()
+        if self._state == 'cancelled':
+            raise CancelledError()
+        if self._state == 'failed':
+            raise DocumentationError('%s could not be documented:\n%s' % (self.name, self.error))
+        return self.pdf
+
+    async def wait(self, interval=0.2):
+        '''
+        result() for coroutines, the job is checked every interval seconds.
+        Cancelling the awaiting task cancels the job.
+        '''
+        try:
+            while self.running():
+                await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+        return self.result()
+
+    def __await__(self):
+        return self.wait().__await__()
+
+
+def document_in_background(net, name='net', constant_dict=None, BrianLogger_tmp_log=None, root=None,
+                           data_directory=None, **options):
+    '''
+    Start documenting a Network in a worker process and return its DocumentJob.
+
+    Parameters:
+    -----------
+    net: 'Network'
+        the Network, a snapshot of it, or the path of a saved snapshot. It is described before this
+        function returns, later changes of the network are not documented.
+    name, constant_dict, BrianLogger_tmp_log:
+        see create_NN_pdf. The log is copied to <root>/tmp/<name>_brian.log.
+    root: str, optional
+        folder in which 'tmp' and 'pdf' are created, by default the current directory
+    data_directory: str, optional
+        export the recordings to this folder instead of sending them to the worker, see snapshot.export_data
+    options:
+        further arguments of create_NN_pdf, e.g. cache or figure_workers
+
+    The worker is not a daemon, a script that ends before the job is done waits for it.
+    '''
+    if isinstance(net, str):
+        net = load_snapshot(net)
+    snapshot = describe_network(net, data_directory)
+    root = os.path.abspath(root or '.')
+    if not os.path.exists(os.path.join(root, 'tmp')):
+        os.makedirs(os.path.join(root, 'tmp'))
+    if BrianLogger_tmp_log is not None:
+        log = os.path.join(root, 'tmp', name + '_brian.log')
+        shutil.copyfile(BrianLogger_tmp_log, log)
+        BrianLogger_tmp_log = log
+    if constant_dict is not None:
+        constant_dict = dict(constant_dict)
+
+    events = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run, name='brian2docs-' + name,
+                                      args=(snapshot, name, constant_dict, BrianLogger_tmp_log, root, options,
+                                            events))
+    process.start()
+    return DocumentJob(process, events, name, root, len(snapshot.objects))
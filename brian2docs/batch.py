@@ -0,0 +1,99 @@
+'''
+Documentation of many networks at once, e.g. the variants of a parameter sweep.
+
+Every network is documented in its own folder <root>/<name>, so networks that use the
+same object names (e.g. the default 'neurongroup') do not overwrite each other's figures.
+All jobs share one BuildCache, so identical figures and fragments are only generated once.
+'''
+import os
+import time
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .cache import BuildCache
+from .brian2docs import create_NN_pdf, configure_latex_memo
+from .snapshot import describe_network
+
+
+def _document_one(name, source, root, cache_settings, options):
+    '''
+    document a single network in <root>/<name> and return its entry of the summary
+    '''
+    start = time.time()
+    cache = BuildCache(*cache_settings)
+    if multiprocessing.parent_process() is not None:
+        # rendered equations and constants are shared by all jobs of the batch
+        configure_latex_memo(store=cache)
+    result = {'name': name, 'root': os.path.join(root, name), 'status': 'ok', 'pdf': None, 'latex': None,
+              'error': None}
+    try:
+        constant_dict = options.pop('constant_dict', None)
+        if callable(source):
+            source = source()
+        if isinstance(source, tuple):
+            source, constant_dict = source
+        # the cache is pruned by the parent once all jobs are done, not while other jobs still use it
+        latex = create_NN_pdf(source, name, constant_dict, cache=cache, root=result['root'], prune=False, **options)
+        result['latex'] = latex
+        pdf = os.path.join(result['root'], 'pdf', name + '.pdf')
+        if latex is not None and latex['returncode'] == 0 and os.path.exists(pdf):
+            result['pdf'] = pdf
+        else:
+            result['status'] = 'latex failed'
+    except Exception:
+        result['status'] = 'failed'
+        result['error'] = traceback.format_exc()
+    result['seconds'] = time.time() - start
+    result['cache_hits'] = dict(cache.hits)
+    result['cache_misses'] = dict(cache.misses)
+    return result
+
+
+def document_networks(networks, root='docs', workers=None, cache=None, **options):
+    '''
+    Document several networks concurrently, one worker process per network at a time.
+
+    Parameters:
+    -----------
+    networks: {str: 'Network' or callable}
+        maps the name of each document to a Network, or to a function without arguments that
+        builds the Network. The function may also return a tuple (Network, constant_dict).
+        Functions are called in the worker process, so they have to be picklable (defined at
+        module level). Networks that already exist are sent to the workers as snapshots
+        (see snapshot.describe_network), a snapshot or the path of a saved snapshot can also be given.
+    root: str
+        each network is documented in <root>/<name>, with its own 'tmp' and 'pdf' folders
+    workers: int, optional
+        number of worker processes, by default the number of CPUs
+    cache: BuildCache, optional
+        cache shared by all jobs, by default <root>/cache
+    options:
+        further arguments of create_NN_pdf used for every network, e.g. constant_dict or figure_options
+
+    Returns a list with a dict for every network, in the order of networks, with the keys 'name',
+    'root', 'status' ('ok', 'latex failed' or 'failed'), 'pdf', 'latex' (result of create_pdf),
+    'error' (traceback of a failed job), 'seconds', 'cache_hits' and 'cache_misses'.
+    '''
+    if cache is None:
+        cache = BuildCache(os.path.join(root, 'cache'))
+    cache_settings = (cache.path, cache.max_bytes, cache.max_age)
+    root = os.path.abspath(root)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for name, source in networks.items():
+            if not callable(source) and not isinstance(source, str):
+                source = describe_network(source)
+            pending[name] = pool.submit(_document_one, name, source, root, cache_settings, dict(options))
+        for name, future in pending.items():
+            try:
+                results[name] = future.result()
+            except Exception:
+                # the job could not be sent to the worker, or the worker process died
+                results[name] = {'name': name, 'root': os.path.join(root, name), 'status': 'failed',
+                                 'pdf': None, 'latex': None, 'error': traceback.format_exc()}
+    cache.prune()
+
+    return [results[name] for name in networks]
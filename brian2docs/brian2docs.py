@@ -1,18 +1,19 @@
 import re
-import sympy
+import json
 import os.path
-import subprocess
-from graphviz import Digraph
-from brian2tools import brian_plot
-from matplotlib import pyplot as pp
-from brian2.parsing.sympytools import str_to_sympy
-from jinja2 import Environment, FileSystemLoader
-from brian2 import Synapses, NeuronGroup, SpatialNeuron, CodeRunner, Subgroup, PoissonInput, Quantity, Cylinder, Soma
-from brian2.monitors import SpikeMonitor, StateMonitor, PopulationRateMonitor
 import warnings
-import matplotlib.pyplot as plt
-import re
 from collections import defaultdict
+from . import __version__
+from .cache import digest, Fingerprint, LRUCache
+from .texbuild import build_format, run_latex, split_preamble
+from .instrument import instrumented, file_size, Profile
+from .snapshot import describe_object, load_snapshot
+from .index import index_network, group_log
+from .content import (neuron_group_content, synapses_content, state_monitor_content, spike_monitor_content,
+                      poisson_input_content, code_runner_content, constant_items)
+
+# brian2, sympy, matplotlib, graphviz and jinja2 take seconds to import. They are imported by the
+# functions that need them, so that e.g. generate_log_dict and create_pdf can be used without them.
 
 
 def replace_underscore(x):
@@ -31,22 +32,145 @@ def convert_code_to_latex_listing(code):
     return eqs
 
 
+# rendered latex of equations and expressions, see configure_latex_memo
+_latex_memo = LRUCache(4096)
+_latex_store = None
+
+
+def configure_latex_memo(maxsize=4096, store=None):
+    '''
+    configure the memoization of latex_equations and latex_expression
+
+    maxsize: int
+        number of rendered equations and expressions kept in memory
+    store: BuildCache, optional
+        persistent store, so that equations are rendered once per machine instead of once per process
+    '''
+    global _latex_memo, _latex_store
+    _latex_memo = LRUCache(maxsize)
+    _latex_store = store
+
+
+def _memo_latex(kind, text, render):
+    key = kind + ':' + text
+    latex = _latex_memo.get(key)
+    if latex is not None:
+        return latex
+    if _latex_store is not None:
+        store_key = digest(key)
+        latex = _latex_store.get_text('latex', store_key)
+    if latex is None:
+        latex = render()
+        if _latex_store is not None:
+            _latex_store.put_text('latex', store_key, latex)
+    _latex_memo.put(key, latex)
+    return latex
+
+
+def _normalize(text):
+    return '\n'.join(' '.join(line.split()) for line in text.strip().splitlines())
+
+
+def _equations_key(equations):
+    '''
+    what sympy.latex renders of an Equations object: its equations in the order they were defined
+    (str(equations) sorts them), with their type, expression, unit and flags
+    '''
+    if not hasattr(equations, '_equations'):
+        return _normalize(str(equations))
+    return repr([(eq.type, eq.varname, eq.expr.code if eq.expr is not None else None, str(eq.dim), list(eq.flags))
+                 for eq in equations._equations.values()])
+
+
+@instrumented('latex_equations', obj=False)
+def latex_equations(equations):
+    '''
+    sympy.latex(equations), memoized on the equations, see _equations_key
+    '''
+    import sympy
+    return _memo_latex('equations', _equations_key(equations), lambda: sympy.latex(equations))
+
+
+@instrumented('latex_expression', obj=False)
+def latex_expression(expression):
+    '''
+    latex of a string expression parsed by sympy, memoized on the normalized string
+    '''
+    import sympy
+    from brian2.parsing.sympytools import str_to_sympy
+    expression = _normalize(expression)
+    return _memo_latex('expression', expression, lambda: sympy.latex(str_to_sympy(expression)))
+
+
+def _mathml_text(text):
+    from html import escape
+    return '<mtext>' + escape(text) + '</mtext>'
+
+
+def _render_mathml_equations(equations):
+    # the table of Equations._latex, as presentation MathML
+    import sympy
+    from sympy.printing.mathml import mathml
+    from brian2.equations.equations import DIFFERENTIAL_EQUATION, PARAMETER
+    from brian2.parsing.sympytools import str_to_sympy
+    from brian2.units.fundamentalunits import get_unit
+    rows = []
+    for eq in equations._equations.values():
+        varname = mathml(sympy.Symbol(eq.varname), printer='presentation')
+        if eq.type == DIFFERENTIAL_EQUATION:
+            lhs = ('<mfrac><mrow><mi mathvariant="normal">d</mi>' + varname + '</mrow>'
+                   '<mrow><mi mathvariant="normal">d</mi><mi>t</mi></mrow></mfrac>')
+        else:
+            lhs = varname
+        flags = ', flags: ' + ', '.join(eq.flags) if len(eq.flags) else ''
+        if eq.type == PARAMETER:
+            cells = [lhs, '', '', _mathml_text('(unit: %s%s)' % (get_unit(eq.dim), flags))]
+        else:
+            cells = [lhs, '<mo>=</mo>', mathml(str_to_sympy(eq.expr.code), printer='presentation'),
+                     _mathml_text('(unit of ') + varname + _mathml_text(': %s%s)' % (get_unit(eq.dim), flags))]
+        rows.append('<mtr>' + ''.join('<mtd>' + cell + '</mtd>' for cell in cells) + '</mtr>')
+    return '<mtable columnalign="right center left left">' + ''.join(rows) + '</mtable>'
+
+
+@instrumented('mathml_equations', obj=False)
+def mathml_equations(equations):
+    '''
+    the equations as presentation MathML, laid out like sympy.latex(equations), memoized like latex_equations
+    '''
+    return _memo_latex('mathml-equations', _equations_key(equations), lambda: _render_mathml_equations(equations))
+
+
+@instrumented('mathml_expression', obj=False)
+def mathml_expression(expression):
+    '''
+    presentation MathML of a string expression parsed by sympy, memoized like latex_expression
+    '''
+    from sympy.printing.mathml import mathml
+    from brian2.parsing.sympytools import str_to_sympy
+    expression = _normalize(expression)
+    return _memo_latex('mathml-expression', expression,
+                       lambda: mathml(str_to_sympy(expression), printer='presentation'))
+
+
+@instrumented('generate_PoissonInput_latex')
 def generate_PoissonInput_latex(PI):
+    content = poisson_input_content(PI)
+    PI = content.record
     code = convert_code_to_latex_listing(PI.abstract_code)
 
     PI_string = []
     PI_string.append('\\section{PoissonInput ' + replace_underscore(PI.name) + '}')
     PI_string.append('\\begin{itemize}')
     PI_string.append('\\item \\textbf{target:}')
-    PI_string.append(replace_underscore(PI._group.name))
+    PI_string.append(replace_underscore(PI.group.name))
     PI_string.append('\\item \\textbf{target start and stop:}')
-    PI_string.append('start from ' + str(PI._group.start) + ', stops at ' + str(PI._group.stop))
+    PI_string.append('start from ' + str(PI.group.start) + ', stops at ' + str(PI.group.stop))
     PI_string.append('\\item \\textbf{Target Variable and Weight:}')
     PI_string.append(code)
     PI_string.append('\\item \\textbf{N:}')
     PI_string.append(str(PI.N))
     PI_string.append('\\item \\textbf{Rate:}')
-    PI_string.append('$' + PI.rate.in_best_unit() + '$')
+    PI_string.append('$' + content.rate + '$')
     PI_string.append('\\item \\textbf{When:}')
     PI_string.append(PI.when)
     PI_string.append('\\item \\textbf{Order:}')
@@ -56,15 +180,17 @@ def generate_PoissonInput_latex(PI):
     return '\n'.join(PI_string)
 
 
+@instrumented('generate_CodeRunner_latex')
 def generate_CodeRunner_latex(CR):
     '''
     generate latex code for coderunner object created by 'run_regularly' function of NeuronGroup
     '''
-    code = convert_code_to_latex_listing(CR.abstract_code)
-    dt = CR.clock.dt.in_best_unit()
+    content = code_runner_content(CR)
+    code = convert_code_to_latex_listing(content.record.abstract_code)
+    dt = content.dt
 
     CR_string = []
-    CR_string.append('\\section{run\\texttt{\\_}regularly ' + replace_underscore(CR.name) + '}')
+    CR_string.append('\\section{run\\texttt{\\_}regularly ' + replace_underscore(content.record.name) + '}')
     CR_string.append('\\begin{itemize}')
     CR_string.append('\\item \\textbf{Abstract Code:}')
     CR_string.append(code)
@@ -74,14 +200,24 @@ def generate_CodeRunner_latex(CR):
     return '\n'.join(CR_string)
 
 
-def generate_ng_latex(NG, log_dict):
+@instrumented('generate_ng_latex')
+def generate_ng_latex(NG, log_dict, figure_jobs=None, figure_options=None):
     '''
     NG: NeuronGroup
+    log_dict: the statements of the log (see generate_log_dict), or an index of the network made from them
+        (see index.index_network)
+    figure_jobs: list, optional
+        if given, the morphology graph is queued there instead of being rendered immediately
+    figure_options: dict, optional
+        options of the graphs, see create_NN_pdf
 
     generate a string containing latex format presentation of input NeuronGroup
     '''
+    from brian2 import Quantity
+    content = neuron_group_content(NG, log_dict, figure_jobs, figure_options, '.pdf')
+    NG = content.record
 
-    def add_event_to_text(event):
+    def add_event_to_text(event, condition, statements):
         if event == 'spike':
             event_header = 'Spiking\:Behaviour'
             event_condition = 'Threshold condition'
@@ -90,11 +226,9 @@ def generate_ng_latex(NG, log_dict):
             event_header = 'Event %s' % replace_underscore(event)
             event_condition = 'Event Condition'
             event_code = 'Executed Statement(s)'
-        condition = NG.events[event]
         text.append('\\textbf{%s:}\n\\begin{itemize}' % event_header)
         text.append(r'\item \textit{%s:}' % event_condition)
         text.append('\\begin{lstlisting}\n' + str(condition) + '\n\\end{lstlisting}')
-        statements = NG.event_codes.get(event, None)
         if statements is not None:
             text.append(r'\item \textit{%s:}' % event_code)
             text.append('\\begin{lstlisting}\n' + str(statements) + '\n\\end{lstlisting}')
@@ -106,14 +240,11 @@ def generate_ng_latex(NG, log_dict):
         text.append('\\item\\textbf{Cm:}')
         text.append('$' + NG.Cm[0].in_best_unit() + '$')
         text.append('\\item\\textbf{Ri:}')
-        text.append('$' + str(NG.Ri.variable.get_value()[0]) + '\:' + NG.Ri.unit.latexname + '$')
-
-        if NG.morphology is not None:
-            morpho = NG.morphology
-            pic_path = 'tmp/' + NG.name + '.pdf'
-            plt.close()
-            brian_plot(morpho)
-            pp.savefig(pic_path)
+        text.append('$' + str(NG.Ri[0]) + '\:' + NG.Ri_unit + '$')
+
+        morphology = content.morphology
+        if morphology is not None:
+            flat, table, pic_path = morphology.flat, morphology.table, morphology.figure
             NG_name = replace_underscore(NG.name)
 
             text.append('\\item \\textbf{Morphology:}')
@@ -124,49 +255,39 @@ def generate_ng_latex(NG, log_dict):
             text.append('\\includegraphics[width=\\textwidth]{' + pic_path + '}')
             text.append('\\end{center}')
 
-            text.append('\\item \\textbf{class:}' + type(morpho).__name__)
-            if isinstance(morpho, Cylinder):
-                text.append('\\item \\textbf{diameter:}')
-                text.append('$' + morpho.diameter[0].in_best_unit() + '$')
-                text.append('\\item \\textbf{n:}')
-                text.append(str(morpho.n))
-                text.append('\\item \\textbf{length:}')
-                text.append('${length!r}$'.format(length=sum(morpho._length)))
-            elif isinstance(morpho, Soma):
-                text.append('\\item \\textbf{diameter:}')
-                text.append('$' + morpho.diameter[0].in_best_unit() + '$')
+            text.append('\\item \\textbf{class:}' + NG.morphology['class'])
+            text.append('\\item \\textbf{sections:} %d, \\textbf{compartments:} %d' % (len(flat['n']), flat['n'].sum()))
+            text.append('\\item \\textbf{total length of the neurites:} $%.2f\\,\\mu m$' % (morphology.total_length * 1e6))
+            text.append('\\item \\textbf{total area:} $%.2f\\,\\mu m^2$' % (morphology.total_area * 1e12))
 
             text.append('\\end{itemize}')
+            text.append(generate_morphology_table(flat, table))
 
         return '\n'.join(text)
 
     NG_name = replace_underscore(NG.name)
-    text = ['\n\\section{NeuronGroup %s}\n' % (NG_name), r'NeuronGroup "%s" with %d neurons.\\\\' % (NG_name, NG._N)]
+    text = ['\n\\section{NeuronGroup %s}\n' % (NG_name), r'NeuronGroup "%s" with %d neurons.\\\\' % (NG_name, NG.N)]
     text.append('\\begin{itemize}')
     text.append('\\item')
     text.append(r'\textbf{Model:} \\ ')
-    text.append(sympy.latex(NG.equations))
+    text.append(latex_equations(NG.equations))
 
-    if 'spike' in NG.events:
+    for event in content.events:
         text.append('\\item\n')
-        add_event_to_text('spike')
-    for event in NG.events:
-        if event != 'spike':
-            text.append('\\item\n')
-            add_event_to_text(event)
+        add_event_to_text(*event)
 
     text.append('\\item')
     text.append('\\textbf{Refractory:}\\begin{lstlisting}')
-    if isinstance(NG._refractory, bool):
-        if NG._refractory:
+    if isinstance(NG.refractory, bool):
+        if NG.refractory:
             text.append('True')
         else:
             text.append('False')
-    elif isinstance(NG._refractory, Quantity):
-        text.append(NG._refractory.in_best_unit())
+    elif isinstance(NG.refractory, Quantity):
+        text.append(NG.refractory.in_best_unit())
 
     else:
-        text.append(NG._refractory)
+        text.append(NG.refractory)
     text.append('\\end{lstlisting}')
 
     text.append('\\item')
@@ -178,85 +299,241 @@ def generate_ng_latex(NG, log_dict):
         text.append(NG.method_choice)
     text.append('\\end{lstlisting}')
 
-    if isinstance(NG, SpatialNeuron):
+    if NG.kind == 'SpatialNeuron':
         text.append(generate_SpatialNeuron_latex(NG))
 
-    if log_dict is not None:
-        for key in log_dict:
-            if NG.name in key:  # if there is a subgroup of NG in keys of log_dict
-                code = []
-                for eq in log_dict[key]:
-                    code.append(eq)
-
-                text.append('\\item' + '\\textbf{' + replace_underscore(key) + ':}')
-                text.append(convert_code_to_latex_listing('\n'.join(code)))
+    # statements of NG and of its subgroups
+    for key, code in content.log:
+        text.append('\\item' + '\\textbf{' + replace_underscore(key) + ':}')
+        text.append(convert_code_to_latex_listing('\n'.join(code)))
 
     text.append('\\end{itemize}')
 
     return '\n'.join(text)
 
 
-def generate_network_graph(net, name):
+@instrumented('generate_morphology_table', obj=False)
+def generate_morphology_table(flat, table):
+    '''
+    longtable with a row per section of a morphology, see morphology.flatten_morphology and section_table
     '''
-    net: Network object in brian2
+    import numpy as np
+    text = ['\\begin{longtable}{lllrrrr}',
+            '\\textbf{section} & \\textbf{type} & \\textbf{class} & \\textbf{n} & \\textbf{length ($\\mu m$)} & '
+            '\\textbf{area ($\\mu m^2$)} & \\textbf{diameter ($\\mu m$)} \\\\',
+            '\\hline',
+            '\\endhead']
+    length = table['length'] * 1e6
+    area = table['area'] * 1e12
+    low = table['min_diameter'] * 1e6
+    high = table['max_diameter'] * 1e6
+    for i, name in enumerate(flat['name']):
+        diameter = '%.2f' % low[i] if np.isclose(low[i], high[i]) else '%.2f--%.2f' % (low[i], high[i])
+        text.append('%s & %s & %s & %d & %.2f & %.2f & %s \\\\' % (replace_underscore(name),
+                                                                 replace_underscore(str(flat['type'][i] or '')),
+                                                                 flat['class'][i], flat['n'][i], length[i], area[i],
+                                                                 diameter))
+    text.append('\\end{longtable}')
+    return '\n'.join(text)
+
+
+# default options of the network graph, see create_NN_pdf
+GRAPH_OPTIONS = {
+    'mode': 'auto',  # 'full', 'compact', 'summary', or 'auto' to choose by the size of the network
+    'compact_threshold': 200,  # auto: networks with more nodes are drawn compact
+    'summary_threshold': 2000,  # auto: networks with more nodes are drawn as a summary
+    'engine': 'dot',  # graphviz layout engine
+    'large_engine': 'sfdp',  # layout engine of graphs with more than 'engine_threshold' nodes
+    'engine_threshold': 500,
+}
+
 
-    generate a network graph
+def graph_options(options=None):
     '''
+    GRAPH_OPTIONS updated with the given dict
+    '''
+    merged = dict(GRAPH_OPTIONS)
+    if options:
+        unknown = set(options) - set(GRAPH_OPTIONS)
+        if unknown:
+            raise ValueError('Unknown graph options: ' + ', '.join(sorted(unknown)))
+        merged.update(options)
+    if merged['mode'] not in ('auto', 'full', 'compact', 'summary'):
+        raise ValueError("The graph mode has to be 'auto', 'full', 'compact' or 'summary'")
+    return merged
+
+
+def root_path(root, path):
+    '''
+    path of a file given relative to the folder of the document (e.g. 'tmp/net.tex'), in the current
+    directory if root is None
+    '''
+    return path if root is None else os.path.join(root, path)
+
+
+@instrumented('generate_network_graph',
+              size=lambda path, arguments: file_size(root_path(arguments['root'], path.strip('{}'))), obj=False)
+def generate_network_graph(net, name, cache=None, options=None, format='pdf', root=None):
+    '''
+    net: Network object in brian2, a snapshot or an index of it (see index.index_network)
+    cache: BuildCache, optional
+        the graph is only rendered by graphviz if its source is not in the cache
+    options: dict, optional
+        see graph_options and create_NN_pdf
+    format: str
+        output format of graphviz, e.g. 'svg' for the html preview
+    root: str, optional
+        folder of the document, see create_NN_pdf. The returned path is relative to it.
+
+    generate a network graph. Every node and edge is written once. In the 'compact' mode
+    monitors, PoissonInputs and run_regularly operations are counted in the label of their
+    group and Subgroups are clustered under their NeuronGroup; the 'summary' mode only has one
+    node per NeuronGroup and one edge with the number of Synapses per pair of NeuronGroups.
+    '''
+    from graphviz import Digraph
+    options = graph_options(options)
+
     def mark_NG(NG):
         '''
         Mark name and start stop of a NeuronGroup
 
         '''
+        if not hasattr(NG, 'start'):
+            # e.g. run_regularly of a Synapses object
+            return NG.name
         return NG.name + ' (' + str(NG.start) + ', ' + str(NG.stop) + ')'
 
-    def link_Subgroup(SB):
-        if isinstance(SB, Subgroup):
-            g.edge(mark_NG(SB), mark_NG(SB.source))
-            g.node(mark_NG(SB), shape='circle')
-            g.node(mark_NG(SB.source), shape='doublecircle')
+    def parent(group):
+        return group.source if group.kind == 'Subgroup' else group
+
+    # every documented object, the group it is attached to and its shape in the full graph
+    groups = []
+    synapses = []
+    attached = []
+    shapes = {'SpikeMonitor': 'Msquare', 'StateMonitor': 'box', 'PoissonInput': 'rarrow', 'CodeRunner': 'invtriangle'}
+    for obj in sorted(index_network(net, data=False).objects, key=lambda obj: obj.name):
+        if obj.kind in ('NeuronGroup', 'SpatialNeuron'):
+            groups.append(obj)
+        elif obj.kind == 'Synapses':
+            synapses.append(obj)
+        elif obj.kind in ('SpikeMonitor', 'StateMonitor'):
+            attached.append((obj, obj.source, shapes[obj.kind]))
+        else:
+            attached.append((obj, obj.group, shapes[obj.kind]))
+
+    subgroups = {}
+    for group in [syn.source for syn in synapses] + [syn.target for syn in synapses] + [a[1] for a in attached]:
+        if group.kind == 'Subgroup':
+            subgroups[mark_NG(group)] = group
+    size = len(set(mark_NG(group) for group in groups) | set(subgroups)) + len(attached)
+
+    mode = options['mode']
+    if mode == 'auto':
+        if size > options['summary_threshold']:
+            mode = 'summary'
+        elif size > options['compact_threshold']:
+            mode = 'compact'
+        else:
+            mode = 'full'
+
+    nodes = {}
+    edges = {}
+    clusters = defaultdict(list)
+    badges = defaultdict(lambda: defaultdict(int))
+
+    def node(key, **attrs):
+        if key not in nodes:
+            nodes[key] = attrs
+
+    def edge(tail, head, label=None, **attrs):
+        key = (tail, head, label)
+        if key not in edges:
+            edges[key] = attrs
+
+    def add_group(group):
+        '''
+        node of a NeuronGroup or Subgroup, returns its name
+        '''
+        if mode == 'summary':
+            group = parent(group)
+        key = mark_NG(group)
+        if key in nodes:
+            return key
+        if group.kind == 'Subgroup':
+            node(key, shape='circle')
+            source = add_group(group.source)
+            if mode == 'full':
+                edge(key, source)
+            else:
+                clusters[source].append(key)
+        else:
+            node(key, shape='doublecircle')
+        return key
+
+    for group in groups:
+        add_group(group)
+    if mode == 'summary':
+        counts = defaultdict(int)
+        for syn in synapses:
+            counts[(add_group(syn.source), add_group(syn.target))] += 1
+        for (tail, head), count in sorted(counts.items()):
+            edge(tail, head, '%d Synapses' % count)
+    else:
+        for syn in synapses:
+            edge(add_group(syn.source), add_group(syn.target), '<<b><i>' + syn.name + '</i></b>>',
+                 nodesep='1', minlen='4')
+    for obj, group, shape in attached:
+        key = add_group(group)
+        if mode == 'full':
+            node(obj.name, shape=shape)
+            edge(obj.name, key)
+        else:
+            badges[key][obj.kind] += 1
+
+    for key, counts in badges.items():
+        nodes[key]['label'] = key + '\\n' + ', '.join('%d %s' % (counts[kind], kind) for kind in sorted(counts))
 
     g = Digraph('G', filename=name+'.gv')
-    for obj in net.objects:
-        if isinstance(obj, NeuronGroup):
-            g.node(mark_NG(obj), shape='doublecircle')
-        if isinstance(obj, Synapses):
-            g.edge(mark_NG(obj.source), mark_NG(obj.target), label='<<b><i>' + obj.name + '</i></b>>', nodesep='1', minlen='4')
-            g.node(mark_NG(obj.source), shape='doublecircle')
-            g.node(mark_NG(obj.target), shape='doublecircle')
-            link_Subgroup(obj.source)
-            link_Subgroup(obj.target)
-        if isinstance(obj, SpikeMonitor):
-            g.edge(obj.name, mark_NG(obj.source))
-            g.node(obj.name, shape='Msquare')
-            g.node(mark_NG(obj.source), shape='doublecircle')
-            link_Subgroup(obj.source)
-        if isinstance(obj, StateMonitor):
-            g.edge(obj.name, mark_NG(obj.source))
-            g.node(obj.name, shape='box')
-            g.node(mark_NG(obj.source), shape='doublecircle')
-            link_Subgroup(obj.source)
-        if isinstance(obj, PoissonInput):
-            g.edge(obj.name, mark_NG(obj._group))
-            g.node(obj.name, shape='rarrow')
-            g.node(mark_NG(obj._group), shape='doublecircle')
-            link_Subgroup(obj._group)
-        if type(obj) is CodeRunner:
-            g.edge(obj.name, mark_NG(obj.group))
-            g.node(obj.name, shape='invtriangle')
-            g.node(mark_NG(obj.group), shape='doublecircle')
-    path = g.render(name, 'tmp', format='pdf')
+    g.engine = options['large_engine'] if len(nodes) > options['engine_threshold'] else options['engine']
+    if g.engine != 'dot':
+        g.attr(overlap='false', splines='false', outputorder='edgesfirst')
+    for key in sorted(clusters):
+        with g.subgraph(name='cluster_' + key) as cluster:
+            cluster.attr(label=key, style='rounded')
+            for member in [key] + clusters[key]:
+                cluster.node(member, **nodes.pop(member))
+    for key, attrs in nodes.items():
+        g.node(key, **attrs)
+    for (tail, head, label), attrs in edges.items():
+        if label is None:
+            g.edge(tail, head, **attrs)
+        else:
+            g.edge(tail, head, label=label, **attrs)
+
+    path = os.path.join('tmp', name + '.' + format)
+    if cache is None:
+        g.render(name, root_path(root, 'tmp'), format=format)
+    else:
+        key = digest(g.source, g.engine, format)
+        if not cache.get_file('graph', key, root_path(root, path)):
+            g.render(name, root_path(root, 'tmp'), format=format)
+            cache.put_file('graph', key, root_path(root, path))
 
     return '{' + path + '}'
 
 
-def generate_syn_latex(syn):
+@instrumented('generate_syn_latex')
+def generate_syn_latex(syn, figure_jobs=None, figure_options=None):
     '''
     write the Synapses latex code into file.
+    figure_jobs, figure_options: see generate_ng_latex
     '''
+    content = synapses_content(syn, figure_jobs, figure_options, '.pdf')
+    syn = content.record
 
     def generate_latex_synapse_on_pre(syn):
         str_pre_post = ''
-        for x in syn._pathways:
+        for x in syn.pathways:
             eqs = convert_code_to_latex_listing(x.code)
             if x.prepost == 'pre':
                 str_pre_post += '\\item\n\\textbf{on pre:}\n' + replace_underscore(x.name) + eqs
@@ -277,11 +554,18 @@ def generate_syn_latex(syn):
             str_events.append('\\end{lstlisting}')
         return ''.join(str_events)
 
+    def generate_latex_synapse_summary(syn):
+        summary = []
+        summary.append('\\item\\textbf{Connections:} ' + str(syn.N))
+        summary.append('\\item\\textbf{Mean fan-in:} %.4g synapses per target neuron (%d targets)'
+                       % (content.fan_in, content.targets))
+        summary.append('\\item\\textbf{Mean fan-out:} %.4g synapses per source neuron (%d sources)'
+                       % (content.fan_out, content.sources))
+
+        return '\n'.join(summary)
+
     def plot_synapse(syn):
-        pic_path = 'tmp/' + syn.name + '.pdf'
-        plt.close()
-        brian_plot(syn)
-        pp.savefig(pic_path)
+        pic_path = content.figure
         NG_name = replace_underscore(syn.name)
 
         plt_string = []
@@ -301,7 +585,7 @@ def generate_syn_latex(syn):
             for key, v in syn.summed_updaters.items():
                 syn_string.append('\\item' + replace_underscore(key)+':')
                 syn_string.append('\\begin{itemize}')
-                syn_string.append('\\item clock dt: $' + v.clock.dt.in_best_unit() + '$' )
+                syn_string.append('\\item clock dt: $' + v.dt.in_best_unit() + '$' )
                 syn_string.append('\\item when: ' + replace_underscore(str(v.when)))
                 syn_string.append('\\item order: ' + replace_underscore(str(v.order)))
                 syn_string.append('\\end{itemize}')
@@ -317,9 +601,10 @@ def generate_syn_latex(syn):
     #     syn_string.append('This is a Synapse group with following attributes:\\\\')
     if len(syn.equations) != 0:
         syn_string.append('\\item\\textbf{Model:}')
-        syn_string.append(sympy.latex(syn.equations))
+        syn_string.append(latex_equations(syn.equations))
     syn_string.append(generate_latex_synapse_on_pre(syn))
     syn_string.append(generate_latex_synapse_on_event(syn))
+    syn_string.append(generate_latex_synapse_summary(syn))
     syn_string.append(plot_synapse(syn))
     syn_string.append(generate_latex_synapse_summed_updateres(syn))
     syn_string.append('\\end{itemize}')
@@ -327,66 +612,71 @@ def generate_syn_latex(syn):
     return '\n'.join(syn_string)
 
 
-def generate_state_mon_latex(mon):
+@instrumented('generate_state_mon_latex')
+def generate_state_mon_latex(mon, figure_jobs=None, figure_options=None):
     '''
     write StateMonitor and SpikeMonitor group into file
-    '''
+    figure_jobs, figure_options: see generate_ng_latex
 
-    if len(mon.record_variables) != 1:
-        warnings.warn('''brian_plot only works for a StateMonitor that records a single variable. 
-                         So brian_docs will ignore StateMonitors which record more than one variables. 
-                         For documentation of those StateMonitors, it is suggested to put those 
-                         variables in different StateMonitors, and ensure that each StateMonitor
-                         only has one variable''')
+    A StateMonitor recording several variables is drawn as one figure with a panel per variable,
+    or as one figure per variable if figure_options['state_layout'] is 'separate'.
+    '''
+    content = state_monitor_content(mon, figure_jobs, figure_options, '.pdf')
+    if content is None:
+        warnings.warn('StateMonitor %s does not record any variable, it will be ignored' % mon.name)
         return ''
-    else:
-        pic_path = 'tmp/' + mon.name + '.pdf'
-        plt.close()
-        brian_plot(mon)
-        pp.savefig(pic_path)
-        mon_name = replace_underscore(mon.name)
+    mon = content.record
 
-        text = []
-        text. append('\\section{StateMonitor ' + mon_name + ':}')
+    mon_name = replace_underscore(mon.name)
+    text = []
+    text. append('\\section{StateMonitor ' + mon_name + ':}')
+    if len(mon.record_variables) > 1:
+        text.append('Recorded variables: ' + ', '.join(replace_underscore(var) for var in mon.record_variables) + '.')
+
+    for pic_path, var_names in content.figures:
+        if var_names is not None:
+            text.append('\n\\textbf{' + replace_underscore(var_names[0]) + ':}')
         text.append('\\begin{center}')
         text.append('\\includegraphics[width=\\textwidth]{' + pic_path + '}')
         text.append('\\end{center}')
-        if isinstance(mon.source, Subgroup):
-            text.append('This graph records a subgroup start from ' + str(mon.source.start) + ', stop at ' + str(mon.source.stop) + '.')
+    if content.subgroup is not None:
+        text.append('This graph records a subgroup start from ' + str(content.subgroup.start) + ', stop at ' + str(content.subgroup.stop) + '.')
 
-        return '\n'.join(text)
+    return '\n'.join(text)
 
 
-def generate_spike_mon_latex(mon):
+@instrumented('generate_spike_mon_latex')
+def generate_spike_mon_latex(mon, figure_jobs=None, figure_options=None):
     '''
     write StateMonitor and SpikeMonitor group into file
+    figure_jobs, figure_options: see generate_ng_latex
     '''
-    pic_path = 'tmp/' + mon.name + '.pdf'
-    plt.close()
-    brian_plot(mon)
-    pp.savefig(pic_path)
-    mon_name = replace_underscore(mon.name)
+    content = spike_monitor_content(mon, figure_jobs, figure_options, '.pdf')
+    pic_path = content.figure
+    mon_name = replace_underscore(content.record.name)
 
     text = []
     text.append('\\section{SpikeMonitor ' + mon_name + ':}')
     text.append('\\begin{center}')
     text.append('\\includegraphics[width=\\textwidth]{' + pic_path + '}')
     text.append('\\end{center}')
-    if isinstance(mon.source, Subgroup):
-        text.append('This graph records a subgroup start from ' + str(mon.source.start) + ', stop at ' + str(mon.source.stop) + '.')
+    if content.subgroup is not None:
+        text.append('This graph records a subgroup start from ' + str(content.subgroup.start) + ', stop at ' + str(content.subgroup.stop) + '.')
 
     return '\n'.join(text)
 
 
+@instrumented('generate_constant_list', obj=False)
 def generate_constant_list(d):
     '''
     d: a dictionary of constant
     '''
+    import sympy
     if not d:
         return ['No\\;Constant\\;Is\\;Documented']
     else:
         constant_list = []
-        for key, value in d.items():
+        for key, kind, value in constant_items(d):
             if key.count('_') < 1:
                 key_str = key
             elif key.count('_') == 1:
@@ -395,69 +685,298 @@ def generate_constant_list(d):
             else:
                 key_str = '\\textit{' + replace_underscore(key) + '}'
 
-            if isinstance(value, Quantity):
-                constant_list.append(key_str + ': ' + sympy.latex(value.in_best_unit()))
+            if kind == 'quantity':
+                constant_list.append(key_str + ': ' + _memo_latex('text', value, lambda: sympy.latex(value)))
                 # constant_list.append(key_str + ': ' + value.in_best_unit(python_code=True))
-            elif isinstance(value, str):
-                constant_list.append(key_str + ': ' + sympy.latex(str_to_sympy(value)))
+            elif kind == 'expression':
+                constant_list.append(key_str + ': ' + latex_expression(value))
             else:
-                constant_list.append(key_str + ': ' + str(value))
+                constant_list.append(key_str + ': ' + value)
 
         return constant_list
 
 
-def generate_tex_file(net, outputFile, constant_dict, log_dict, name):
-    if not os.path.exists('tmp'):
-        os.mkdir('tmp')
+def generate_object_latex(obj, log_dict, figure_jobs=None, figure_options=None):
+    '''
+    latex fragment of a single object of the network, None for objects that are not documented
+    '''
+    obj = describe_object(obj)
+    if obj is None:
+        return None
+    if obj.kind in ('NeuronGroup', 'SpatialNeuron'):
+        return generate_ng_latex(obj, log_dict, figure_jobs, figure_options)
+    if obj.kind == 'Synapses':
+        return generate_syn_latex(obj, figure_jobs, figure_options)
+    if obj.kind == 'StateMonitor':
+        return generate_state_mon_latex(obj, figure_jobs, figure_options)
+    if obj.kind == 'SpikeMonitor':
+        return generate_spike_mon_latex(obj, figure_jobs, figure_options)
+    if obj.kind == 'PoissonInput':
+        return generate_PoissonInput_latex(obj)
+    return generate_CodeRunner_latex(obj)
+
+
+def fingerprint_object(obj, log_dict):
+    '''
+    digest of everything the latex fragment and the graphs of obj are generated from,
+    used as its key in the build cache
+    '''
+    obj = describe_object(obj)
+    parts = [__version__, obj.kind, obj.name]
+    if obj.kind in ('NeuronGroup', 'SpatialNeuron'):
+        parts += [obj.N, _equations_key(obj.equations), obj.events, obj.event_codes, str(obj.refractory), obj.method_choice]
+        if log_dict is not None:
+            parts.append(group_log(log_dict, obj.name))
+        if obj.kind == 'SpatialNeuron':
+            parts += [obj.Cm, obj.Ri, obj.morphology]
+    elif obj.kind == 'Synapses':
+        parts += [_equations_key(obj.equations), [(x.name, x.prepost, x.code) for x in obj.pathways], obj.events,
+                  [(k, str(v.dt), v.when, v.order) for k, v in obj.summed_updaters.items()],
+                  obj.source.N, obj.target.N, obj.i, obj.j]
+    elif obj.kind in ('StateMonitor', 'SpikeMonitor'):
+        if obj.source.kind == 'Subgroup':
+            parts += [obj.source.start, obj.source.stop]
+        if obj.kind == 'StateMonitor':
+            parts += [obj.record_variables, obj.t] + [obj.values[var] for var in obj.record_variables]
+        else:
+            parts += [obj.i, obj.t, getattr(obj, 'density', None)]
+    elif obj.kind == 'PoissonInput':
+        parts += [obj.abstract_code, obj.group.name, obj.group.start, obj.group.stop, obj.N, str(obj.rate),
+                  obj.when, obj.order]
+    elif obj.kind == 'CodeRunner':
+        parts += [obj.abstract_code, str(obj.dt)]
+    return digest(parts)
+
+
+def _cached_object_latex(obj, log_dict, figure_jobs, figure_keys, figure_options, cache, root=None):
+    '''
+    the fragment of obj from the cache if it and its figures are there, otherwise generate and store it
+    '''
+    from .figures import job_fingerprint
+    obj = describe_object(obj)
+    if obj is None:
+        return None
+    key = digest(fingerprint_object(obj, log_dict), figure_options)
+    entry = cache.get_text('fragment', key)
+    if entry is not None:
+        entry = json.loads(entry)
+        figures = entry['figures']
+        if all(cache.get_file('figure', fkey, root_path(root, path)) for path, fkey in figures):
+            figure_keys.extend(fkey for _, fkey in figures)
+            return entry['text']
+
+    obj_jobs = []
+    text = generate_object_latex(obj, log_dict, obj_jobs, figure_options)
+    for job in obj_jobs:
+        if 'key' not in job:
+            job['key'] = job_fingerprint(job)
+        figure_keys.append(job['key'])
+    figure_jobs.extend(obj_jobs)
+    if text is not None:
+        cache.put_text('fragment', key, json.dumps({'text': text,
+                                                    'figures': [(job['path'], job['key']) for job in obj_jobs]}))
+    return text
+
+
+def _write_if_changed(path, text):
+    '''
+    write text to path unless the file already contains it, return whether the file was written
+    '''
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            if f.read() == text:
+                return False
+    with open(path, 'w') as f:
+        f.write(text)
+    return True
+
+
+_environment = None
+
+
+def document_template(template='template.txt'):
+    '''
+    the compiled template.txt, or another template of the templates folder. It is compiled once per
+    process, and again only if the file changes.
+    '''
+    global _environment
+    if _environment is None:
+        from jinja2 import Environment, FileSystemLoader
+        file_loader = FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates'))
+        _environment = Environment(loader=file_loader)
+    return _environment.get_template(template)
+
+
+def template_digest(template='template.txt'):
+    '''
+    digest of the text of a template of the templates folder
+    '''
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', template), 'r') as f:
+        return digest(f.read())
+
 
-    file = open(outputFile, 'w')
-    net_graph_path = generate_network_graph(net, name)
+def render_template(net_graph_latex_path, net_list, constant_list, include_only=''):
+    '''
+    the whole tex document: the latex fragments of the objects and the constants filled into the template
+    '''
+    return document_template().render(net_graph_latex_path=net_graph_latex_path, net_list=net_list,
+                                      constant_list=constant_list, include_only=include_only)
+
+
+@instrumented('generate_tex_file', size=lambda key, arguments: file_size(arguments['outputFile']), obj=False)
+def generate_tex_file(net, outputFile, constant_dict, log_dict, name, figure_workers=None, cache=None,
+                      figure_options=None, chapters=False, partial=False, profile=None, graph_options=None,
+                      root=None):
+    '''
+    figure_workers, figure_options, chapters, partial, graph_options, root: see create_NN_pdf.
+        The figures and parts are written to the 'tmp' folder in root, outputFile is not changed.
+    cache: BuildCache, optional
+        fragments and figures of unchanged objects are taken from the cache.
+        In that case the returned value is a fingerprint of the whole document, including its figures.
+    profile: instrument.Profile, optional
+        its summary of the stages run so far is added as the last section of the document
+
+    The fragments are generated one at a time while the template is rendered, and every chunk is
+    written to the file as soon as it is produced, so the document is never held in memory as a whole.
+    The figures of an object are drawn (or sent to the figure workers) right after its fragment, so
+    the data of their jobs is released object by object instead of being kept until the end.
+    '''
+    from .figures import FigureRenderer
+    if not os.path.exists(root_path(root, 'tmp')):
+        os.makedirs(root_path(root, 'tmp'))
+
+    # every object is described once, and the log statements are assigned to their groups
+    index = index_network(net, log_dict)
+    net_graph_path = generate_network_graph(index, name, cache, graph_options, 'pdf', root)
     net_graph_latex_path = net_graph_path.replace('\\', '/')
 
-    net_list = []
-    for obj in net.objects:
-        if isinstance(obj, NeuronGroup):
-            net_list.append(generate_ng_latex(obj, log_dict))
-        if isinstance(obj, Synapses):
-            net_list.append(generate_syn_latex(obj))
-        if isinstance(obj, StateMonitor):
-            net_list.append(generate_state_mon_latex(obj))
-        if isinstance(obj, SpikeMonitor):
-            net_list.append(generate_spike_mon_latex(obj))
-        if isinstance(obj, PoissonInput):
-            net_list.append(generate_PoissonInput_latex(obj))
-        if type(obj) is CodeRunner:
-            net_list.append(generate_CodeRunner_latex(obj))
+    parts_folder = 'tmp/' + name + '_parts'
+    if chapters and not os.path.exists(root_path(root, parts_folder)):
+        os.mkdir(root_path(root, parts_folder))
+
+    changed_parts = []
+    figure_keys = []
+    fingerprint = Fingerprint()
+    # documents made by another version or from another template are built again
+    fingerprint.update(__version__, template_digest())
+    renderer = FigureRenderer(figure_workers, cache, root)
+
+    def net_list():
+        for obj in index.objects:
+            figure_jobs = []
+            if cache is None:
+                text = generate_object_latex(obj, index, figure_jobs, figure_options)
+            else:
+                text = _cached_object_latex(obj, index, figure_jobs, figure_keys, figure_options, cache, root)
+            renderer.submit(figure_jobs)
+            if text is None:
+                continue
+            if chapters:
+                part = parts_folder + '/' + obj.name
+                if _write_if_changed(root_path(root, part + '.tex'), text):
+                    changed_parts.append(part)
+                fingerprint.update(text)
+                text = '\\include{' + part + '}'
+            yield text
+        # the last figures are drawn before the profile summary is written
+        renderer.close()
+        if profile is not None:
+            yield profile.latex()
+
+    fragments = net_list()
+    if chapters:
+        # \includeonly precedes the fragments, the list only holds the \include lines
+        fragments = list(fragments)
+    if partial and changed_parts:
+        include_only = '\\includeonly{' + ','.join(changed_parts) + '}'
+    else:
+        include_only = ''
     if constant_dict != None:
         constant_list = generate_constant_list(constant_dict)
     else:
         constant_list = ['No\\;Constant\\;Is\\;Documented']
 
-    file_loader = FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates'))
-    env = Environment(loader=file_loader)
-    template = env.get_template('template.txt')
-    output = template.render(net_graph_latex_path=net_graph_latex_path, net_list=net_list, constant_list=constant_list)
+    chunks = document_template().generate(net_graph_latex_path=net_graph_latex_path, net_list=fragments,
+                                          constant_list=constant_list, include_only=include_only)
+    with renderer, open(outputFile, 'w') as file:
+        for chunk in chunks:
+            file.write(chunk)
+            if cache is not None:
+                fingerprint.update(chunk)
+
+    if cache is not None:
+        with open(root_path(root, net_graph_path.strip('{}')), 'rb') as f:
+            fingerprint.update(f.read())
+        fingerprint.update(figure_keys)
+        return fingerprint.hexdigest()
+
+
+# a line of the brian2 log that is written once the network starts simulating, the statements
+# executed while the network is constructed are all logged before it
+SIMULATION_STARTED = "Simulating network '"
+
+_code_object_created = re.compile('Creating code object \\(group=.*')
+# lines that have to follow the line above, the next line after them is the statement
+_code_object_block = [re.compile('[ ]*Key condition:'),
+                      re.compile('[ ]*_cond = True'),
+                      re.compile('[ ]*Key statement:')]
+
 
-    file.write(output)
-    file.close()
+def _log_entry(block):
+    k = re.search('group=.*,', block).group(0).strip('group=').rstrip(',')
+    v = re.search('Key statement:\n[ ]*.*', block).group(0).strip('Key statement:').strip()
+    return k, v
 
 
-def generate_log_dict(BrianLogger_tmp_log):
+def iter_log_entries(BrianLogger_tmp_log, stop_at=None):
+    '''
+    go through the log line by line and yield (name, statement) for every
+    "Creating code object / Key condition / Key statement" block, in the order of the log.
+    Only the lines of the current block are kept in memory.
+
+    stop_at: str, optional
+        stop reading at the first line containing this string, e.g. SIMULATION_STARTED
+    '''
+    block = None
+    with open(BrianLogger_tmp_log, 'r') as f:
+        for line in f:
+            newline = line.endswith('\n')
+            line = line[:-1] if newline else line
+            if block is not None:
+                if len(block) == 4:
+                    block.append(line)
+                    yield _log_entry('\n'.join(block))
+                    block = None
+                    continue
+                if newline and _code_object_block[len(block) - 1].fullmatch(line):
+                    block.append(line)
+                    continue
+                block = None
+            if stop_at is not None and stop_at in line:
+                return
+            match = _code_object_created.search(line)
+            if match and newline:
+                block = [match.group(0)]
+    if block is not None and len(block) == 4:
+        # the log ends right after "Key statement:"
+        block.append('')
+        yield _log_entry('\n'.join(block))
+
+
+@instrumented('generate_log_dict',
+              size=lambda log_dict, arguments: file_size(arguments['BrianLogger_tmp_log'] or ''),
+              obj=False)
+def generate_log_dict(BrianLogger_tmp_log, stop_at=None):
     '''
     explanations see create_NN_pdf
+
+    stop_at: str, optional
+        see iter_log_entries, by default the whole log is read
     '''
     if BrianLogger_tmp_log is not None:
-
-        f = open(BrianLogger_tmp_log, "r")
-        string = f.read()
-        ll = re.findall('Creating code object \(group=.*\n[ ]*Key condition:\n[ ]*_cond = True\n[ ]*Key statement:\n[ ]*.*',
-                        string)
-
         d = defaultdict(list)
 
-        for x in ll:
-            k = re.search('group=.*,', x).group(0).strip('group=').rstrip(',')
-            v = re.search('Key statement:\n[ ]*.*', x).group(0).strip('Key statement:').strip()
+        for k, v in iter_log_entries(BrianLogger_tmp_log, stop_at):
             d[k].append(v)
 
         return d
@@ -465,24 +984,57 @@ def generate_log_dict(BrianLogger_tmp_log):
         return None
 
 
-def create_pdf(input_filename, output_filename):
-    process = subprocess.Popen([
-        'latex',  # Or maybe 'C:\\Program Files\\MikTex\\miktex\\bin\\latex.exe
-        '-output-format=pdf',
-        '-job-name=' + output_filename,
-        input_filename])
-    process.wait()
+@instrumented('create_pdf',
+              size=lambda result, arguments: file_size(root_path(arguments['root'],
+                                                                 arguments['output_filename'] + '.pdf')),
+              obj=False)
+def create_pdf(input_filename, output_filename, fmt=None, max_runs=3, root=None):
+    '''
+    run latex on input_filename to create output_filename + '.pdf'
+
+    fmt: str, optional
+        name of a format file in the 'tmp' folder, built by texbuild.build_format
+    max_runs: int
+        number of times latex is run at most, while it reports that cross-references changed
+    root: str, optional
+        folder latex is run in, the file names are relative to it
+
+    Returns a dict with the 'returncode' of latex, the number of 'runs', the 'seconds'
+    spent compiling and the path of the 'log' file.
+    '''
+    result = run_latex(input_filename, output_filename, fmt, 'tmp', max_runs, cwd=root)
+    if result['returncode'] != 0:
+        warnings.warn('latex exited with status %s, see %s' % (result['returncode'], result['log']))
+    return result
+
+
+def template_preamble():
+    '''
+    source of the preamble of the template, see texbuild.split_preamble
+    '''
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'template.txt'), 'r') as f:
+        return split_preamble(f.read())
 
-def  create_NN_pdf(net, name='net', constant_dict=None, BrianLogger_tmp_log=None):
+
+def  create_NN_pdf(net, name='net', constant_dict=None, BrianLogger_tmp_log=None, figure_workers=None, cache=None,
+                  log_stop_at=None, figure_options=None, precompile_preamble=False, chapters=False, partial=False,
+                  root=None, profile=False, graph_options=None, checkpoint=None, prune=True):
     '''
     Top level function for generating a pdf document for a brian2 Network object.
     This function will generate a pdf document that has the specified name under the folder 'pdf'
     Other temporary file like the tex file and graphs used to generate the pdf will be under 'tmp' folder
+    Both folders are created in the current directory, or in root if it is given.
+    Returns the result of create_pdf, with 'runs' 0 if the pdf was taken from the cache.
 
     Parameters:
     -----------
     net: 'Network'
-        a brian2 Network object that used to encapsulate all brian object created
+        a brian2 Network object that used to encapsulate all brian object created.
+        It can also be a snapshot of a Network made by snapshot.describe_network, or the path of a
+        snapshot saved by snapshot.save_snapshot, so that the network can be documented in another
+        process or after the simulation has ended.
+        The recordings of a snapshot saved with a data_directory are read memory mapped from their
+        .npy files when the figures are drawn, they are not loaded into memory.
     name: str, optional
         name of the document
     d: {str, 'Quantity'/str/int/float etc.}, optional
@@ -500,13 +1052,99 @@ def  create_NN_pdf(net, name='net', constant_dict=None, BrianLogger_tmp_log=None
         i.e. add this two lines of code after the import statement, andin front of your example:
         >>> BrianLogger.log_level_diagnostic()
         >>> prefs._set_preference('logging.delete_log_on_exit',False)
+        The log is read line by line, so its size is not limited by the available memory.
+    figure_workers: int, optional
+        number of worker processes used to render the graphs of monitors, synapses and morphologies.
+        The workers use the headless 'Agg' backend of matplotlib. By default all graphs are rendered
+        one after another in the current process. The tex file is the same in both cases.
+    cache: BuildCache, optional
+        persistent cache of graphs, tex fragments and pdf documents. Objects whose inputs did not change
+        since an earlier run are not documented again, and latex is not run if the document did not change.
+        The hit and miss counts are available from cache.report().
+    log_stop_at: str, optional
+        stop reading the log at the first line that contains this string. With SIMULATION_STARTED only
+        the statements executed before the first run are documented, and the rest of the log is not read.
+    figure_options: dict, optional
+        options of the graphs, missing keys are taken from figures.FIGURE_OPTIONS:
+        'reduce': replace long traces of StateMonitors by their min/max envelope over 'pixel_width' time bins,
+        and draw SpikeMonitors with more than 'spike_density_threshold' spikes as a binned spike density.
+        'rasterize': embed the plotted data as a bitmap of 'dpi' dots per inch, which keeps the size of
+        the figures and the time of the latex run bounded for long recordings.
+        Synapses with more than 'synapse_aggregate_threshold' connections are drawn as a density of
+        connections between blocks of source and target neurons (at most 'synapse_blocks' per side)
+        next to their in- and out-degree distributions. The indices are read 'synapse_chunk' at a time.
+        StateMonitors recording several variables are drawn with one panel per variable sharing the time
+        axis, or with 'state_layout': 'separate' as one figure per variable.
+    precompile_preamble: bool, optional
+        precompile the preamble of the template into a format file with the mylatexformat package.
+        The format is kept in the 'tmp' folder and only rebuilt when the template changes.
+    chapters: bool, optional
+        write the fragment of every object into its own file under 'tmp/<name>_parts' and \\include it
+        into the document. Every object then starts on a new page.
+    partial: bool, optional
+        with chapters, only typeset the objects whose fragment changed since the last run (\\includeonly).
+        This gives a quick draft; the other objects are left out of the pdf.
+    root: str, optional
+        folder in which 'tmp' and 'pdf' are created. The files are written to it and latex is run in it,
+        the current directory of the process is not changed, so documents of networks with the same
+        object names can be built at the same time (see batch.document_networks).
+    profile: bool, optional
+        measure the wall time, cpu time, peak memory and output size of every stage and object
+        (see instrument.py), write them to 'tmp/<name>_profile.json' and add a summary section
+        to the end of the pdf. The path of the json file is returned as 'profile'.
+        Other tracers can be registered with instrument.add_tracer, without changing the document.
+    graph_options: dict, optional
+        options of the network graph, missing keys are taken from GRAPH_OPTIONS. 'mode' is 'full' (every
+        object is a node), 'compact' (monitors, PoissonInputs and run_regularly operations are counted in
+        the label of their group, Subgroups are clustered under their NeuronGroup) or 'summary' (one node per
+        NeuronGroup, one edge per connected pair of NeuronGroups). With 'auto', networks with more than
+        'compact_threshold' nodes are drawn compact and networks with more than 'summary_threshold' nodes as
+        a summary. Graphs with more than 'engine_threshold' nodes are laid out by 'large_engine' instead
+        of 'engine'.
+    checkpoint: checkpoint.Checkpoint, optional
+        document the monitors incrementally: only the samples recorded since the last call with the same
+        checkpoint are read, and the figures are drawn from running summaries of the recordings (an
+        envelope of the traces, a histogram of the spikes). Use it with a cache, so that the fragments and
+        figures of the other objects are reused.
+    prune: bool, optional
+        remove the least recently used entries of the cache when it is over its size limit at the end.
+        batch.document_networks passes False and prunes the shared cache once all its jobs are done.
 
     '''
+    if isinstance(net, str):
+        net = load_snapshot(net)
+    if profile and not isinstance(profile, Profile):
+        with Profile() as stages:
+            result = create_NN_pdf(net, name, constant_dict, BrianLogger_tmp_log, figure_workers, cache, log_stop_at,
+                                   figure_options, precompile_preamble, chapters, partial, root, profile=stages,
+                                   graph_options=graph_options, checkpoint=checkpoint, prune=prune)
+        result['profile'] = root_path(root, 'tmp/' + name + '_profile.json')
+        stages.write_json(result['profile'])
+        return result
+    stages = profile if isinstance(profile, Profile) else None
+
+    if checkpoint is not None:
+        net = checkpoint.update(net)
     tex_path = 'tmp/' + name + '.tex'
     pdf_path = 'pdf/' + name
-    log_dict = generate_log_dict(BrianLogger_tmp_log)
-    generate_tex_file(net, tex_path, constant_dict, log_dict, name)
-    create_pdf(tex_path, pdf_path)
+    log_dict = generate_log_dict(BrianLogger_tmp_log, log_stop_at)
+    if not os.path.exists(root_path(root, 'pdf')):
+        os.makedirs(root_path(root, 'pdf'))
+    build_key = generate_tex_file(net, root_path(root, tex_path), constant_dict, log_dict, name, figure_workers,
+                                  cache, figure_options, chapters, partial, stages, graph_options, root)
+    fmt = build_format(template_preamble(), root_path(root, 'tmp')) if precompile_preamble else None
+    if cache is None:
+        return create_pdf(tex_path, pdf_path, fmt, root=root)
+
+    if cache.get_file('pdf', build_key, root_path(root, pdf_path + '.pdf')):
+        result = {'returncode': 0, 'runs': 0, 'seconds': 0.0, 'log': None}
+    else:
+        result = create_pdf(tex_path, pdf_path, fmt, root=root)
+        if result['returncode'] == 0 and os.path.exists(root_path(root, pdf_path + '.pdf')):
+            cache.put_file('pdf', build_key, root_path(root, pdf_path + '.pdf'))
+    if prune:
+        cache.prune()
+    return result
 # Example usage:
 # generate_tex_file(net, 'tmp/net.tex')
 # create_pdf('tmp/net.tex', 'pdf/net')
\ No newline at end of file
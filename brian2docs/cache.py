@@ -0,0 +1,229 @@
+'''
+Persistent, content addressed cache for the pieces of a document.
+
+Entries are stored as files under <path>/<namespace>/<key[:2]>/<key>. The modification
+time of an entry is refreshed whenever it is used, so it doubles as the last access
+time for eviction. Every entry is written to a temporary file and moved into place,
+so several processes can share one cache directory.
+'''
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+from collections import Counter, OrderedDict
+
+
+def _feed(h, x):
+    if x is None:
+        h.update(b'N')
+    elif isinstance(x, str):
+        h.update(b'S%d:' % len(x))
+        h.update(x.encode('utf-8'))
+    elif isinstance(x, bytes):
+        h.update(b'B%d:' % len(x))
+        h.update(x)
+    elif hasattr(x, '__array_interface__'):
+        # numpy is only imported once an array is seen.
+        # Quantity is a subclass of ndarray, its unit is part of the fingerprint
+        import numpy as np
+        dim = getattr(x, 'dim', None)
+        order = ''
+        if x.flags.f_contiguous and not x.flags.c_contiguous:
+            # e.g. a transposed or memory mapped Fortran array, hashed without copying it
+            order = 'F'
+            x = x.T
+        h.update(('A%s%s%s%s:' % (order, x.dtype.str, x.shape, dim)).encode('utf-8'))
+        if x.size:
+            h.update(memoryview(np.ascontiguousarray(x)).cast('B'))
+    elif isinstance(x, (list, tuple)):
+        h.update(b'L%d:' % len(x))
+        for item in x:
+            _feed(h, item)
+    elif isinstance(x, dict):
+        h.update(b'D%d:' % len(x))
+        for key in sorted(x, key=str):
+            _feed(h, str(key))
+            _feed(h, x[key])
+    else:
+        _feed(h, type(x).__name__ + ':' + repr(x))
+
+
+def digest(*parts):
+    '''
+    fingerprint of strings, numbers, numpy arrays and nested lists/tuples/dicts of them
+    '''
+    h = hashlib.sha1()
+    _feed(h, list(parts))
+    return h.hexdigest()
+
+
+class Fingerprint(object):
+    '''
+    digest of parts that are added one after another, e.g. the chunks of a file while it is written
+    '''
+
+    def __init__(self):
+        self._hash = hashlib.sha1()
+
+    def update(self, *parts):
+        _feed(self._hash, list(parts))
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class BuildCache(object):
+    '''
+    Cache shared between runs of create_NN_pdf.
+
+    Parameters:
+    -----------
+    path: str
+        directory of the cache
+    max_bytes: int, optional
+        total size the cache is pruned to by prune(), least recently used entries are removed first
+    max_age: float, optional
+        entries that have not been used for more than max_age seconds are removed by prune()
+
+    The number of hits and misses of each namespace ('fragment', 'figure', 'graph', 'pdf')
+    are counted in self.hits and self.misses.
+    '''
+
+    def __init__(self, path='cache', max_bytes=None, max_age=None):
+        # absolute, so that the cache can still be used after changing the working directory
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def _entry(self, namespace, key):
+        return os.path.join(self.path, namespace, key[:2], key)
+
+    def _lookup(self, namespace, key):
+        entry = self._entry(namespace, key)
+        try:
+            os.utime(entry)
+        except OSError:
+            self.misses[namespace] += 1
+            return None
+        self.hits[namespace] += 1
+        return entry
+
+    def _store(self, namespace, key, write):
+        entry = self._entry(namespace, key)
+        folder = os.path.dirname(entry)
+        if not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp, entry)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def get_text(self, namespace, key):
+        '''
+        return the cached text, or None
+        '''
+        entry = self._lookup(namespace, key)
+        if entry is None:
+            return None
+        with open(entry, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def put_text(self, namespace, key, text):
+        self._store(namespace, key, lambda f: f.write(text.encode('utf-8')))
+
+    def get_file(self, namespace, key, dest):
+        '''
+        copy the cached file to dest, return whether the key was found
+        '''
+        entry = self._lookup(namespace, key)
+        if entry is None:
+            return False
+        shutil.copyfile(entry, dest)
+        return True
+
+    def put_file(self, namespace, key, src):
+        def write(f):
+            with open(src, 'rb') as source:
+                shutil.copyfileobj(source, f)
+        self._store(namespace, key, write)
+
+    def prune(self):
+        '''
+        remove entries older than max_age, then least recently used entries until the cache
+        is not larger than max_bytes
+        '''
+        if self.max_bytes is None and self.max_age is None:
+            return
+        entries = []
+        for folder, _, files in os.walk(self.path):
+            for file_name in files:
+                if file_name.startswith('tmp'):
+                    # being written by _store
+                    continue
+                entry = os.path.join(folder, file_name)
+                try:
+                    st = os.stat(entry)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry))
+        entries.sort()
+
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, entry in entries:
+            too_old = self.max_age is not None and now - mtime > self.max_age
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            if not (too_old or too_big):
+                continue
+            try:
+                os.remove(entry)
+            except OSError:
+                continue
+            total -= size
+
+    def report(self):
+        '''
+        one line per namespace with the hit and miss counts
+        '''
+        lines = []
+        for namespace in sorted(set(self.hits) | set(self.misses)):
+            lines.append('%s: %d hits, %d misses' % (namespace, self.hits[namespace], self.misses[namespace]))
+        return '\n'.join(lines)
+
+
+class LRUCache(object):
+    '''
+    dict like mapping that keeps at most maxsize items, the least recently used item is dropped first
+    '''
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
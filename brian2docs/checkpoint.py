@@ -0,0 +1,277 @@
+'''
+Incremental documentation of a running simulation, e.g.
+
+>>> checkpoint = Checkpoint()
+>>> cache = BuildCache('cache')
+>>> for phase in range(10):
+...     run(1*hour)
+...     create_NN_pdf(net, 'net', cache=cache, checkpoint=checkpoint)
+
+The Checkpoint remembers how many samples of every StateMonitor and SpikeMonitor have been
+documented, and only reads the samples recorded since the last refresh. They are added to running
+summaries of bounded size: a min/max envelope of the traces of StateMonitors (see figures.envelope)
+and a histogram of the spikes of SpikeMonitors over neuron and time bins. The bins are merged in
+pairs when the recording gets longer, so both keep at most pixel_width time bins.
+
+The figures of the monitors are drawn from the summaries, so a refresh costs time proportional
+to the new samples. The records of the other objects are kept while they do not change, and with a
+BuildCache their fragments and figures are reused.
+'''
+import pickle
+from types import SimpleNamespace
+
+import numpy as np
+from brian2 import Quantity, StateMonitor, SpikeMonitor
+from .cache import digest
+from .figures import FIGURE_OPTIONS
+from .snapshot import is_record, load_array, describe_group, describe_object
+
+
+def _recorded(mon, name, start):
+    '''
+    the samples of a recorded variable of a monitor after the first start ones, without their unit, and its dim
+    '''
+    if is_record(mon):
+        values = load_array(getattr(mon, name) if name in ('i', 't') else mon.values[name])
+        return np.asarray(values)[start:], getattr(values, 'dim', None)
+    variable = mon.variables[name]
+    return variable.get_value()[start:], variable.dim
+
+
+def _with_dim(values, dim):
+    if dim is None or dim.is_dimensionless:
+        return values
+    return Quantity(values, dim=dim)
+
+
+class _Envelope(object):
+    '''
+    running min/max envelope of traces, in at most width bins of size samples. The last bin, which has
+    fewer samples, is kept separately as pending.
+    '''
+
+    def __init__(self, width):
+        self.width = width
+        self.size = 1
+        self.starts = np.zeros(0)
+        self.mins = None
+        self.maxs = None
+        self.pending = None  # (start, min, max, number of samples)
+        self.empty = None  # trace of a monitor without samples, with the shape and dtype of its values
+
+    def _merge(self):
+        if len(self.starts) % 2:
+            # the last bin becomes part of the pending bin, which stays smaller than the new bins
+            start, low, high = self.starts[-1], self.mins[-1], self.maxs[-1]
+            count = self.size
+            if self.pending is not None:
+                low, high = np.minimum(low, self.pending[1]), np.maximum(high, self.pending[2])
+                count += self.pending[3]
+            self.pending = (start, low, high, count)
+            self.starts, self.mins, self.maxs = self.starts[:-1], self.mins[:-1], self.maxs[:-1]
+        if len(self.starts):
+            self.starts = self.starts[0::2]
+            self.mins = np.minimum(self.mins[0::2], self.mins[1::2])
+            self.maxs = np.maximum(self.maxs[0::2], self.maxs[1::2])
+        self.size *= 2
+
+    def _append(self, starts, mins, maxs):
+        if self.mins is None:
+            self.starts, self.mins, self.maxs = starts, mins, maxs
+        else:
+            self.starts = np.concatenate([self.starts, starts])
+            self.mins = np.concatenate([self.mins, mins])
+            self.maxs = np.concatenate([self.maxs, maxs])
+
+    def add(self, times, values):
+        '''
+        times: the new sample times, values: the new samples, one row per time step
+        '''
+        n = len(times)
+        if self.empty is None:
+            self.empty = np.asarray(values[:0])
+        if n == 0:
+            return
+        pending = self.pending[3] if self.pending is not None else 0
+        # the full bins and the pending bin are at most width bins
+        while len(self.starts) + -(-(pending + n) // self.size) > self.width:
+            self._merge()
+            pending = self.pending[3] if self.pending is not None else 0
+        position = 0
+        if self.pending is not None:
+            start, low, high, count = self.pending
+            position = min(self.size - count, n)
+            low = np.minimum(low, values[:position].min(axis=0))
+            high = np.maximum(high, values[:position].max(axis=0))
+            self.pending = (start, low, high, count + position)
+            if count + position == self.size:
+                self._append(np.array([start]), low[None], high[None])
+                self.pending = None
+        full = (n - position) // self.size
+        if full:
+            block = np.asarray(values[position:position + full * self.size])
+            block = block.reshape((full, self.size) + block.shape[1:])
+            self._append(np.asarray(times[position:position + full * self.size:self.size]),
+                         block.min(axis=1), block.max(axis=1))
+            position += full * self.size
+        if position < n:
+            self.pending = (times[position], values[position:].min(axis=0), values[position:].max(axis=0),
+                            n - position)
+
+    def trace(self):
+        '''
+        times and values of the envelope, like figures.envelope
+        '''
+        starts, mins, maxs = self.starts, self.mins, self.maxs
+        if self.pending is not None:
+            start, low, high, _ = self.pending
+            if mins is None:
+                starts, mins, maxs = np.array([start]), low[None], high[None]
+            else:
+                starts = np.concatenate([starts, [start]])
+                mins, maxs = np.concatenate([mins, low[None]]), np.concatenate([maxs, high[None]])
+        if mins is None:
+            return np.zeros(0), self.empty
+        values = np.empty((2 * len(starts),) + mins.shape[1:], dtype=mins.dtype)
+        values[0::2] = mins
+        values[1::2] = maxs
+        return np.repeat(starts, 2), values
+
+
+class _SpikeHistogram(object):
+    '''
+    running number of spikes per (neuron bin, time bin), with at most width time bins starting at t = 0
+    '''
+
+    def __init__(self, n_neurons, width, chunk):
+        if width < 2:
+            raise ValueError('A spike histogram needs at least 2 time bins, not %d' % width)
+        self.n_neurons = max(int(n_neurons), 1)
+        self.neuron_bins = max(min(self.n_neurons, width // 2), 1)
+        self.width = width
+        self.chunk = chunk
+        self.bin = None  # duration of a time bin in seconds
+        self.counts = np.zeros((self.neuron_bins, 0), dtype=np.int64)
+
+    def add(self, indices, times):
+        if len(times) == 0:
+            return
+        t_max = max(float(times[start:start + self.chunk].max()) for start in range(0, len(times), self.chunk))
+        if self.bin is None:
+            self.bin = t_max / (self.width - 1) if t_max > 0 else 1e-3
+        while t_max >= self.bin * self.width:
+            if self.counts.shape[1] % 2:
+                self.counts = np.hstack([self.counts, np.zeros((self.neuron_bins, 1), dtype=np.int64)])
+            self.counts = self.counts[:, 0::2] + self.counts[:, 1::2]
+            self.bin *= 2
+        columns = max(int(t_max / self.bin) + 1, self.counts.shape[1])
+        counts = np.zeros(self.neuron_bins * columns, dtype=np.int64)
+        for start in range(0, len(times), self.chunk):
+            time_bin = (np.asarray(times[start:start + self.chunk]) / self.bin).astype(np.int64)
+            neuron_bin = (np.asarray(indices[start:start + self.chunk], dtype=np.int64) * self.neuron_bins) // self.n_neurons
+            counts += np.bincount(neuron_bin * columns + time_bin, minlength=len(counts))
+        counts = counts.reshape(self.neuron_bins, columns)
+        counts[:, :self.counts.shape[1]] += self.counts
+        self.counts = counts
+
+    def density(self):
+        '''
+        counts and time range, like figures.spike_density
+        '''
+        return self.counts, (0.0, self.counts.shape[1] * (self.bin or 0.0))
+
+
+class Checkpoint(object):
+    '''
+    State of the incremental documentation of a network, see the module documentation.
+
+    pixel_width: int
+        maximum number of time bins of the summaries of the monitors, at least 2
+    chunk: int
+        number of spikes read at once
+    '''
+
+    def __init__(self, pixel_width=FIGURE_OPTIONS['pixel_width'], chunk=FIGURE_OPTIONS['synapse_chunk']):
+        if pixel_width < 2:
+            raise ValueError('pixel_width has to be at least 2, not %d' % pixel_width)
+        self.pixel_width = pixel_width
+        self.chunk = chunk
+        self.positions = {}  # name of a monitor: number of samples documented so far
+        self._summaries = {}
+        self._records = {}
+
+    def _summary(self, mon, n_samples, create):
+        # a monitor with fewer samples than documented before was recreated, its summary starts again
+        if mon.name not in self._summaries or n_samples < self.positions[mon.name]:
+            self._summaries[mon.name] = create()
+            self.positions[mon.name] = 0
+        return self._summaries[mon.name], self.positions[mon.name]
+
+    def _state_monitor(self, mon):
+        source = describe_group(mon.source)
+        record_variables = list(mon.record_variables)
+        n_samples = len(_recorded(mon, 't', 0)[0])
+        envelopes, start = self._summary(mon, n_samples, lambda: dict((var, _Envelope(self.pixel_width))
+                                                                      for var in record_variables))
+        times, t_dim = _recorded(mon, 't', start)
+        trace_times = np.zeros(0)
+        values = {}
+        for var in record_variables:
+            new_values, dim = _recorded(mon, var, start)
+            envelopes[var].add(times, new_values)
+            trace_times, trace = envelopes[var].trace()
+            values[var] = _with_dim(trace, dim)
+        self.positions[mon.name] = n_samples
+        return SimpleNamespace(kind='StateMonitor', name=mon.name, source=source, record_variables=record_variables,
+                               t=_with_dim(trace_times, t_dim), values=values)
+
+    def _spike_monitor(self, mon):
+        source = describe_group(mon.source)
+        n_spikes = len(_recorded(mon, 't', 0)[0])
+        histogram, start = self._summary(mon, n_spikes, lambda: _SpikeHistogram(source.N, self.pixel_width,
+                                                                                 self.chunk))
+        histogram.add(_recorded(mon, 'i', start)[0], _recorded(mon, 't', start)[0])
+        self.positions[mon.name] = n_spikes
+        return SimpleNamespace(kind='SpikeMonitor', name=mon.name, source=source, i=None, t=None,
+                               density=histogram.density())
+
+    def _record(self, obj):
+        if is_record(obj):
+            return obj
+        # the structure is described without data, the full record is only made when it changed
+        outline = describe_object(obj, data=False)
+        if outline is None:
+            return None
+        # the parameters of a SpatialNeuron are part of the outline and can change between updates
+        key = (outline.kind, getattr(outline, 'N', None), digest(getattr(outline, 'Cm', None),
+                                                                 getattr(outline, 'Ri', None)))
+        if self._records.get(outline.name, (None, None))[0] != key:
+            self._records[outline.name] = (key, describe_object(obj))
+        return self._records[outline.name][1]
+
+    def update(self, net):
+        '''
+        snapshot of net (see snapshot.describe_network) in which the recordings of the monitors are
+        replaced by their summaries, updated with the samples recorded since the last call
+        '''
+        objects = []
+        for obj in net.objects:
+            kind = obj.kind if is_record(obj) else type(obj).__name__
+            if kind == 'StateMonitor' or isinstance(obj, StateMonitor):
+                record = self._state_monitor(obj)
+            elif kind == 'SpikeMonitor' or isinstance(obj, SpikeMonitor):
+                record = self._spike_monitor(obj)
+            else:
+                record = self._record(obj)
+            if record is not None:
+                objects.append(record)
+        return SimpleNamespace(kind='Network', name=net.name, objects=objects)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,159 @@
+'''
+Command line interface, e.g.
+
+    brian2docs build example.py --name example --save-snapshot example.snapshot --data-dir example_data
+    brian2docs build example.snapshot
+    brian2docs preview example.snapshot
+    brian2docs compile tmp/example.tex pdf/example
+    brian2docs parse-log /tmp/brian_debug.log
+
+Only 'build' imports brian2 and the plotting libraries, the other commands start quickly.
+'''
+import os
+import sys
+import json
+import argparse
+
+
+def _find_network(namespace, variable):
+    from brian2 import Network, MagicNetwork, magic_network
+    if variable is not None:
+        if variable not in namespace:
+            raise SystemExit('The script does not define %r' % variable)
+        return namespace[variable]
+    networks = [value for value in namespace.values()
+                if isinstance(value, Network) and not isinstance(value, MagicNetwork)]
+    if not networks:
+        # the script only used run(), i.e. the network of all objects it created
+        return magic_network
+    if len(networks) != 1:
+        raise SystemExit('The script defines %d Network objects, select one with --net' % len(networks))
+    return networks[0]
+
+
+def _load(args):
+    '''
+    the Network and constants of the script, or the saved snapshot, given on the command line
+    '''
+    import runpy
+    from .snapshot import load_snapshot
+
+    script = os.path.abspath(args.script)
+    if script.endswith('.py'):
+        sys.path.insert(0, os.path.dirname(script))
+        namespace = runpy.run_path(script, run_name='__main__')
+        net = _find_network(namespace, args.net)
+        constant_dict = namespace.get(args.constants) if args.constants else None
+    else:
+        net = load_snapshot(script)
+        constant_dict = None
+    name = args.name or os.path.splitext(os.path.basename(script))[0]
+    return net, constant_dict, name
+
+
+def build(args):
+    '''
+    run a script and document the Network it creates, or document a saved snapshot
+    '''
+    from .brian2docs import create_NN_pdf
+    from .cache import BuildCache
+    from .snapshot import save_snapshot
+
+    net, constant_dict, name = _load(args)
+    if args.save_snapshot:
+        save_snapshot(net, args.save_snapshot, args.data_dir)
+    cache = BuildCache(args.cache) if args.cache else None
+    result = create_NN_pdf(net, name, constant_dict, args.log, figure_workers=args.workers, cache=cache,
+                           precompile_preamble=args.precompile_preamble, root=args.root, profile=args.profile)
+    if args.profile:
+        print('profile written to ' + result['profile'])
+    return result['returncode'] or 0
+
+
+def preview(args):
+    '''
+    write the html preview of the Network of a script or of a saved snapshot
+    '''
+    from .preview import create_NN_preview
+    from .cache import BuildCache
+
+    net, constant_dict, name = _load(args)
+    cache = BuildCache(args.cache) if args.cache else None
+    path = create_NN_preview(net, name, constant_dict, args.log, figure_workers=args.workers, cache=cache,
+                             root=args.root, figure_format=args.format)
+    print('preview written to ' + path)
+    return 0
+
+
+def compile_tex(args):
+    '''
+    run latex on a tex file that was generated before
+    '''
+    from .brian2docs import create_pdf, template_preamble
+    from .texbuild import build_format
+
+    output = args.output or os.path.join('pdf', os.path.splitext(os.path.basename(args.tex))[0])
+    fmt = build_format(template_preamble()) if args.precompile_preamble else None
+    result = create_pdf(args.tex, output, fmt, args.max_runs)
+    print('%d latex run(s) in %.1f s, exit status %s' % (result['runs'], result['seconds'], result['returncode']))
+    return result['returncode'] or 0
+
+
+def parse_log(args):
+    '''
+    print the log_dict of a brian2 log as json
+    '''
+    from .brian2docs import generate_log_dict, SIMULATION_STARTED
+
+    stop_at = SIMULATION_STARTED if args.stop_at_run else None
+    json.dump(generate_log_dict(args.log, stop_at), sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='brian2docs', description='pdf documentation of brian2 networks')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    p = commands.add_parser('build', help='run a script and document its Network')
+    p.add_argument('script', help='python script that creates and runs the Network, or a saved snapshot')
+    p.add_argument('--net', help='name of the Network variable of the script, by default the only Network')
+    p.add_argument('--constants', help='name of a dict of the script with the constants to document')
+    p.add_argument('--name', help='name of the document, by default the name of the script')
+    p.add_argument('--log', help='brian2 log of the run, see create_NN_pdf')
+    p.add_argument('--workers', type=int, help='number of processes drawing the figures')
+    p.add_argument('--cache', help='folder of a BuildCache')
+    p.add_argument('--root', help="folder in which 'tmp' and 'pdf' are created")
+    p.add_argument('--precompile-preamble', action='store_true', help='precompile the preamble of the template')
+    p.add_argument('--profile', action='store_true', help='measure every stage, see create_NN_pdf')
+    p.add_argument('--save-snapshot', metavar='PATH', help='also save a snapshot of the Network, see snapshot.py')
+    p.add_argument('--data-dir', help='with --save-snapshot, export the recordings to .npy files in this folder')
+    p.set_defaults(run=build)
+
+    p = commands.add_parser('preview', help='write an html preview of a Network, without latex')
+    p.add_argument('script', help='python script that creates and runs the Network, or a saved snapshot')
+    p.add_argument('--net', help='name of the Network variable of the script, by default the only Network')
+    p.add_argument('--constants', help='name of a dict of the script with the constants to document')
+    p.add_argument('--name', help='name of the preview, by default the name of the script')
+    p.add_argument('--log', help='brian2 log of the run, see create_NN_pdf')
+    p.add_argument('--workers', type=int, help='number of processes drawing the figures')
+    p.add_argument('--cache', help='folder of a BuildCache')
+    p.add_argument('--root', help="folder in which 'tmp' and 'preview' are created")
+    p.add_argument('--format', choices=['svg', 'png'], default='svg', help='format of the figures')
+    p.set_defaults(run=preview)
+
+    p = commands.add_parser('compile', help='run latex on a generated tex file')
+    p.add_argument('tex', help='tex file, e.g. tmp/net.tex')
+    p.add_argument('output', nargs='?', help='output file without .pdf, by default pdf/<name of the tex file>')
+    p.add_argument('--max-runs', type=int, default=3, help='number of latex runs at most')
+    p.add_argument('--precompile-preamble', action='store_true', help='precompile the preamble of the template')
+    p.set_defaults(run=compile_tex)
+
+    p = commands.add_parser('parse-log', help='print the statements found in a brian2 log as json')
+    p.add_argument('log', help='brian2 log file')
+    p.add_argument('--stop-at-run', action='store_true', help='only read the log up to the first run')
+    p.set_defaults(run=parse_log)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
@@ -0,0 +1,125 @@
+'''
+Content of the sections of the documented objects, shared by the latex generators (brian2docs.py)
+and the html preview (preview.py).
+
+Every *_content function describes an object (see snapshot.describe_object), queues the jobs of its
+figures (see figures.submit_figure) and returns a record with what its section shows, so that the two
+formats only differ in how they write it, e.g.
+
+>>> content = synapses_content(syn, figure_jobs, ext='.svg')
+>>> content.figure, content.fan_in
+'''
+from types import SimpleNamespace
+
+from .snapshot import describe_object
+from .index import group_log
+
+
+def _subgroup(source):
+    # the recorded Subgroup, None if a whole group is recorded
+    return source if source.kind == 'Subgroup' else None
+
+
+def neuron_group_content(NG, log_dict, figure_jobs=None, figure_options=None, ext='.pdf'):
+    '''
+    content of a NeuronGroup or SpatialNeuron, with
+        'record': see snapshot.describe_object
+        'events': [(event, condition, statements or None)], the spike event first
+        'morphology': the figure, flattened morphology (see morphology.flatten_morphology), section table,
+            total length of the neurites and total area of a SpatialNeuron, or None
+        'log': the statements of the group and of its Subgroups, see index.group_log
+    log_dict, figure_jobs, figure_options: see brian2docs.generate_ng_latex
+    '''
+    from .figures import morphology_job, submit_figure
+    from .morphology import flatten_morphology, section_table, total_length
+    NG = describe_object(NG)
+
+    events = [(event, NG.events[event], NG.event_codes.get(event, None))
+              for event in sorted(NG.events, key=lambda event: event != 'spike')]
+    morphology = None
+    if NG.kind == 'SpatialNeuron' and NG.morphology is not None:
+        flat = flatten_morphology(NG.morphology)
+        table = section_table(flat)
+        pic_path = 'tmp/' + NG.name + ext
+        submit_figure(morphology_job(NG.morphology, pic_path, figure_options, flat), figure_jobs)
+        morphology = SimpleNamespace(figure=pic_path, flat=flat, table=table, total_length=total_length(flat, table),
+                                     total_area=table['area'].sum())
+    return SimpleNamespace(record=NG, events=events, morphology=morphology, log=group_log(log_dict, NG.name))
+
+
+def synapses_content(syn, figure_jobs=None, figure_options=None, ext='.pdf'):
+    '''
+    content of a Synapses object, with its 'record', the connectivity 'figure', the number of 'sources'
+    and 'targets' and the mean 'fan_in' and 'fan_out'
+    '''
+    from .figures import synapse_job, submit_figure
+    syn = describe_object(syn)
+    pic_path = 'tmp/' + syn.name + ext
+    submit_figure(synapse_job(syn, pic_path, figure_options), figure_jobs)
+    return SimpleNamespace(record=syn, figure=pic_path, sources=syn.source.N, targets=syn.target.N,
+                           fan_in=syn.N / max(syn.target.N, 1), fan_out=syn.N / max(syn.source.N, 1))
+
+
+def state_monitor_content(mon, figure_jobs=None, figure_options=None, ext='.pdf'):
+    '''
+    content of a StateMonitor, with its 'record', the 'figures' as [(path, variables or None)] and
+    the recorded 'subgroup' (or None). None if the monitor does not record any variable.
+
+    Several variables are drawn as one figure with a panel per variable, or as one figure per variable
+    if figure_options['state_layout'] is 'separate'.
+    '''
+    from .figures import state_monitor_job, submit_figure
+    mon = describe_object(mon)
+    if len(mon.record_variables) == 0:
+        return None
+    if len(mon.record_variables) > 1 and figure_options is not None and figure_options.get('state_layout') == 'separate':
+        figures = [('tmp/' + mon.name + '_' + var + ext, [var]) for var in mon.record_variables]
+    else:
+        figures = [('tmp/' + mon.name + ext, None)]
+    for pic_path, var_names in figures:
+        submit_figure(state_monitor_job(mon, pic_path, figure_options, var_names), figure_jobs)
+    return SimpleNamespace(record=mon, figures=figures, subgroup=_subgroup(mon.source))
+
+
+def spike_monitor_content(mon, figure_jobs=None, figure_options=None, ext='.pdf'):
+    '''
+    content of a SpikeMonitor, with its 'record', the raster 'figure' and the recorded 'subgroup' (or None)
+    '''
+    from .figures import spike_monitor_job, submit_figure
+    mon = describe_object(mon)
+    pic_path = 'tmp/' + mon.name + ext
+    submit_figure(spike_monitor_job(mon, pic_path, figure_options), figure_jobs)
+    return SimpleNamespace(record=mon, figure=pic_path, subgroup=_subgroup(mon.source))
+
+
+def poisson_input_content(PI):
+    '''
+    content of a PoissonInput, with its 'record' and the 'rate' as text
+    '''
+    PI = describe_object(PI)
+    return SimpleNamespace(record=PI, rate=PI.rate.in_best_unit())
+
+
+def code_runner_content(CR):
+    '''
+    content of a run_regularly operation, with its 'record' and the clock 'dt' as text
+    '''
+    CR = describe_object(CR)
+    return SimpleNamespace(record=CR, dt=CR.dt.in_best_unit())
+
+
+def constant_items(d):
+    '''
+    the documented constants as [(name, kind, value)]: kind is 'quantity' (value is the quantity in its
+    best unit), 'expression' (value is the string to be parsed by sympy) or 'value' (value is str(value))
+    '''
+    from brian2 import Quantity
+    items = []
+    for key, value in d.items():
+        if isinstance(value, Quantity):
+            items.append((key, 'quantity', value.in_best_unit()))
+        elif isinstance(value, str):
+            items.append((key, 'expression', value))
+        else:
+            items.append((key, 'value', str(value)))
+    return items
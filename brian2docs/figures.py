@@ -0,0 +1,488 @@
+'''
+Figure jobs used by the document generators.
+
+Every figure in the document is described by a "job": a plain dict holding the
+path of the pdf to write and the data needed to draw it. The generators only
+create jobs, so the figures can be drawn one after another in this process or
+be sent to a pool of worker processes running a headless matplotlib backend.
+
+Data exported by snapshot.export_data stays in its files: the jobs hold the ArrayFile
+references, and the drawing functions open the arrays memory mapped (snapshot.load_array).
+The indices of live Synapses are not copied either (snapshot.IndexView).
+'''
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from brian2 import Quantity, ms
+from . import __version__
+from .cache import digest
+from .instrument import instrumented, file_size
+from .snapshot import load_array
+from .morphology import flatten_morphology, morphology_digest, dendrogram_layout
+
+# matplotlib and brian2tools are imported by the drawing functions, so that creating jobs
+# does not load them, and worker processes select their backend before pyplot is imported.
+
+
+# default options of the figure jobs, see create_NN_pdf
+FIGURE_OPTIONS = {
+    'reduce': False,  # reduce the monitor data before plotting
+    'pixel_width': 1000,  # number of time bins of reduced traces and density rasters
+    'spike_density_threshold': 100000,  # with reduce, SpikeMonitors with more spikes are drawn as a density
+    'rasterize': False,  # embed the plotted data as a bitmap instead of vector graphics
+    'dpi': 150,  # resolution of rasterized data
+    'synapse_aggregate_threshold': 1000000,  # Synapses with more connections are drawn as an aggregated view
+    'synapse_blocks': 200,  # maximum number of source and target blocks of the aggregated view
+    'synapse_chunk': 1000000,  # number of connections read at once for the aggregated view
+    'state_layout': 'panels',  # 'panels' or 'separate' figures for StateMonitors recording several variables
+    'morphology_detail_threshold': 2000,  # morphologies with more compartments are drawn by sections
+    'morphology_max_sections': 1000,  # maximum number of sections drawn, deeper branches are collapsed
+}
+
+
+def figure_options(options=None):
+    '''
+    FIGURE_OPTIONS updated with the given dict
+    '''
+    merged = dict(FIGURE_OPTIONS)
+    if options:
+        unknown = set(options) - set(FIGURE_OPTIONS)
+        if unknown:
+            raise ValueError('Unknown figure options: ' + ', '.join(sorted(unknown)))
+        merged.update(options)
+    return merged
+
+
+def _job(kind, pic_path, options, **data):
+    options = figure_options(options)
+    job = {'kind': kind, 'path': pic_path}
+    if options['rasterize']:
+        job['dpi'] = options['dpi']
+    job.update(data)
+    return job
+
+
+def _like(values, reference):
+    # values with the unit of reference, if it has one
+    if isinstance(reference, Quantity):
+        return Quantity(values, dim=reference.dim)
+    return values
+
+
+def envelope(times, values, width):
+    '''
+    min/max envelope of traces sampled at times, values has one row per time step.
+    The samples are split into width bins, every bin is replaced by its minimum and maximum,
+    so a plot of the result covers the same pixels as a plot of all samples.
+    '''
+    n = len(times)
+    if n <= 2 * width:
+        return times, values
+    starts = (np.arange(width) * n) // width
+    data = np.asarray(values)
+    reduced = np.empty((2 * width,) + data.shape[1:], dtype=data.dtype)
+    reduced[0::2] = np.minimum.reduceat(data, starts, axis=0)
+    reduced[1::2] = np.maximum.reduceat(data, starts, axis=0)
+    reduced_times = np.repeat(np.asarray(times)[starts], 2)
+    return _like(reduced_times, times), _like(reduced, values)
+
+
+def spike_density(indices, times, n_neurons, width, chunk=1000000):
+    '''
+    number of spikes per (neuron bin, time bin), with width time bins and at most width // 2 neuron bins.
+    The spikes are read chunk by chunk, so memory mapped recordings are not loaded at once.
+    '''
+    n_neurons = max(int(n_neurons), 1)
+    neuron_bins = max(min(n_neurons, width // 2), 1)
+    t = np.asarray(times)
+    t_min = min(float(t[start:start + chunk].min()) for start in range(0, len(t), chunk))
+    t_max = max(float(t[start:start + chunk].max()) for start in range(0, len(t), chunk))
+    span = t_max - t_min if t_max > t_min else 1.0
+    counts = np.zeros(neuron_bins * width, dtype=np.int64)
+    for start in range(0, len(t), chunk):
+        time_bin = np.minimum(((t[start:start + chunk] - t_min) / span * width).astype(np.int64), width - 1)
+        neuron_bin = (np.asarray(indices[start:start + chunk], dtype=np.int64) * neuron_bins) // n_neurons
+        counts += np.bincount(neuron_bin * width + time_bin, minlength=neuron_bins * width)
+    return counts.reshape(neuron_bins, width), (t_min, t_max)
+
+
+def state_monitor_job(mon, pic_path, options=None, var_names=None):
+    '''
+    job for the graph of a StateMonitor, mon is its record (see snapshot.describe_object).
+    var_names: list of str, optional
+        the variables to draw, all recorded variables by default. Several variables are drawn as
+        panels below each other that share the time axis, every recorded array is read once.
+    '''
+    if var_names is None:
+        var_names = mon.record_variables
+    options = figure_options(options)
+    recorded_times = mon.t
+    panels = []
+    for var_name in var_names:
+        times, values = recorded_times, mon.values[var_name]
+        if options['reduce']:
+            times, values = envelope(load_array(times), load_array(values), options['pixel_width'])
+        panels.append((var_name, values))
+    if len(panels) == 1:
+        return _job('state', pic_path, options, times=times, values=panels[0][1], var_name=panels[0][0])
+    return _job('state_panels', pic_path, options, times=times, panels=panels)
+
+
+def spike_monitor_job(mon, pic_path, options=None):
+    '''
+    job for the raster plot of a SpikeMonitor record, drawn as a spike density if options['reduce'] is set
+    and there are more than options['spike_density_threshold'] spikes
+    '''
+    options = figure_options(options)
+    if getattr(mon, 'density', None) is not None:
+        # summary kept by a checkpoint.Checkpoint
+        counts, time_range = mon.density
+        return _job('spike_density', pic_path, options, counts=counts, time_range=time_range,
+                    n_neurons=mon.source.N)
+    indices = mon.i
+    times = mon.t
+    if options['reduce'] and len(indices) > options['spike_density_threshold']:
+        counts, time_range = spike_density(load_array(indices), load_array(times), mon.source.N,
+                                           options['pixel_width'], options['synapse_chunk'])
+        return _job('spike_density', pic_path, options, counts=counts, time_range=time_range,
+                    n_neurons=mon.source.N)
+    return _job('raster', pic_path, options, indices=indices, times=times)
+
+
+def aggregate_connectivity(sources, targets, n_sources, n_targets, blocks, chunk):
+    '''
+    sources, targets: presynaptic and postsynaptic indices of the connections, any sliceable sequence
+    of equal length (e.g. the i and j variables of a Synapses object)
+
+    The indices are read chunk by chunk. Returns the number of connections between every
+    source block and target block (at most blocks x blocks), and the distributions of the out-degree
+    (fan-out) of the sources and of the in-degree (fan-in) of the targets, i.e. the number of
+    neurons that have 0, 1, 2, ... connections.
+    '''
+    n_sources = max(int(n_sources), 1)
+    n_targets = max(int(n_targets), 1)
+    source_blocks = min(n_sources, blocks)
+    target_blocks = min(n_targets, blocks)
+    density = np.zeros(source_blocks * target_blocks, dtype=np.int64)
+    out_degree = np.zeros(n_sources, dtype=np.int64)
+    in_degree = np.zeros(n_targets, dtype=np.int64)
+    for start in range(0, len(sources), chunk):
+        i = np.asarray(sources[start:start + chunk], dtype=np.int64)
+        j = np.asarray(targets[start:start + chunk], dtype=np.int64)
+        out_degree += np.bincount(i, minlength=n_sources)
+        in_degree += np.bincount(j, minlength=n_targets)
+        block = (i * source_blocks // n_sources) * target_blocks + j * target_blocks // n_targets
+        density += np.bincount(block, minlength=len(density))
+    return (density.reshape(source_blocks, target_blocks),
+            np.bincount(out_degree), np.bincount(in_degree))
+
+
+def synapse_job(syn, pic_path, options=None):
+    '''
+    job for the connectivity graph of a Synapses record, the plot type is chosen like brian_plot does.
+    Above options['synapse_aggregate_threshold'] connections, a block density of the connectivity
+    and the in- and out-degree distributions are drawn instead of the single connections.
+    '''
+    options = figure_options(options)
+    if syn.N > options['synapse_aggregate_threshold']:
+        density, out_degrees, in_degrees = aggregate_connectivity(load_array(syn.i), load_array(syn.j),
+                                                                  syn.source.N, syn.target.N,
+                                                                  options['synapse_blocks'],
+                                                                  options['synapse_chunk'])
+        return _job('synapse_density', pic_path, options, density=density, out_degrees=out_degrees,
+                    in_degrees=in_degrees, n_sources=syn.source.N, n_targets=syn.target.N)
+
+    if syn.N == 0:
+        raise TypeError('Synapses object does not have any synapses.')
+    sources = np.asarray(load_array(syn.i))
+    targets = np.asarray(load_array(syn.j))
+    source_range = np.max(sources) - np.min(sources)
+    target_range = np.max(targets) - np.min(targets)
+    if source_range < 1000 and target_range < 1000:
+        plot_type = 'image'
+    elif len(sources) < 10000:
+        plot_type = 'scatter'
+    else:
+        plot_type = 'hexbin'
+    return _job('synapses', pic_path, options, sources=syn.i, targets=syn.j, plot_type=plot_type)
+
+
+def morphology_job(morpho, pic_path, options=None, flat=None):
+    '''
+    job for the dendrogram of a morphology, described by snapshot.describe_morphology.
+    Above options['morphology_detail_threshold'] compartments, the dendrogram has one line per section
+    (see morphology.dendrogram_layout) instead of being drawn by brian2tools.
+    flat: the flattened morphology, if it was already computed (see morphology.flatten_morphology)
+
+    The key of the job is the digest of the morphology, so neurons with the same morphology share one figure.
+    '''
+    options = figure_options(options)
+    if flat is None:
+        flat = flatten_morphology(morpho)
+    if flat['n'].sum() <= options['morphology_detail_threshold']:
+        job = _job('morphology', pic_path, options, morphology=morpho)
+    else:
+        job = _job('dendrogram', pic_path, options, **dendrogram_layout(flat, options['morphology_max_sections']))
+    job['key'] = digest(__version__, morphology_digest(morpho), job['kind'], job.get('dpi'),
+                        options['morphology_max_sections'], os.path.splitext(pic_path)[1])
+    return job
+
+
+def job_fingerprint(job):
+    '''
+    key of the figure in the build cache, it depends on the data of the job, the format of the file
+    (e.g. .pdf or .svg) and the version of brian2docs but not on its path
+    '''
+    return digest(__version__, dict((k, v) for k, v in job.items() if k not in ('path', 'key')),
+                  os.path.splitext(job['path'])[1])
+
+
+def _plot_state(times, values, var_name, axes=None):
+    # plot_state divides the values by their unit in place. It gets a copy, so that the arrays of the
+    # records are not changed and read-only memory mapped recordings can be drawn.
+    from brian2tools import plot_state
+    plot_state(load_array(times), load_array(values).copy(), var_name=var_name, axes=axes)
+
+
+def _draw_state(job):
+    _plot_state(job['times'], job['values'], job['var_name'])
+
+
+def _draw_spike_density(job):
+    from matplotlib import pyplot as plt
+    t_min, t_max = job['time_range']
+    plt.imshow(job['counts'], aspect='auto', origin='lower', interpolation='nearest', cmap='gray_r',
+               extent=(t_min / float(ms), t_max / float(ms), 0, job['n_neurons']))
+    plt.colorbar(label='spikes per bin')
+    plt.xlabel('time (ms)')
+    plt.ylabel('neuron index')
+
+
+def _draw_state_panels(job):
+    from matplotlib import pyplot as plt
+    fig, axes = plt.subplots(len(job['panels']), 1, sharex=True, squeeze=False,
+                             figsize=(6.4, 1.0 + 1.8 * len(job['panels'])))
+    times = load_array(job['times'])
+    for panel_axes, (var_name, values) in zip(axes[:, 0], job['panels']):
+        _plot_state(times, values, var_name, panel_axes)
+    for panel_axes in axes[:-1, 0]:
+        panel_axes.set_xlabel('')
+    fig.tight_layout()
+
+
+def _draw_raster(job):
+    from brian2tools import plot_raster
+    plot_raster(load_array(job['indices']), load_array(job['times']))
+
+
+def _draw_synapses(job):
+    from brian2tools import plot_synapses
+    plot_synapses(np.asarray(load_array(job['sources'])), np.asarray(load_array(job['targets'])),
+                  plot_type=job['plot_type'])
+
+
+def _draw_synapse_density(job):
+    from matplotlib import pyplot as plt
+    fig, (density_axes, out_axes, in_axes) = plt.subplots(1, 3, figsize=(15, 4.5))
+    image = density_axes.imshow(job['density'].T, aspect='auto', origin='lower', interpolation='nearest',
+                                cmap='gray_r', extent=(0, job['n_sources'], 0, job['n_targets']))
+    fig.colorbar(image, ax=density_axes, label='synapses per block')
+    density_axes.set_xlabel('source neuron index')
+    density_axes.set_ylabel('target neuron index')
+    for axes, degrees, label, neurons in [(out_axes, job['out_degrees'], 'out-degree (fan-out)', 'source'),
+                                          (in_axes, job['in_degrees'], 'in-degree (fan-in)', 'target')]:
+        axes.bar(np.arange(len(degrees)), degrees, width=1.0, color='gray')
+        axes.set_xlabel(label)
+        axes.set_ylabel('number of %s neurons' % neurons)
+    fig.tight_layout()
+
+
+def _draw_morphology(job):
+    from brian2tools import plot_dendrogram
+    from .snapshot import build_morphology
+    plot_dendrogram(build_morphology(job['morphology']))
+
+
+def _draw_dendrogram(job):
+    from matplotlib import pyplot as plt
+    from matplotlib.collections import LineCollection
+    fig, axes = plt.subplots()
+    um = np.array([1, 1e6])
+    axes.add_collection(LineCollection(job['sections'] * um, colors='black', linewidths=1.0))
+    axes.add_collection(LineCollection(job['connectors'] * um, colors='black', linewidths=0.5))
+    axes.add_collection(LineCollection(job['collapsed'] * um, colors='gray', linewidths=1.0, linestyles='dashed'))
+    axes.autoscale()
+    axes.set_xticks([])
+    axes.set_ylabel('distance from the root ($\\mu$m)')
+    if job['n_hidden']:
+        axes.set_title('%d sections below depth %d are drawn as their longest branch (dashed)'
+                       % (job['n_hidden'], job['max_depth']), fontsize='small')
+
+
+_draw = {'state': _draw_state,
+         'state_panels': _draw_state_panels,
+         'raster': _draw_raster,
+         'spike_density': _draw_spike_density,
+         'synapses': _draw_synapses,
+         'synapse_density': _draw_synapse_density,
+         'morphology': _draw_morphology,
+         'dendrogram': _draw_dendrogram}
+
+
+def render_figure(job):
+    '''
+    draw a single figure job and save it to job['path']
+    '''
+    from matplotlib import pyplot as plt
+    plt.close()
+    _draw[job['kind']](job)
+    if 'dpi' in job:
+        # lines, collections and images are drawn below this zorder, axes and labels above it
+        for axes in plt.gcf().axes:
+            axes.set_rasterization_zorder(2.1)
+        plt.savefig(job['path'], dpi=job['dpi'])
+    else:
+        plt.savefig(job['path'])
+    plt.close()
+
+    return job['path']
+
+
+def submit_figure(job, figure_jobs=None):
+    '''
+    render the job immediately, or queue it in figure_jobs to be rendered later by render_figures
+    '''
+    if figure_jobs is None:
+        render_figure(job)
+    else:
+        figure_jobs.append(job)
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+class FigureRenderer(object):
+    '''
+    draws figure jobs while the document is generated, e.g.
+
+    >>> with FigureRenderer(workers=4, cache=cache) as renderer:
+    ...     for obj in objects:
+    ...         obj_jobs = []
+    ...         text = generate_object_latex(obj, log_dict, obj_jobs)
+    ...         renderer.submit(obj_jobs)
+
+    workers, cache: see render_figures
+    root: str, optional
+        folder the paths of the jobs are relative to, by default the current directory
+
+    A job is released once its figure is saved, and at most 2 * workers jobs wait for the pool, so
+    only the data of the figures of the last few objects is held at a time. Jobs with the key of an
+    earlier job are copied from its figure when the renderer is closed. Leaving the with block
+    does not close it again if close was already called and nothing was submitted since.
+    '''
+
+    def __init__(self, workers=None, cache=None, root=None):
+        self.workers = workers if workers and workers > 1 else None
+        self.cache = cache
+        self.root = root
+        self.paths = []  # the paths of all submitted jobs
+        self._pool = None
+        self._pending = deque()  # (future, key, path) of the jobs sent to the pool
+        self._first = {}  # key: path of the first job with the key
+        self._copies = []  # (path of the first job, path of a job with the same key)
+        self._closed = True  # nothing submitted since the last close
+
+    @instrumented('render_figures', size=lambda result, arguments: None, obj=False)
+    def submit(self, figure_jobs):
+        '''
+        draw the jobs, or send them to the pool
+        '''
+        self._closed = False
+        for job in figure_jobs:
+            if self.cache is not None and 'key' not in job:
+                job['key'] = job_fingerprint(job)
+            if self.root is not None:
+                job = dict(job, path=os.path.join(self.root, job['path']))
+            self.paths.append(job['path'])
+            key = job.get('key')
+            if key is not None:
+                if key in self._first:
+                    self._copies.append((self._first[key], job['path']))
+                    continue
+                self._first[key] = job['path']
+                if self.cache is not None and self.cache.get_file('figure', key, job['path']):
+                    continue
+            if self.workers is None:
+                render_figure(job)
+                self._done(key, job['path'])
+                continue
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            while len(self._pending) >= 2 * self.workers:
+                self._wait()
+            self._pending.append((self._pool.submit(render_figure, job), key, job['path']))
+
+    def _done(self, key, path):
+        if self.cache is not None and key is not None:
+            self.cache.put_file('figure', key, path)
+
+    def _wait(self):
+        future, key, path = self._pending.popleft()
+        future.result()
+        self._done(key, path)
+
+    @instrumented('render_figures',
+                  size=lambda result, arguments: sum(file_size(path) or 0 for path in arguments['self'].paths),
+                  obj=False)
+    def close(self):
+        '''
+        wait for the pool and copy the figures of duplicate jobs
+        '''
+        try:
+            while self._pending:
+                self._wait()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        for source, path in self._copies:
+            shutil.copyfile(source, path)
+        self._copies = []
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            if not self._closed:
+                self.close()
+        elif self._pool is not None:
+            # the figures of a failed document are not needed
+            self._pool.shutdown()
+            self._pool = None
+
+
+def render_figures(figure_jobs, workers=None, cache=None, root=None):
+    '''
+    figure_jobs: list of jobs created by the *_job functions
+    workers: int, optional
+        number of worker processes. None, 0 or 1 draws every figure in this process.
+    cache: BuildCache, optional
+        figures found in the cache are copied instead of being drawn, new figures are added to it.
+        Jobs with the same data are drawn only once. Without a cache this holds for jobs that come with
+        a 'key', e.g. the dendrograms of identical morphologies.
+    root: str, optional
+        folder the paths of the jobs are relative to, by default the current directory
+
+    Only the figure files are produced here, the latex fragments referring to them are
+    written by the generators, so the order of the rendering does not affect the tex file.
+    To draw the figures while the jobs are still being created, use a FigureRenderer.
+    '''
+    with FigureRenderer(workers if len(figure_jobs) > 1 else None, cache, root) as renderer:
+        renderer.submit(figure_jobs)
@@ -0,0 +1,97 @@
+'''
+Index of the documented objects of a network, built in one pass over net.objects.
+
+The generators look objects, subgroups and log statements up in the index instead of walking
+net.objects or the keys of the log_dict again for every object, e.g.
+
+>>> index = index_network(net, generate_log_dict('brian_debug.log'))
+>>> index.by_kind['NeuronGroup'], index.parents['neurongroup_subgroup'], group_log(index, 'neurongroup')
+'''
+import re
+from collections import defaultdict
+from types import SimpleNamespace
+
+from .snapshot import describe_object
+
+# default name of a Subgroup, e.g. 'neurongroup_subgroup_1' of 'neurongroup'
+_subgroup_name = re.compile('(.*)_subgroup(_[0-9]+)?$')
+
+
+def is_index(obj):
+    return getattr(obj, 'kind', None) == 'NetworkIndex'
+
+
+def _attached_groups(record):
+    if record.kind == 'Synapses':
+        return [record.source, record.target]
+    if record.kind in ('StateMonitor', 'SpikeMonitor'):
+        return [record.source]
+    if record.kind in ('PoissonInput', 'CodeRunner'):
+        return [record.group]
+    return []
+
+
+def _owner(key, names, parents):
+    '''
+    name of the object the log entries of the group key belong to: the group itself, or the
+    NeuronGroup of a Subgroup
+    '''
+    if key in names:
+        return key
+    if key in parents:
+        return parents[key]
+    match = _subgroup_name.match(key)
+    # Subgroups that no object of the network refers to are only known by their name
+    return match.group(1) if match else key
+
+
+def index_network(net, log_dict=None, data=True):
+    '''
+    index of a Network (or of a snapshot, see snapshot.describe_network), a record with
+        'name': name of the network
+        'objects': the records of the documented objects, in the order of net.objects
+        'by_kind': {kind: [records]}
+        'by_name': {name: record}
+        'parents': {name of a Subgroup: name of its NeuronGroup}
+        'log': {name of a group: [(key, statements)]}, the entries of log_dict (see generate_log_dict)
+            of the group and of its Subgroups, in the order of the log
+    An index is returned unchanged.
+
+    data: bool
+        see snapshot.describe_object
+    '''
+    if is_index(net):
+        return net
+    objects = []
+    by_kind = defaultdict(list)
+    by_name = {}
+    parents = {}
+    for obj in net.objects:
+        record = describe_object(obj, data)
+        if record is None:
+            continue
+        objects.append(record)
+        by_kind[record.kind].append(record)
+        by_name[record.name] = record
+        for group in _attached_groups(record):
+            if group.kind == 'Subgroup':
+                parents[group.name] = group.source.name
+
+    log = defaultdict(list)
+    if log_dict is not None:
+        for key, statements in log_dict.items():
+            log[_owner(key, by_name, parents)].append((key, statements))
+    return SimpleNamespace(kind='NetworkIndex', name=net.name, objects=objects, by_kind=dict(by_kind),
+                           by_name=by_name, parents=parents, log=dict(log))
+
+
+def group_log(log, name):
+    '''
+    the (key, statements) of the log entries of the group name and of its Subgroups.
+    log is an index, or a log_dict that is then searched key by key.
+    '''
+    if log is None:
+        return []
+    if is_index(log):
+        return log.log.get(name, [])
+    return [(key, statements) for key, statements in log.items() if _owner(key, (name,), {}) == name]
@@ -0,0 +1,203 @@
+'''
+Instrumentation of the stages of the documentation pipeline.
+
+The functions of the pipeline are wrapped by instrumented(). While no tracer is registered
+the wrapper only checks that the list of tracers is empty and calls the function. Otherwise
+every call is measured and passed to the tracers as an event dict with the keys
+
+    'stage': name of the stage, e.g. 'generate_syn_latex'
+    'object': name of the documented object, or None
+    'parent': stage the call was made from, or None
+    'depth': number of enclosing stages
+    'start': time.time() at the start of the call
+    'wall_seconds', 'cpu_seconds': time spent in the call, including the stages called from it
+    'max_rss_bytes': peak resident memory of the process so far
+    'output_bytes': size of the output (latex text or written file), or None
+    'error': repr of the exception raised by the call, or None
+
+Profile collects the events into a report that can be written as json or added to the pdf,
+see the profile argument of create_NN_pdf.
+'''
+import os
+import sys
+import json
+import time
+import inspect
+import functools
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+_tracers = []
+_stack = []
+
+
+def add_tracer(tracer):
+    '''
+    call tracer(event) at the end of every instrumented stage, see the module documentation
+    '''
+    _tracers.append(tracer)
+
+
+def remove_tracer(tracer):
+    if tracer in _tracers:
+        _tracers.remove(tracer)
+
+
+def max_rss():
+    '''
+    peak resident memory of this process in bytes, None if it is not available
+    '''
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def file_size(path):
+    path = path.strip('{}')
+    return os.path.getsize(path) if os.path.exists(path) else None
+
+
+def text_size(text, arguments=None):
+    if isinstance(text, list):
+        return sum(len(line) for line in text)
+    return len(text) if isinstance(text, str) else None
+
+
+def instrumented(stage, size=text_size, obj=True):
+    '''
+    decorator reporting the calls of a function as stage to the tracers
+
+    size: function (result, arguments) -> int, size of the output of a call. arguments maps the names
+        of the parameters of the function to their values in the call, including the defaults
+    obj: whether the first argument is the documented object
+    '''
+    def decorator(function):
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwds):
+            if not _tracers:
+                return function(*args, **kwds)
+            event = {'stage': stage, 'object': getattr(args[0], 'name', None) if obj and args else None,
+                     'parent': _stack[-1] if _stack else None, 'depth': len(_stack), 'start': time.time(),
+                     'output_bytes': None, 'error': None}
+            _stack.append(stage)
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            result = None
+            try:
+                result = function(*args, **kwds)
+                return result
+            except BaseException as e:
+                event['error'] = repr(e)
+                raise
+            finally:
+                event['wall_seconds'] = time.perf_counter() - wall
+                event['cpu_seconds'] = time.process_time() - cpu
+                _stack.pop()
+                event['max_rss_bytes'] = max_rss()
+                if event['error'] is None:
+                    arguments = signature.bind(*args, **kwds)
+                    arguments.apply_defaults()
+                    event['output_bytes'] = size(result, arguments.arguments)
+                for tracer in list(_tracers):
+                    tracer(event)
+        return wrapper
+    return decorator
+
+
+class Profile(object):
+    '''
+    Tracer collecting the events of the stages, e.g.
+
+    >>> with Profile() as profile:
+    ...     create_NN_pdf(net)
+    >>> print(profile.summary())
+    '''
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def __enter__(self):
+        add_tracer(self)
+        return self
+
+    def __exit__(self, *exc):
+        remove_tracer(self)
+
+    def stages(self):
+        '''
+        totals of every stage: {stage: {'calls', 'wall_seconds', 'cpu_seconds', 'output_bytes', 'max_rss_bytes'}}
+        '''
+        totals = OrderedDict()
+        for event in self.events:
+            total = totals.setdefault(event['stage'], {'calls': 0, 'wall_seconds': 0., 'cpu_seconds': 0.,
+                                                       'output_bytes': 0, 'max_rss_bytes': 0})
+            total['calls'] += 1
+            total['wall_seconds'] += event['wall_seconds']
+            total['cpu_seconds'] += event['cpu_seconds']
+            total['output_bytes'] += event['output_bytes'] or 0
+            total['max_rss_bytes'] = max(total['max_rss_bytes'], event['max_rss_bytes'] or 0)
+        return totals
+
+    def objects(self, n=None):
+        '''
+        events of the documented objects, the slowest first
+        '''
+        events = sorted((event for event in self.events if event['object'] is not None),
+                        key=lambda event: -event['wall_seconds'])
+        return events if n is None else events[:n]
+
+    def report(self):
+        return {'stages': self.stages(), 'events': self.events}
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def summary(self):
+        '''
+        table of the stages as text
+        '''
+        lines = ['%-30s %6s %10s %10s %12s' % ('stage', 'calls', 'wall (s)', 'cpu (s)', 'output (B)')]
+        for stage, total in self.stages().items():
+            lines.append('%-30s %6d %10.3f %10.3f %12d' % (stage, total['calls'], total['wall_seconds'],
+                                                           total['cpu_seconds'], total['output_bytes']))
+        return '\n'.join(lines)
+
+    def latex(self, n_objects=10):
+        '''
+        section of the document with the stages and the slowest objects
+        '''
+        def escape(text):
+            return str(text).replace('\\', '/').replace('_', '\\_')
+
+        text = ['\\section{Documentation Profile}',
+                '\\begin{tabular}{lrrrr}',
+                '\\textbf{stage} & \\textbf{calls} & \\textbf{wall (s)} & \\textbf{cpu (s)} & \\textbf{output (kB)} \\\\',
+                '\\hline']
+        for stage, total in self.stages().items():
+            text.append('%s & %d & %.3f & %.3f & %.1f \\\\' % (escape(stage), total['calls'], total['wall_seconds'],
+                                                                total['cpu_seconds'], total['output_bytes'] / 1e3))
+        text.append('\\end{tabular}')
+        objects = self.objects(n_objects)
+        if objects:
+            text += ['', '\\textbf{Slowest objects:}', '\\begin{tabular}{llr}',
+                     '\\textbf{object} & \\textbf{stage} & \\textbf{wall (s)} \\\\', '\\hline']
+            for event in objects:
+                text.append('%s & %s & %.3f \\\\' % (escape(event['object']), escape(event['stage']),
+                                                      event['wall_seconds']))
+            text.append('\\end{tabular}')
+        rss = max([event['max_rss_bytes'] or 0 for event in self.events] or [0])
+        if rss:
+            text += ['', 'Peak resident memory: %.1f MB' % (rss / 1e6)]
+        return '\n'.join(text)
@@ -0,0 +1,142 @@
+'''
+Documentation of the morphology of a SpatialNeuron.
+
+The morphology, described by snapshot.describe_morphology, is flattened once into arrays with one
+entry per section and per compartment, so that the summary table and the dendrogram are computed
+with numpy over all sections at once instead of walking the tree compartment by compartment.
+Lengths are in metres and areas in square metres.
+'''
+import numpy as np
+
+from .cache import digest
+
+
+def flatten_morphology(morpho):
+    '''
+    the sections of a morphology in depth first order, as a dict of arrays:
+    'name' (path of the section, e.g. 'dend.L'), 'class', 'type', 'parent' (index, -1 for the root),
+    'depth', 'n' (number of compartments), 'first' (index of the first compartment of the section),
+    and per compartment 'length', 'start_diameter' and 'end_diameter'
+    '''
+    names, classes, types, parents, depths, counts = [], [], [], [], [], []
+    lengths, starts, ends = [], [], []
+    stack = [('root', morpho, -1, 0)]
+    while stack:
+        name, section, parent, depth = stack.pop()
+        index = len(names)
+        names.append(name)
+        classes.append(section['class'])
+        types.append(section['type'])
+        parents.append(parent)
+        depths.append(depth)
+        counts.append(section['n'])
+        if section['class'] == 'Soma':
+            # the area of a sphere is the lateral area of a cylinder as long as its diameter
+            diameter = np.asarray(section['diameter'], dtype=float)
+            lengths.append(diameter)
+            starts.append(diameter)
+            ends.append(diameter)
+        elif section['class'] == 'Cylinder':
+            diameter = np.asarray(section['diameter'], dtype=float)
+            lengths.append(np.asarray(section['length'], dtype=float))
+            starts.append(diameter)
+            ends.append(diameter)
+        else:
+            lengths.append(np.asarray(section['length'], dtype=float))
+            starts.append(np.asarray(section['start_diameter'], dtype=float))
+            ends.append(np.asarray(section['end_diameter'], dtype=float))
+        prefix = '' if name == 'root' else name + '.'
+        for child_name, child in reversed(section['children']):
+            stack.append((prefix + child_name, child, index, depth + 1))
+    counts = np.array(counts, dtype=np.int64)
+    return {'name': names, 'class': classes, 'type': types,
+            'parent': np.array(parents, dtype=np.int64), 'depth': np.array(depths, dtype=np.int64), 'n': counts,
+            'first': np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64),
+            'length': np.concatenate(lengths), 'start_diameter': np.concatenate(starts),
+            'end_diameter': np.concatenate(ends)}
+
+
+def section_table(flat):
+    '''
+    per section: 'length' (total), 'area' (total lateral area of the compartments, the surface of a soma),
+    'min_diameter' and 'max_diameter', as arrays in the order of flat (see flatten_morphology)
+    '''
+    length, d1, d2 = flat['length'], flat['start_diameter'], flat['end_diameter']
+    # truncated cones, like the area of brian2.Section
+    area = np.pi / 2 * (d1 + d2) * np.sqrt(((d1 - d2) / 2) ** 2 + length ** 2)
+    first = flat['first']
+    return {'length': np.add.reduceat(length, first), 'area': np.add.reduceat(area, first),
+            'min_diameter': np.minimum.reduceat(np.minimum(d1, d2), first),
+            'max_diameter': np.maximum.reduceat(np.maximum(d1, d2), first)}
+
+
+def total_length(flat, table):
+    '''
+    summed length of the sections that are not a Soma, the length of a soma in section_table is its diameter
+    '''
+    neurites = np.array([cls != 'Soma' for cls in flat['class']], dtype=bool)
+    return table['length'][neurites].sum()
+
+
+def morphology_digest(morpho):
+    '''
+    fingerprint of a morphology, identical morphologies of different neurons or runs have the same one
+    '''
+    return digest('morphology', morpho)
+
+
+def dendrogram_layout(flat, max_sections):
+    '''
+    line segments of a dendrogram with one vertical line per section, at most max_sections of them.
+    The tree is cut at the deepest level that keeps max_sections sections, the line of a section
+    whose children are cut reaches down to the end of its longest branch.
+    Returns a dict with 'sections' and 'collapsed' (arrays of segments ((x0, y0), (x1, y1)),
+    collapsed holds the parts of the lines that stand for cut branches), 'connectors' (the horizontal
+    lines joining the children of a section), 'max_depth' and 'n_hidden' (number of sections cut).
+    '''
+    parent, depth = flat['parent'], flat['depth']
+    length = section_table(flat)['length']
+    n = len(parent)
+    levels = np.bincount(depth)
+    max_depth = int(np.searchsorted(np.cumsum(levels), max_sections, side='right')) - 1
+    max_depth = min(max(max_depth, 0), len(levels) - 1)
+
+    # length of the longest branch below every section
+    below = np.zeros(n)
+    for level in range(len(levels) - 1, 0, -1):
+        index = np.flatnonzero(depth == level)
+        np.maximum.at(below, parent[index], length[index] + below[index])
+
+    kept = depth <= max_depth
+    has_kept_children = np.zeros(n, dtype=bool)
+    has_kept_children[parent[kept & (parent >= 0)]] = True
+    leaves = kept & ~has_kept_children
+    # leaves are placed from left to right in depth first order, sections above the middle of their children
+    x = np.zeros(n)
+    x[leaves] = np.arange(np.count_nonzero(leaves))
+    x_min = np.full(n, np.inf)
+    x_max = np.full(n, -np.inf)
+    for level in range(max_depth, 0, -1):
+        index = np.flatnonzero(depth == level)
+        np.minimum.at(x_min, parent[index], x[index])
+        np.maximum.at(x_max, parent[index], x[index])
+        parents = np.unique(parent[index])
+        x[parents] = (x_min[parents] + x_max[parents]) / 2
+
+    y_start = np.zeros(n)
+    for level in range(1, max_depth + 1):
+        index = np.flatnonzero(depth == level)
+        y_start[index] = y_start[parent[index]] + length[parent[index]]
+    y_end = y_start + length
+
+    index = np.flatnonzero(kept)
+    sections = np.stack([np.stack([x[index], y_start[index]], axis=1),
+                         np.stack([x[index], y_end[index]], axis=1)], axis=1)
+    cut = np.flatnonzero(kept & (depth == max_depth) & (below > 0))
+    collapsed = np.stack([np.stack([x[cut], y_end[cut]], axis=1),
+                          np.stack([x[cut], y_end[cut] + below[cut]], axis=1)], axis=1)
+    joined = np.flatnonzero(has_kept_children)
+    connectors = np.stack([np.stack([x_min[joined], y_end[joined]], axis=1),
+                           np.stack([x_max[joined], y_end[joined]], axis=1)], axis=1)
+    return {'sections': sections, 'collapsed': collapsed, 'connectors': connectors, 'max_depth': max_depth,
+            'n_hidden': int(n - len(index))}
@@ -0,0 +1,286 @@
+'''
+Preview of a Network as a single html file, without latex.
+
+The preview documents the same records (see snapshot.py) with the same figure jobs and network graph as
+the pdf, the figures are saved as svg (or png) and embedded into the page, and equations are written as
+MathML, so the page needs no scripts or network access. By default the monitor data is reduced before plotting (see figures.FIGURE_OPTIONS),
+so that a preview of a large network is ready in a second or two, e.g.
+
+>>> create_NN_preview(net, 'net')  # writes preview/net.html
+'''
+import os
+import re
+import base64
+from html import escape
+
+from .brian2docs import (generate_network_graph, generate_log_dict, mathml_equations, mathml_expression,
+                         document_template, root_path)
+from .content import (neuron_group_content, synapses_content, state_monitor_content, spike_monitor_content,
+                      poisson_input_content, code_runner_content, constant_items)
+from .instrument import instrumented, file_size
+from .snapshot import describe_object, load_snapshot
+from .index import index_network
+
+# figure options of the preview, the options given to create_NN_preview are applied on top of them
+PREVIEW_FIGURE_OPTIONS = {'reduce': True}
+
+def _code(code):
+    return '<pre><code>' + escape('\n'.join(line.strip() for line in code.split('\n'))) + '</code></pre>'
+
+
+def _math(mathml):
+    return '<div class="math"><math display="block">' + mathml + '</math></div>'
+
+
+def _figure(pic_path):
+    # replaced by the figure once it is rendered, see embed_figure
+    return '<!--figure:' + pic_path + '-->'
+
+
+_figure_marker = re.compile('<!--figure:(.*?)-->')
+
+
+def _section(kind, name, items, intro=''):
+    text = ['<section id="%s">' % escape(name), '<h2>%s <code>%s</code></h2>' % (kind, escape(name))]
+    if intro:
+        text.append('<p>' + intro + '</p>')
+    text.append('<dl>')
+    for title, value in items:
+        text.append('<dt>%s</dt><dd>%s</dd>' % (title, value))
+    text.append('</dl>')
+    text.append('</section>')
+    return '\n'.join(text)
+
+
+def _subgroup_note(subgroup):
+    if subgroup is not None:
+        return 'Records a subgroup from %d to %d.' % (subgroup.start, subgroup.stop)
+    return ''
+
+
+def embed_figure(path):
+    '''
+    html of a figure file: the svg itself, or an img with the png as data url
+    '''
+    if path.endswith('.svg'):
+        with open(path, 'r') as f:
+            svg = f.read()
+        return '<div class="figure">' + svg[svg.find('<svg'):] + '</div>'
+    with open(path, 'rb') as f:
+        data = base64.b64encode(f.read()).decode('ascii')
+    return '<div class="figure"><img src="data:image/png;base64,%s"></div>' % data
+
+
+@instrumented('generate_ng_html')
+def generate_ng_html(NG, log_dict, figure_jobs=None, figure_options=None, ext='.svg'):
+    from brian2 import Quantity
+    content = neuron_group_content(NG, log_dict, figure_jobs, figure_options, ext)
+    NG = content.record
+
+    items = [('Model', _math(mathml_equations(NG.equations)))]
+    for event, condition, statements in content.events:
+        if event == 'spike':
+            value = 'Threshold condition:' + _code(str(condition))
+            if statements is not None:
+                value += 'Reset statement(s):' + _code(str(statements))
+            items.append(('Spiking behaviour', value))
+        else:
+            value = 'Event condition:' + _code(str(condition))
+            if statements is not None:
+                value += 'Executed statement(s):' + _code(str(statements))
+            items.append(('Event ' + escape(event), value))
+    if isinstance(NG.refractory, Quantity):
+        items.append(('Refractory', escape(NG.refractory.in_best_unit())))
+    else:
+        items.append(('Refractory', _code(str(NG.refractory))))
+    method = ' '.join(NG.method_choice) if isinstance(NG.method_choice, tuple) else NG.method_choice
+    items.append(('Numerical integration method', escape(str(method))))
+
+    if NG.kind == 'SpatialNeuron':
+        items.append(('Cm', escape(NG.Cm[0].in_best_unit())))
+        items.append(('Ri', escape('%s %s' % (NG.Ri[0], NG.Ri_dispname))))
+        morphology = content.morphology
+        if morphology is not None:
+            flat, table = morphology.flat, morphology.table
+            rows = ['<table><tr><th>section</th><th>type</th><th>class</th><th>n</th><th>length (&mu;m)</th>'
+                    '<th>area (&mu;m&sup2;)</th><th>diameter (&mu;m)</th></tr>']
+            for i, name in enumerate(flat['name']):
+                low, high = table['min_diameter'][i] * 1e6, table['max_diameter'][i] * 1e6
+                diameter = '%.2f' % low if abs(high - low) < 1e-9 else '%.2f&ndash;%.2f' % (low, high)
+                rows.append('<tr><td>%s</td><td>%s</td><td>%s</td><td>%d</td><td>%.2f</td><td>%.2f</td><td>%s</td></tr>'
+                            % (escape(name), escape(str(flat['type'][i] or '')), flat['class'][i], flat['n'][i],
+                               table['length'][i] * 1e6, table['area'][i] * 1e12, diameter))
+            rows.append('</table>')
+            items.append(('Morphology', _figure(morphology.figure) +
+                          '<p>%s, %d sections, %d compartments, total length of the neurites %.2f &mu;m, '
+                          'total area %.2f &mu;m&sup2;</p>'
+                          % (NG.morphology['class'], len(flat['n']), flat['n'].sum(), morphology.total_length * 1e6,
+                             morphology.total_area * 1e12) + '\n'.join(rows)))
+
+    for key, code in content.log:
+        items.append((escape(key), _code('\n'.join(code))))
+
+    return _section('NeuronGroup', NG.name, items, 'NeuronGroup with %d neurons.' % NG.N)
+
+
+@instrumented('generate_syn_html')
+def generate_syn_html(syn, figure_jobs=None, figure_options=None, ext='.svg'):
+    content = synapses_content(syn, figure_jobs, figure_options, ext)
+    syn = content.record
+
+    items = []
+    if len(syn.equations) != 0:
+        items.append(('Model', _math(mathml_equations(syn.equations))))
+    for x in syn.pathways:
+        items.append(('on %s: <code>%s</code>' % (x.prepost, escape(x.name)), _code(x.code)))
+    if len(syn.events) > 0:
+        items.append(('on events', _code('\n'.join('%s: %s' % (k, v) for k, v in syn.events.items()))))
+    items.append(('Connections', str(syn.N)))
+    items.append(('Mean fan-in', '%.4g synapses per target neuron (%d targets)' % (content.fan_in, content.targets)))
+    items.append(('Mean fan-out', '%.4g synapses per source neuron (%d sources)' % (content.fan_out, content.sources)))
+    items.append(('Graph', _figure(content.figure)))
+    for key, v in syn.summed_updaters.items():
+        items.append(('Summed updater <code>%s</code>' % escape(key),
+                      'clock dt: %s, when: %s, order: %s' % (escape(v.dt.in_best_unit()), escape(str(v.when)), v.order)))
+
+    return _section('Synapses', syn.name, items)
+
+
+@instrumented('generate_state_mon_html')
+def generate_state_mon_html(mon, figure_jobs=None, figure_options=None, ext='.svg'):
+    content = state_monitor_content(mon, figure_jobs, figure_options, ext)
+    if content is None:
+        return None
+    mon = content.record
+
+    items = [('Recorded variables', ', '.join('<code>%s</code>' % escape(var) for var in mon.record_variables))]
+    for pic_path, var_names in content.figures:
+        items.append(('Graph' if var_names is None else '<code>%s</code>' % escape(var_names[0]), _figure(pic_path)))
+
+    return _section('StateMonitor', mon.name, items, _subgroup_note(content.subgroup))
+
+
+@instrumented('generate_spike_mon_html')
+def generate_spike_mon_html(mon, figure_jobs=None, figure_options=None, ext='.svg'):
+    content = spike_monitor_content(mon, figure_jobs, figure_options, ext)
+    return _section('SpikeMonitor', content.record.name, [('Graph', _figure(content.figure))],
+                    _subgroup_note(content.subgroup))
+
+
+@instrumented('generate_PoissonInput_html')
+def generate_PoissonInput_html(PI):
+    content = poisson_input_content(PI)
+    PI = content.record
+    items = [('Target', '<code>%s</code>, from %d to %d' % (escape(PI.group.name), PI.group.start, PI.group.stop)),
+             ('Target variable and weight', _code(PI.abstract_code)),
+             ('N', str(PI.N)),
+             ('Rate', escape(content.rate)),
+             ('When', escape(str(PI.when))),
+             ('Order', str(PI.order))]
+    return _section('PoissonInput', PI.name, items)
+
+
+@instrumented('generate_CodeRunner_html')
+def generate_CodeRunner_html(CR):
+    content = code_runner_content(CR)
+    items = [('Abstract code', _code(content.record.abstract_code)), ('Clock dt', escape(content.dt))]
+    return _section('run_regularly', content.record.name, items)
+
+
+def generate_constant_html(d):
+    '''
+    MathML of the documented constants, named like in the constant list of the pdf (see generate_constant_list)
+    '''
+    constant_list = []
+    for key, kind, value in constant_items(d):
+        parts = key.split('_')
+        if len(parts) == 1:
+            key_ml = '<mi>%s</mi>' % escape(key)
+        elif len(parts) == 2:
+            key_ml = '<msub><mi>%s</mi><mi>%s</mi></msub>' % (escape(parts[0]), escape(parts[1]))
+        else:
+            key_ml = '<mtext>%s</mtext>' % escape(key)
+        value_ml = mathml_expression(value) if kind == 'expression' else '<mtext>%s</mtext>' % escape(value)
+        constant_list.append(_math('<mrow>' + key_ml + '<mo>:</mo>' + value_ml + '</mrow>'))
+    return constant_list
+
+
+def generate_object_html(obj, log_dict, figure_jobs=None, figure_options=None, ext='.svg'):
+    '''
+    html section of a single object of the network, None for objects that are not documented
+    '''
+    obj = describe_object(obj)
+    if obj is None:
+        return None
+    if obj.kind in ('NeuronGroup', 'SpatialNeuron'):
+        return generate_ng_html(obj, log_dict, figure_jobs, figure_options, ext)
+    if obj.kind == 'Synapses':
+        return generate_syn_html(obj, figure_jobs, figure_options, ext)
+    if obj.kind == 'StateMonitor':
+        return generate_state_mon_html(obj, figure_jobs, figure_options, ext)
+    if obj.kind == 'SpikeMonitor':
+        return generate_spike_mon_html(obj, figure_jobs, figure_options, ext)
+    if obj.kind == 'PoissonInput':
+        return generate_PoissonInput_html(obj)
+    return generate_CodeRunner_html(obj)
+
+
+@instrumented('generate_html_file', size=lambda result, arguments: file_size(arguments['outputFile']), obj=False)
+def generate_html_file(net, outputFile, constant_dict, log_dict, name, figure_workers=None, cache=None,
+                       figure_options=None, graph_options=None, figure_format='svg', root=None):
+    '''
+    write the preview of net to outputFile, see create_NN_preview. The figures are saved to the 'tmp'
+    folder in root.
+    '''
+    from .figures import FigureRenderer
+    if not os.path.exists(root_path(root, 'tmp')):
+        os.makedirs(root_path(root, 'tmp'))
+    options = dict(PREVIEW_FIGURE_OPTIONS)
+    options.update(figure_options or {})
+    ext = '.' + figure_format
+
+    index = index_network(net, log_dict)
+    graph_path = root_path(root, generate_network_graph(index, name, cache, graph_options, 'svg', root).strip('{}'))
+    sections = []
+    # the figures are embedded into the page, they are drawn object by object before it is written
+    with FigureRenderer(figure_workers, cache, root) as renderer:
+        for record in index.objects:
+            figure_jobs = []
+            text = generate_object_html(record, index, figure_jobs, options, ext)
+            renderer.submit(figure_jobs)
+            if text is not None:
+                sections.append((record, text))
+
+    constant_list = generate_constant_html(constant_dict) if constant_dict else []
+    body = (_figure_marker.sub(lambda match: embed_figure(root_path(root, match.group(1))), text)
+            for _, text in sections)
+    chunks = document_template('preview.html').generate(
+        name=name, graph=embed_figure(graph_path), constant_list=constant_list,
+        contents=[(record.kind, record.name) for record, _ in sections], body=body)
+    with open(outputFile, 'w') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def create_NN_preview(net, name='net', constant_dict=None, BrianLogger_tmp_log=None, figure_workers=None,
+                      cache=None, log_stop_at=None, figure_options=None, graph_options=None, root=None,
+                      figure_format='svg'):
+    '''
+    Write a preview of a Network to 'preview/<name>.html' and return its path. The arguments are those of
+    create_NN_pdf; the figure options are applied on top of PREVIEW_FIGURE_OPTIONS.
+
+    figure_format: str
+        'svg' or 'png', the format of the embedded figures. Figures with many points are smaller as png
+        (or with the 'rasterize' figure option).
+    '''
+    if isinstance(net, str):
+        net = load_snapshot(net)
+    log_dict = generate_log_dict(BrianLogger_tmp_log, log_stop_at)
+    if not os.path.exists(root_path(root, 'preview')):
+        os.makedirs(root_path(root, 'preview'))
+    path = root_path(root, 'preview/' + name + '.html')
+    generate_html_file(net, path, constant_dict, log_dict, name, figure_workers, cache, figure_options,
+                       graph_options, figure_format, root)
+    if cache is not None:
+        cache.prune()
+    return path
@@ -0,0 +1,306 @@
+'''
+Picklable description of a Network.
+
+describe_network walks net.objects once and records everything the generators of brian2docs.py
+read from the objects: names, equations, code, events, clocks, subgroup ranges, morphologies and
+the recorded data of the monitors. Every record is a types.SimpleNamespace with a 'kind' (the
+class of the object, e.g. 'StateMonitor'), so a snapshot can be sent to another process, or saved
+with save_snapshot and documented later without the simulation, e.g.
+
+>>> save_snapshot(describe_network(net), 'net.snapshot')
+>>> create_NN_pdf(load_snapshot('net.snapshot'), 'net')
+
+The generators accept records and live brian2 objects alike, live objects are described first.
+Unpickling a snapshot imports brian2 for its units and Equations, but no Network is built.
+
+The recordings and connections can be exported to .npy files (export_data, or the data_directory
+argument of describe_network and save_snapshot). The records then only hold ArrayFile references,
+which are opened memory mapped when a figure is drawn, so runs larger than the memory can be documented.
+'''
+import os
+import pickle
+from types import SimpleNamespace
+
+# written in front of the pickled snapshot, the number changes with the layout of the records
+SNAPSHOT_FORMAT = 'brian2docs-snapshot-3'
+
+def is_record(obj):
+    return isinstance(obj, SimpleNamespace)
+
+
+class ArrayFile(object):
+    '''
+    reference to an array saved by export_data. Its repr contains the digest of the data, so that
+    the fingerprints of the build cache do not have to read the file.
+    '''
+
+    def __init__(self, path, dim, shape, dtype, digest):
+        self.path = path
+        self.dim = dim
+        self.shape = shape
+        self.dtype = dtype
+        self.digest = digest
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return 'ArrayFile(%s, %s, %s, %s)' % (self.digest, self.shape, self.dtype, self.dim)
+
+    def load(self):
+        '''
+        the array, memory mapped read-only, as a Quantity if it has a unit
+        '''
+        import numpy as np
+        values = np.load(self.path, mmap_mode='r')
+        if self.dim is None:
+            return values
+        from brian2 import Quantity
+        return Quantity(values, dim=self.dim, copy=False)
+
+
+class IndexView(object):
+    '''
+    the presynaptic or postsynaptic indices of a live Synapses object, i.e. the synapse array of brian2
+    minus the start of the (sub)group. The array is not copied: slices are read when they are used, so
+    the connectivity of large Synapses can be aggregated chunk by chunk (see figures.aggregate_connectivity).
+    Pickling (e.g. save_snapshot) stores the indices themselves.
+    '''
+
+    def __init__(self, values, offset):
+        self.values = values
+        self.offset = offset
+        self.shape = values.shape
+        self.dtype = values.dtype
+        self._digest = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, item):
+        return self.values[item] - self.offset
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.values - self.offset
+        return values if dtype is None else values.astype(dtype)
+
+    def __reduce__(self):
+        import numpy as np
+        return np.asarray, (self.values - self.offset,)
+
+    def __repr__(self):
+        from .cache import digest
+        if self._digest is None:
+            self._digest = digest(self.values, self.offset)
+        return 'IndexView(%s, %s)' % (self._digest, self.shape)
+
+
+def _indices(synapses, name, group):
+    # the synapse array of brian2 without copying it, see IndexView
+    return IndexView(synapses.variables[name].get_value(), getattr(group, 'start', 0))
+
+
+def _recorded(monitor, name):
+    # the recorded array of brian2 without copying it, with one row per time step
+    from brian2 import Quantity
+    variable = monitor.variables[name]
+    values = variable.get_value()
+    if variable.dim.is_dimensionless:
+        return values
+    return Quantity(values, dim=variable.dim, copy=False)
+
+
+def load_array(values):
+    '''
+    values, or the memory mapped array if it is an ArrayFile. An IndexView is returned as it is,
+    np.asarray reads all of its indices.
+    '''
+    return values.load() if isinstance(values, ArrayFile) else values
+
+
+def _export(values, path):
+    import numpy as np
+    from .cache import digest
+    if values is None or isinstance(values, ArrayFile):
+        return values
+    if isinstance(values, IndexView):
+        values = np.asarray(values)
+    np.save(path, np.asarray(values))
+    dim = getattr(values, 'dim', None)
+    if dim is not None and dim.is_dimensionless:
+        dim = None
+    return ArrayFile(os.path.abspath(path), dim, values.shape, np.asarray(values).dtype.str, digest(values))
+
+
+def export_data(record, directory):
+    '''
+    write the recordings of monitor records and the connections of Synapses records to
+    <directory>/<name>_<variable>.npy and replace them by ArrayFile references. Other records,
+    and a snapshot of a whole network, are exported object by object. Returns the record.
+    '''
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    if record.kind == 'Network':
+        for obj in record.objects:
+            export_data(obj, directory)
+        return record
+
+    def path(field):
+        return os.path.join(directory, record.name + '_' + field + '.npy')
+
+    if record.kind in ('Synapses', 'SpikeMonitor'):
+        for field in ('i', 'j', 't'):
+            if hasattr(record, field):
+                setattr(record, field, _export(getattr(record, field), path(field)))
+    elif record.kind == 'StateMonitor':
+        record.t = _export(record.t, path('t'))
+        if record.values is not None:
+            record.values = dict((var, _export(values, path('values_' + var))) for var, values in record.values.items())
+    return record
+
+
+def describe_group(group):
+    '''
+    reference to the NeuronGroup or Subgroup a Synapses object, monitor or input is attached to
+    '''
+    from brian2 import Subgroup
+    if is_record(group):
+        return group
+    if isinstance(group, Subgroup):
+        return SimpleNamespace(kind='Subgroup', name=group.name, start=group.start, stop=group.stop, N=len(group),
+                               source=describe_group(group.source))
+    if not hasattr(group, 'start'):
+        # e.g. run_regularly of a Synapses object
+        return SimpleNamespace(kind=type(group).__name__, name=group.name, N=len(group))
+    return SimpleNamespace(kind=type(group).__name__, name=group.name, start=group.start, stop=group.stop,
+                           N=len(group))
+
+
+def describe_morphology(morpho):
+    '''
+    dict with the parameters of every section of a morphology, see build_morphology
+    '''
+    return {'class': type(morpho).__name__,
+            'type': morpho.type,
+            'n': morpho.n,
+            'diameter': morpho.diameter,
+            'start_diameter': getattr(morpho, 'start_diameter', None),
+            'end_diameter': getattr(morpho, 'end_diameter', None),
+            'length': morpho.length,
+            'children': [(morpho.children.name(child), describe_morphology(child)) for child in morpho.children]}
+
+
+def build_morphology(data):
+    '''
+    brian2 Morphology with the sections of a dict made by describe_morphology.
+    The coordinates of the sections are not kept, they are not needed for a dendrogram.
+    '''
+    import numpy as np
+    from brian2 import Soma, Cylinder, Section, Quantity
+    if data['class'] == 'Soma':
+        morpho = Soma(data['diameter'][0], type=data['type'])
+    elif data['class'] == 'Cylinder':
+        morpho = Cylinder(data['diameter'][0], n=data['n'], length=sum(data['length']), type=data['type'])
+    else:
+        start, end = data['start_diameter'], data['end_diameter']
+        diameter = Quantity(np.hstack([np.asarray(start[:1]), np.asarray(end)]), dim=end.dim)
+        morpho = Section(diameter, n=data['n'], length=data['length'], type=data['type'])
+    for name, child in data['children']:
+        morpho.children.add(name, build_morphology(child))
+    return morpho
+
+
+def describe_object(obj, data=True):
+    '''
+    record of a documented object, None for other objects. Records are returned unchanged.
+
+    data: bool
+        include the connections of Synapses and the recordings of monitors. Without them the
+        record only describes the structure of the network, e.g. for the network graph.
+        The recordings and connections of live objects are views of the arrays of brian2, not copies.
+    '''
+    from brian2 import NeuronGroup, Synapses, CodeRunner, PoissonInput, SpikeMonitor, StateMonitor, SpatialNeuron
+    if is_record(obj):
+        return obj
+    if isinstance(obj, NeuronGroup):
+        record = SimpleNamespace(kind='NeuronGroup', name=obj.name, N=obj._N, start=obj.start, stop=obj.stop,
+                                 equations=obj.equations, events=dict(obj.events), event_codes=dict(obj.event_codes),
+                                 refractory=obj._refractory, method_choice=obj.method_choice)
+        if isinstance(obj, SpatialNeuron):
+            record.kind = 'SpatialNeuron'
+            record.Cm = obj.Cm[:]
+            record.Ri = obj.Ri.variable.get_value().copy()
+            record.Ri_unit = obj.Ri.unit.latexname
+            record.Ri_dispname = str(obj.Ri.unit)
+            record.morphology = describe_morphology(obj.morphology) if obj.morphology is not None else None
+        return record
+    if isinstance(obj, Synapses):
+        return SimpleNamespace(kind='Synapses', name=obj.name, N=len(obj), equations=obj.equations,
+                               pathways=[SimpleNamespace(name=x.name, prepost=x.prepost, code=x.code)
+                                         for x in obj._pathways],
+                               events=dict(obj.events),
+                               summed_updaters=dict((key, SimpleNamespace(dt=v.clock.dt, when=v.when, order=v.order))
+                                                    for key, v in obj.summed_updaters.items()),
+                               source=describe_group(obj.source), target=describe_group(obj.target),
+                               i=_indices(obj, '_synaptic_pre', obj.source) if data else None,
+                               j=_indices(obj, '_synaptic_post', obj.target) if data else None)
+    if isinstance(obj, StateMonitor):
+        # values: one row per time step
+        return SimpleNamespace(kind='StateMonitor', name=obj.name, source=describe_group(obj.source),
+                               record_variables=list(obj.record_variables),
+                               t=_recorded(obj, 't') if data else None,
+                               values=dict((var, _recorded(obj, var)) for var in obj.record_variables) if data else None)
+    if isinstance(obj, SpikeMonitor):
+        return SimpleNamespace(kind='SpikeMonitor', name=obj.name, source=describe_group(obj.source),
+                               i=_recorded(obj, 'i') if data else None, t=_recorded(obj, 't') if data else None)
+    if isinstance(obj, PoissonInput):
+        return SimpleNamespace(kind='PoissonInput', name=obj.name, abstract_code=obj.abstract_code,
+                               group=describe_group(obj._group), N=obj.N, rate=obj.rate, when=obj.when,
+                               order=obj.order)
+    if type(obj) is CodeRunner:
+        return SimpleNamespace(kind='CodeRunner', name=obj.name, abstract_code=obj.abstract_code, dt=obj.clock.dt,
+                               group=describe_group(obj.group))
+    return None
+
+
+def describe_network(net, data_directory=None):
+    '''
+    snapshot of a Network: a record with its name and the list of the records of its documented objects,
+    in the order of net.objects
+
+    data_directory: str, optional
+        export the data of every object to this folder (see export_data) as soon as it is described,
+        so that the snapshot only holds references to the files
+    '''
+    if is_record(net):
+        return net if data_directory is None else export_data(net, data_directory)
+    objects = []
+    for obj in net.objects:
+        record = describe_object(obj)
+        if record is None:
+            continue
+        if data_directory is not None:
+            export_data(record, data_directory)
+        objects.append(record)
+    return SimpleNamespace(kind='Network', name=net.name, objects=objects)
+
+
+def save_snapshot(snapshot, path, data_directory=None):
+    '''
+    write a snapshot (or a Network, which is described first) to path
+
+    data_directory: str, optional
+        folder the recordings are exported to, see describe_network. By default they are part of the snapshot.
+    '''
+    snapshot = describe_network(snapshot, data_directory)
+    with open(path, 'wb') as f:
+        f.write(SNAPSHOT_FORMAT.encode('ascii') + b'\n')
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_snapshot(path):
+    with open(path, 'rb') as f:
+        header = f.readline().decode('ascii', 'replace').strip()
+        if header != SNAPSHOT_FORMAT:
+            raise ValueError('%s is not a snapshot of this version of brian2docs (%s)' % (path, header))
+        return pickle.load(f)
@@ -0,0 +1,94 @@
+'''
+Running latex on the generated tex files.
+
+The preamble of the template can be precompiled into a format file with the mylatexformat
+package, so that it is not processed again by every run. Runs are repeated while latex asks
+for it to settle cross-references, and the exit status and time of the compilation are returned.
+'''
+import os
+import re
+import time
+import hashlib
+import warnings
+import subprocess
+
+# line of the template after which the preamble ends, see the mylatexformat package
+END_OF_DUMP = '\\csname endofdump\\endcsname'
+
+_rerun = re.compile(r'Rerun to get|Label\(s\) may have changed')
+
+
+def split_preamble(template_text):
+    '''
+    the part of the template that can be precompiled into a format, i.e. everything before END_OF_DUMP
+    '''
+    index = template_text.find(END_OF_DUMP)
+    if index < 0:
+        raise ValueError('The template does not mark the end of its preamble with ' + END_OF_DUMP)
+    return template_text[:index]
+
+
+def build_format(preamble, directory='tmp', engine='latex'):
+    '''
+    precompile the preamble into <directory>/brian2docs_<hash>.fmt, unless that file already exists.
+    The directory is created if needed.
+    Returns the name of the format, or None with a warning if latex failed to build it.
+    '''
+    fmt_name = 'brian2docs_' + hashlib.sha1((engine + preamble).encode('utf-8')).hexdigest()[:12]
+    if os.path.exists(os.path.join(directory, fmt_name + '.fmt')):
+        return fmt_name
+
+    os.makedirs(directory, exist_ok=True)
+    source = os.path.join(directory, fmt_name + '.tex')
+    with open(source, 'w') as f:
+        f.write(preamble + END_OF_DUMP + '\n\\begin{document}\n\\end{document}\n')
+    process = subprocess.Popen([engine, '-ini', '-interaction=nonstopmode', '-jobname=' + fmt_name,
+                                '-output-directory=' + directory, '&' + engine, 'mylatexformat.ltx', source],
+                               stdout=subprocess.DEVNULL)
+    process.wait()
+    if process.returncode != 0 or not os.path.exists(os.path.join(directory, fmt_name + '.fmt')):
+        warnings.warn('the preamble could not be precompiled (latex exited with status %s, see %s), '
+                      'the documents are compiled without a format'
+                      % (process.returncode, os.path.join(directory, fmt_name + '.log')))
+        return None
+    return fmt_name
+
+
+def run_latex(input_filename, output_filename, fmt=None, fmt_directory='tmp', max_runs=3, engine='latex', cwd=None):
+    '''
+    compile input_filename to output_filename + '.pdf'
+
+    fmt: str, optional
+        name of a format built by build_format in fmt_directory
+    max_runs: int
+        latex is run again, up to max_runs times, while its log asks for a rerun
+    cwd: str, optional
+        directory latex is run in, the file names and fmt_directory are relative to it
+
+    Returns a dict with the 'returncode' of the last run, the number of 'runs', the 'seconds'
+    spent in latex and the path of the 'log' file.
+    '''
+    command = [engine, '-interaction=nonstopmode', '-output-format=pdf', '-job-name=' + output_filename]
+    env = None
+    if fmt is not None:
+        command.append('-fmt=' + fmt)
+        env = dict(os.environ)
+        env['TEXFORMATS'] = (os.path.abspath(os.path.join(cwd or '.', fmt_directory)) + os.pathsep
+                             + env.get('TEXFORMATS', ''))
+    command.append(input_filename)
+
+    log_path = os.path.join(cwd or '', output_filename + '.log')
+    start = time.time()
+    runs = 0
+    returncode = None
+    while runs < max_runs:
+        runs += 1
+        process = subprocess.Popen(command, env=env, cwd=cwd)
+        returncode = process.wait()
+        if returncode != 0 or not os.path.exists(log_path):
+            break
+        with open(log_path, 'r', errors='replace') as f:
+            if not _rerun.search(f.read()):
+                break
+
+    return {'returncode': returncode, 'runs': runs, 'seconds': time.time() - start, 'log': log_path}
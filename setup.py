@@ -14,6 +14,9 @@ setuptools.setup(
     url="https://github.com/kuzhankuixiong/FYP_neural_net_doc",
     packages=setuptools.find_packages(),
     include_package_data=True,
+    entry_points={
+        'console_scripts': ['brian2docs=brian2docs.cli:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,39 @@
+import matplotlib
+matplotlib.use('Agg')
+
+import os
+
+import graphviz
+import pytest
+from brian2 import prefs, start_scope, NeuronGroup, StateMonitor, SpikeMonitor, Network, mV, ms
+
+prefs.codegen.target = 'numpy'
+
+
+@pytest.fixture
+def monitored_network():
+    '''
+    a small Network with a StateMonitor recording two variables and a SpikeMonitor
+    '''
+    start_scope()
+    G = NeuronGroup(3, '''dv/dt = (2*mV - v + w)/(5*ms) : volt
+                          dw/dt = -w/(20*ms) : volt''', threshold='v > 1*mV', reset='v = 0*mV', method='exact')
+    G.v = [0, 0.5, 0.9] * mV
+    state = StateMonitor(G, ['v', 'w'], record=True)
+    spikes = SpikeMonitor(G)
+    net = Network(G, state, spikes)
+    net.run(20 * ms)
+    return net
+
+
+@pytest.fixture
+def no_graphviz(monkeypatch):
+    '''
+    network graphs written without the dot binary, the graphviz source is saved as the graph
+    '''
+    def render(self, filename=None, directory=None, format='pdf', **kwds):
+        path = os.path.join(directory, filename + '.' + format)
+        with open(path, 'w') as f:
+            f.write('<svg></svg>' if format == 'svg' else self.source)
+        return path
+    monkeypatch.setattr(graphviz.Digraph, 'render', render)
@@ -0,0 +1,42 @@
+import queue
+from types import SimpleNamespace
+
+from brian2docs.background import DocumentJob
+
+
+class _Events(object):
+    '''
+    queue whose get times out once before the messages of the worker arrive
+    '''
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.timed_out = False
+
+    def get(self, block=True, timeout=None):
+        if not self.timed_out:
+            self.timed_out = True
+            raise queue.Empty()
+        if not self.messages:
+            raise queue.Empty()
+        return self.messages.pop(0)
+
+
+def _exited_worker():
+    return SimpleNamespace(is_alive=lambda: False, exitcode=0, join=lambda: None)
+
+
+def test_done_message_sent_before_the_worker_exits(tmp_path):
+    (tmp_path / 'pdf').mkdir()
+    (tmp_path / 'pdf' / 'net.pdf').write_bytes(b'%PDF')
+    result = {'returncode': 0, 'runs': 1, 'seconds': 0.0, 'log': None}
+    job = DocumentJob(_exited_worker(), _Events([('stage', 'create_pdf', None), ('done', result)]), 'net',
+                      str(tmp_path), 1)
+    assert job.result(timeout=1) == str(tmp_path / 'pdf' / 'net.pdf')
+    assert job.progress()['state'] == 'finished'
+
+
+def test_worker_exits_without_a_message(tmp_path):
+    job = DocumentJob(_exited_worker(), _Events([]), 'net', str(tmp_path), 1)
+    assert job.progress()['state'] == 'failed'
+    assert 'exited with code 0' in job.error
@@ -0,0 +1,65 @@
+import os
+
+from brian2 import start_scope, NeuronGroup, StateMonitor, Network, ms
+
+import brian2docs.texbuild as texbuild
+from brian2docs.cache import BuildCache
+from brian2docs.batch import document_networks
+
+
+class _Latex(object):
+    # writes an empty pdf instead of starting latex, in the worker processes forked by the batch
+
+    def __init__(self, command, env=None, cwd=None):
+        jobname = [arg for arg in command if arg.startswith('-job-name=')][0][len('-job-name='):]
+        with open(os.path.join(cwd, jobname + '.pdf'), 'wb') as f:
+            f.write(b'%PDF')
+
+    def wait(self):
+        return 0
+
+
+def _network():
+    # the objects keep their default names, 'neurongroup' and 'statemonitor'
+    start_scope()
+    G = NeuronGroup(2, 'dv/dt = (1*mV - v)/(5*ms) : volt', method='exact')
+    mon = StateMonitor(G, 'v', record=True)
+    net = Network(G, mon)
+    net.run(2 * ms)
+    return net
+
+
+def _broken_network():
+    raise RuntimeError('no network')
+
+
+def test_document_networks(tmp_path, monkeypatch, no_graphviz):
+    monkeypatch.setattr(texbuild.subprocess, 'Popen', _Latex)
+    pruned = str(tmp_path / 'pruned')
+
+    def prune(cache):
+        with open(pruned, 'a') as f:
+            f.write('%d\n' % os.getpid())
+    monkeypatch.setattr(BuildCache, 'prune', prune)
+    root = str(tmp_path / 'docs')
+    # one worker, so that the second network is documented after the first one is in the cache
+    first, second, broken = document_networks({'first': _network, 'second': _network, 'broken': _broken_network},
+                                              root=root, workers=1)
+
+    assert first['status'] == second['status'] == 'ok'
+    assert first['root'] == os.path.join(root, 'first') and second['root'] == os.path.join(root, 'second')
+    for result in [first, second]:
+        assert result['pdf'] == os.path.join(result['root'], 'pdf', result['name'] + '.pdf')
+        assert os.path.exists(os.path.join(result['root'], 'tmp', result['name'] + '.tex'))
+    assert sorted(os.listdir(os.path.join(root, 'first', 'tmp'))) == \
+        sorted(name.replace('second', 'first') for name in os.listdir(os.path.join(root, 'second', 'tmp')))
+
+    assert not first['cache_hits'].get('fragment')
+    assert second['cache_hits']['fragment'] > 0 and second['cache_hits']['figure'] > 0
+
+    assert broken['status'] == 'failed' and broken['pdf'] is None
+    assert 'Traceback' in broken['error'] and 'RuntimeError: no network' in broken['error']
+
+    # the shared cache is only pruned by the parent, once all jobs are done
+    with open(pruned) as f:
+        assert f.read().split() == [str(os.getpid())]
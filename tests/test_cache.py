@@ -0,0 +1,87 @@
+import os
+import time
+
+import numpy as np
+from brian2 import NeuronGroup, mV, ms
+
+import brian2docs.brian2docs as brian2docs
+from brian2docs.cache import digest, Fingerprint, BuildCache, LRUCache
+
+
+def test_digest_of_arrays():
+    a = np.arange(12.0).reshape(3, 4)
+    assert digest(a) == digest(a.copy())
+    assert digest(a) != digest(a.reshape(4, 3))
+    assert digest(a) != digest(a.astype(np.float32))
+    # a transposed array is hashed without copying it, and is not confused with the array itself
+    assert digest(a.T) == digest(a.copy().T)
+    assert digest(a.T) != digest(a)
+    assert digest(a.T) != digest(np.ascontiguousarray(a).reshape(4, 3))
+    assert digest(np.zeros((0, 3))) != digest(np.zeros((3, 0)))
+    # the unit of a Quantity is part of the fingerprint
+    assert digest(a * mV) != digest(a * ms)
+
+
+def test_digest_of_nested_values():
+    assert digest({'b': [1, 'x'], 'a': None}) == digest({'a': None, 'b': [1, 'x']})
+    assert digest(['ab', 'c']) != digest(['a', 'bc'])
+    assert digest('1') != digest(1)
+    fingerprint = Fingerprint()
+    fingerprint.update('a', np.arange(3))
+    assert fingerprint.hexdigest() == digest('a', np.arange(3))
+
+
+def test_build_cache(tmp_path):
+    cache = BuildCache(str(tmp_path / 'cache'))
+    assert cache.get_text('fragment', 'ab12') is None
+    cache.put_text('fragment', 'ab12', 'text')
+    assert cache.get_text('fragment', 'ab12') == 'text'
+    source = tmp_path / 'figure.pdf'
+    source.write_bytes(b'pdf')
+    cache.put_file('figure', 'cd34', str(source))
+    assert cache.get_file('figure', 'cd34', str(tmp_path / 'copy.pdf'))
+    assert (tmp_path / 'copy.pdf').read_bytes() == b'pdf'
+    assert not cache.get_file('figure', 'ef56', str(tmp_path / 'missing.pdf'))
+    assert cache.hits == {'fragment': 1, 'figure': 1}
+    assert cache.misses == {'fragment': 1, 'figure': 1}
+
+
+def test_prune_removes_least_recently_used(tmp_path):
+    cache = BuildCache(str(tmp_path / 'cache'), max_bytes=10)
+    for n, key in enumerate(['aa01', 'bb02', 'cc03']):
+        cache.put_text('fragment', key, '12345')
+        entry = cache._entry('fragment', key)
+        os.utime(entry, (time.time() - 100 + n, time.time() - 100 + n))
+    cache.get_text('fragment', 'aa01')
+    cache.prune()
+    assert cache.get_text('fragment', 'aa01') == '12345'
+    assert cache.get_text('fragment', 'bb02') is None
+    assert cache.get_text('fragment', 'cc03') == '12345'
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache and cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_keys_depend_on_the_version_and_the_template(monitored_network, tmp_path, monkeypatch, no_graphviz):
+    group = [obj for obj in monitored_network.objects if isinstance(obj, NeuronGroup)][0]
+    version = brian2docs.__version__
+
+    def build_key():
+        return brian2docs.generate_tex_file(monitored_network, str(tmp_path / 'net.tex'), None, None, 'net',
+                                            cache=BuildCache(str(tmp_path / 'cache')), root=str(tmp_path))
+
+    fragment, document = brian2docs.fingerprint_object(group, None), build_key()
+    assert build_key() == document
+    monkeypatch.setattr(brian2docs, '__version__', 'next')
+    assert brian2docs.fingerprint_object(group, None) != fragment
+    assert build_key() != document
+    monkeypatch.setattr(brian2docs, '__version__', version)
+    assert build_key() == document
+    monkeypatch.setattr(brian2docs, 'template_digest', lambda: 'edited')
+    assert build_key() != document
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from brian2 import (start_scope, NeuronGroup, StateMonitor, SpikeMonitor, Network, SpatialNeuron, Soma, Cylinder, um,
+                    uF, cm, ohm)
+
+from brian2docs.checkpoint import Checkpoint, _Envelope, _SpikeHistogram
+from brian2docs.figures import state_monitor_job, spike_monitor_job, render_figures
+
+
+@pytest.mark.parametrize('width', [1, 2, 7, 16])
+def test_envelope_is_exact_and_bounded(width):
+    rng = np.random.RandomState(width)
+    values = rng.randn(1000, 3)
+    times = np.arange(1000.0)
+    env = _Envelope(width)
+    position = 0
+    for size in rng.randint(0, 60, size=40):
+        env.add(times[position:position + size], values[position:position + size])
+        position = min(position + size, len(times))
+        trace_times, trace = env.trace()
+        starts = trace_times[0::2]
+        assert len(starts) <= width
+        # every bin holds the min and max of the samples from its start to the next one
+        ends = np.append(starts[1:], position).astype(int)
+        for start, end, low, high in zip(starts.astype(int), ends, trace[0::2], trace[1::2]):
+            np.testing.assert_array_equal(low, values[start:end].min(axis=0))
+            np.testing.assert_array_equal(high, values[start:end].max(axis=0))
+
+
+def test_monitors_without_samples(tmp_path):
+    start_scope()
+    G = NeuronGroup(4, 'dv/dt = -v/(10*ms) : volt', threshold='v > 1', method='exact')
+    state = StateMonitor(G, 'v', record=True)
+    spikes = SpikeMonitor(G)
+    snapshot = Checkpoint(pixel_width=10).update(Network(G, state, spikes))
+    jobs = []
+    for record in snapshot.objects:
+        if record.kind == 'StateMonitor':
+            assert record.values['v'].shape == (0, 4)
+            jobs.append(state_monitor_job(record, str(tmp_path / 'state.png')))
+        elif record.kind == 'SpikeMonitor':
+            jobs.append(spike_monitor_job(record, str(tmp_path / 'spikes.png')))
+    render_figures(jobs)
+
+
+def test_at_least_two_time_bins():
+    with pytest.raises(ValueError):
+        Checkpoint(pixel_width=1)
+    with pytest.raises(ValueError):
+        _SpikeHistogram(4, 1, 100)
+
+
+def test_parameters_of_a_spatial_neuron_are_updated():
+    start_scope()
+    morpho = Soma(30 * um)
+    morpho.axon = Cylinder(1 * um, n=3, length=30 * um)
+    neuron = SpatialNeuron(morpho, 'Im = 0*amp/meter**2 : amp/meter**2', Cm=1 * uF / cm ** 2, Ri=100 * ohm * cm)
+    net = Network(neuron)
+    checkpoint = Checkpoint(pixel_width=10)
+    first = checkpoint.update(net).objects[0]
+    assert checkpoint.update(net).objects[0] is first
+    neuron.Cm = 2 * uF / cm ** 2
+    neuron.Ri = 150 * ohm * cm
+    second = checkpoint.update(net).objects[0]
+    assert second is not first
+    np.testing.assert_allclose(np.asarray(second.Cm), 0.02)
+    np.testing.assert_allclose(float(second.Ri), 1.5)
@@ -0,0 +1,56 @@
+import os
+import re
+import sys
+import json
+import subprocess
+
+import brian2docs.brian2docs as brian2docs
+from brian2docs.cli import main
+
+LOG = ('2020-01-01 DIAGNOSTIC brian2.codegen.codeobject: Creating code object (group=neurongroup, '
+       'template name=group_variable_set_conditional) for abstract code:\n'
+       '    Key condition:\n'
+       '        _cond = True\n'
+       '    Key statement:\n'
+       '        v = 0*mV\n'
+       "2020-01-01 INFO brian2: Simulating network 'network' from time 0. s to 1. ms.\n"
+       '2020-01-01 DIAGNOSTIC brian2.codegen.codeobject: Creating code object (group=synapses, '
+       'template name=group_variable_set_conditional) for abstract code:\n'
+       '    Key condition:\n'
+       '        _cond = True\n'
+       '    Key statement:\n'
+       '        w = 1\n')
+
+
+def test_parse_log(tmp_path, capsys):
+    path = str(tmp_path / 'brian_debug.log')
+    with open(path, 'w') as f:
+        f.write(LOG)
+    assert main(['parse-log', path]) == 0
+    assert json.loads(capsys.readouterr().out) == {'neurongroup': ['v = 0*mV'], 'synapses': ['w = 1']}
+    assert main(['parse-log', path, '--stop-at-run']) == 0
+    assert json.loads(capsys.readouterr().out) == {'neurongroup': ['v = 0*mV']}
+
+
+def test_compile(monkeypatch, capsys):
+    calls = []
+
+    def create_pdf(input_filename, output_filename, fmt=None, max_runs=3, root=None):
+        calls.append((input_filename, output_filename, fmt, max_runs))
+        return {'returncode': 1, 'runs': 2, 'seconds': 0.5, 'log': output_filename + '.log'}
+    monkeypatch.setattr(brian2docs, 'create_pdf', create_pdf)
+    assert main(['compile', 'tmp/net.tex']) == 1
+    assert main(['compile', 'tmp/net.tex', 'out/doc', '--max-runs', '5']) == 1
+    assert calls == [('tmp/net.tex', os.path.join('pdf', 'net'), None, 3), ('tmp/net.tex', 'out/doc', None, 5)]
+    assert '2 latex run(s) in 0.5 s, exit status 1' in capsys.readouterr().out
+
+
+def test_help_does_not_import_brian2():
+    # -X importtime lists every module that is imported
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'brian2docs', '--help'],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert process.returncode == 0 and 'parse-log' in process.stdout
+    imported = re.findall(r'\|\s+([\w.]+)$', process.stderr, re.M)
+    assert 'brian2docs.cli' in imported
+    assert not [name for name in imported if name.split('.')[0] in ('brian2', 'matplotlib', 'sympy')]
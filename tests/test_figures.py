@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pytest
+from brian2 import mV, ms
+
+import brian2docs.figures as figures
+from brian2docs.cache import BuildCache
+from brian2docs.instrument import Profile
+from brian2docs.brian2docs import generate_tex_file
+from brian2docs.figures import state_monitor_job, render_figures, FigureRenderer, envelope, spike_density
+from brian2docs.snapshot import describe_network
+
+
+def _state_monitor(snapshot):
+    return [record for record in snapshot.objects if record.kind == 'StateMonitor'][0]
+
+
+def test_rendering_does_not_change_the_record(monitored_network, tmp_path):
+    mon = _state_monitor(describe_network(monitored_network))
+    before = dict((var, np.array(values)) for var, values in mon.values.items())
+    jobs = [state_monitor_job(mon, str(tmp_path / 'panels.png')),
+            state_monitor_job(mon, str(tmp_path / 'v.png'), var_names=['v'])]
+    for _ in range(2):
+        render_figures(jobs)
+    for var, values in mon.values.items():
+        np.testing.assert_array_equal(np.asarray(values), before[var])
+
+
+def test_render_exported_state_monitor(monitored_network, tmp_path):
+    # exported recordings are memory mapped read-only
+    mon = _state_monitor(describe_network(monitored_network, str(tmp_path / 'data')))
+    assert not mon.values['v'].load().flags.writeable
+    jobs = [state_monitor_job(mon, str(tmp_path / 'panels.png')),
+            state_monitor_job(mon, str(tmp_path / 'v.png'), var_names=['v']),
+            state_monitor_job(mon, str(tmp_path / 'reduced.png'), {'reduce': True, 'pixel_width': 10})]
+    render_figures(jobs)
+    for job in jobs:
+        assert os.path.getsize(job['path']) > 0
+
+
+def test_renderer_draws_while_jobs_are_submitted(monitored_network, tmp_path, monkeypatch):
+    mon = _state_monitor(describe_network(monitored_network))
+    drawn = []
+    render_figure = figures.render_figure
+    monkeypatch.setattr(figures, 'render_figure', lambda job: drawn.append(job['path']) or render_figure(job))
+    cache = BuildCache(str(tmp_path / 'cache'))
+    with FigureRenderer(cache=cache) as renderer:
+        renderer.submit([state_monitor_job(mon, str(tmp_path / 'v.png'), var_names=['v'])])
+        assert drawn == [str(tmp_path / 'v.png')]
+        # same data: copied from the first figure when the renderer is closed
+        renderer.submit([state_monitor_job(mon, str(tmp_path / 'v_again.png'), var_names=['v'])])
+        assert len(drawn) == 1
+    assert os.path.getsize(str(tmp_path / 'v_again.png')) == os.path.getsize(str(tmp_path / 'v.png'))
+
+    # a new renderer takes the figure from the cache
+    with FigureRenderer(cache=cache) as renderer:
+        renderer.submit([state_monitor_job(mon, str(tmp_path / 'cached.png'), var_names=['v'])])
+    assert len(drawn) == 1 and os.path.exists(str(tmp_path / 'cached.png'))
+
+
+def test_renderer_bounds_the_pending_jobs(monitored_network, tmp_path):
+    mon = _state_monitor(describe_network(monitored_network))
+    with FigureRenderer(workers=2) as renderer:
+        for n in range(6):
+            renderer.submit([state_monitor_job(mon, str(tmp_path / ('%d.png' % n)), {'pixel_width': 100 + n,
+                                                                                     'reduce': True})])
+            assert len(renderer._pending) <= 4
+    assert len(renderer._pending) == 0
+    for n in range(6):
+        assert os.path.getsize(str(tmp_path / ('%d.png' % n))) > 0
+
+
+def test_renderer_is_closed_once(monitored_network, tmp_path, no_graphviz):
+    # generate_tex_file closes the renderer before the profile summary, leaving the with block does not close it again
+    with Profile() as profile:
+        generate_tex_file(monitored_network, str(tmp_path / 'net.tex'), None, None, 'net', root=str(tmp_path),
+                          profile=Profile())
+    closed = [event for event in profile.events if event['stage'] == 'render_figures'
+              and event['output_bytes'] is not None]
+    assert len(closed) == 1 and closed[0]['output_bytes'] > 0
+
+
+def test_short_trace_is_not_reduced():
+    times, values = np.arange(20) * ms, np.random.RandomState(0).randn(20, 3) * mV
+    reduced_times, reduced = envelope(times, values, 10)
+    assert reduced_times is times and reduced is values
+
+
+@pytest.mark.parametrize('width', [1, 7, 50])
+def test_envelope_keeps_the_extremes_of_every_bin(width):
+    values = np.random.RandomState(width).randn(1003, 2) * mV
+    times = np.arange(1003) * ms
+    reduced_times, reduced = envelope(times, values, width)
+    assert len(reduced_times) == len(reduced) == 2 * width
+    assert reduced.dim == values.dim and reduced_times.dim == times.dim
+    starts = np.append(np.searchsorted(np.asarray(times), np.asarray(reduced_times[0::2])), len(times))
+    for n in range(width):
+        np.testing.assert_array_equal(reduced[2 * n], values[starts[n]:starts[n + 1]].min(axis=0))
+        np.testing.assert_array_equal(reduced[2 * n + 1], values[starts[n]:starts[n + 1]].max(axis=0))
+    np.testing.assert_array_equal(reduced.min(axis=0), values.min(axis=0))
+    np.testing.assert_array_equal(reduced.max(axis=0), values.max(axis=0))
+
+
+def test_spike_density_counts_every_spike():
+    rng = np.random.RandomState(1)
+    indices = rng.randint(0, 37, size=5000)
+    times = np.sort(rng.uniform(0.01, 2.0, size=5000))
+    counts, (t_min, t_max) = spike_density(indices, times, 37, 20, chunk=777)
+    assert counts.shape == (10, 20) and counts.sum() == len(times)
+    assert (t_min, t_max) == (times.min(), times.max())
+    # the same counts when the spikes are read at once
+    np.testing.assert_array_equal(counts, spike_density(indices, times, 37, 20)[0])
+    # spikes at a single time are all counted
+    assert spike_density(np.zeros(5, dtype=int), np.ones(5), 1, 4)[0].sum() == 5
+
+
+def test_figure_workers_write_the_same_document(monitored_network, tmp_path, no_graphviz):
+    documents = []
+    for workers in [None, 2]:
+        root = str(tmp_path / str(workers))
+        generate_tex_file(monitored_network, os.path.join(root, 'net.tex'), None, None, 'net', figure_workers=workers,
+                          root=root)
+        with open(os.path.join(root, 'net.tex')) as f:
+            documents.append((f.read(), sorted(os.listdir(os.path.join(root, 'tmp')))))
+    assert documents[0] == documents[1]
+    assert any(name.endswith('.png') or name.endswith('.pdf') for name in documents[0][1])
@@ -0,0 +1,84 @@
+import os
+import re
+from collections import Counter
+
+import pytest
+from brian2 import (start_scope, NeuronGroup, Synapses, PoissonInput, StateMonitor, SpikeMonitor, Network, ms, Hz)
+
+from brian2docs.brian2docs import generate_network_graph
+from brian2docs.instrument import Profile
+
+
+@pytest.fixture
+def network():
+    '''
+    two NeuronGroups, two Synapses between the same Subgroups of the first one, and objects attached to them
+    '''
+    start_scope()
+    G = NeuronGroup(10, 'dv/dt = -v/(10*ms) : 1', threshold='v > 1', reset='v = 0', method='exact', name='G')
+    H = NeuronGroup(4, 'v : 1', name='H')
+    pre, post = G[:5], G[5:]
+    synapses = [Synapses(pre, post, on_pre='v += 1', name='exc'), Synapses(pre, post, on_pre='v -= 1', name='inh'),
+                Synapses(G, H, on_pre='v += 1', name='out')]
+    for syn in synapses:
+        syn.connect()
+    return Network(G, H, *synapses, PoissonInput(G, 'v', 5, 10 * Hz, 0.1),
+                   G.run_regularly('v = 0', dt=1 * ms, name='clear'), StateMonitor(G, 'v', record=0, name='state'),
+                   SpikeMonitor(pre, name='spikes'))
+
+
+def _graph(net, mode, root):
+    os.makedirs(os.path.join(root, 'tmp'), exist_ok=True)
+    path = generate_network_graph(net, mode, options={'mode': mode}, root=root)
+    with open(os.path.join(root, path.strip('{}'))) as f:
+        source = f.read()
+    nodes = Counter(re.findall(r'^\s*("[^"]*"|\w+) \[', source, re.M))
+    edges = Counter(re.findall(r'^\s*("[^"]*"|\w+) -> ("[^"]*"|\w+)( \[label=(?:"[^"]*"|[^ \]]*))?', source, re.M))
+    return source, nodes, edges
+
+
+def _subgroups(net):
+    # names of the nodes of the Subgroups of G, which are numbered by brian2
+    return '"%s (0, 5)"' % net['exc'].source.name, '"%s (5, 10)"' % net['exc'].target.name
+
+
+def test_full(network, tmp_path, no_graphviz):
+    source, nodes, edges = _graph(network, 'full', str(tmp_path))
+    assert set(nodes.values()) == set(edges.values()) == {1}
+    noise = [obj.name for obj in network.objects if isinstance(obj, PoissonInput)][0]
+    assert set(nodes) == {'"G (0, 10)"', '"H (0, 4)"', noise, 'clear', 'state', 'spikes'} | set(_subgroups(network))
+    assert 'cluster' not in source
+    # one edge per Synapses, one from every Subgroup to its group and from every attached object to its group
+    assert len(edges) == 3 + 2 + 4
+    for name in ['exc', 'inh', 'out']:
+        assert source.count('<i>' + name + '</i>') == 1
+
+
+def test_compact(network, tmp_path, no_graphviz):
+    source, nodes, edges = _graph(network, 'compact', str(tmp_path))
+    assert set(nodes.values()) == set(edges.values()) == {1}
+    pre, post = _subgroups(network)
+    assert set(nodes) == {'"G (0, 10)"', '"H (0, 4)"', pre, post}
+    assert len(edges) == 3
+    # the Subgroups are in the cluster of their group, and the attached objects are counted in their labels
+    cluster = source[source.index('subgraph "cluster_G (0, 10)"'):]
+    cluster = cluster[:cluster.index('}')]
+    assert pre in cluster and post in cluster and '"H (0, 4)"' not in cluster
+    assert 'G (0, 10)\\n1 CodeRunner, 1 PoissonInput, 1 StateMonitor' in source
+    assert pre.strip('"') + '\\n1 SpikeMonitor' in source
+
+
+def test_summary(network, tmp_path, no_graphviz):
+    source, nodes, edges = _graph(network, 'summary', str(tmp_path))
+    assert nodes == Counter({'"G (0, 10)"': 1, '"H (0, 4)"': 1})
+    assert edges == Counter({('"G (0, 10)"', '"G (0, 10)"', ' [label="2 Synapses"'): 1,
+                             ('"G (0, 10)"', '"H (0, 4)"', ' [label="1 Synapses"'): 1})
+    assert 'cluster' not in source
+    assert 'G (0, 10)\\n1 CodeRunner, 1 PoissonInput, 1 SpikeMonitor, 1 StateMonitor' in source
+
+
+def test_size_of_the_graph_in_root(network, tmp_path, no_graphviz):
+    os.makedirs(str(tmp_path / 'tmp'))
+    with Profile() as profile:
+        path = generate_network_graph(network, 'net', root=str(tmp_path))
+    assert profile.events[-1]['output_bytes'] == os.path.getsize(os.path.join(str(tmp_path), path.strip('{}')))
@@ -0,0 +1,45 @@
+from brian2 import start_scope, NeuronGroup, Synapses, StateMonitor, SpikeMonitor, Network
+
+from brian2docs.index import index_network, group_log
+
+
+def _network():
+    start_scope()
+    first = NeuronGroup(10, 'v : 1', threshold='v > 1', name='neurongroup')
+    second = NeuronGroup(5, 'v : 1', name='neurongroup_1')
+    S = Synapses(first, second, 'w : 1', name='synapses')
+    S.connect()
+    return Network(first, second, S, StateMonitor(first[2:4], 'v', record=True, name='statemonitor'),
+                   SpikeMonitor(first, name='spikemonitor'))
+
+
+LOG = {'neurongroup': ['v = 1'],
+       'neurongroup_1': ['v = 2'],
+       'neurongroup_subgroup': ['v = 3'],
+       'neurongroup_subgroup_1': ['v = 4'],
+       'synapses': ['w = 1']}
+
+
+def test_index_network():
+    net = _network()
+    index = index_network(net, LOG)
+    assert [record.name for record in index.objects] == [obj.name for obj in net.objects]
+    assert sorted(index.by_kind) == ['NeuronGroup', 'SpikeMonitor', 'StateMonitor', 'Synapses']
+    assert sorted(record.name for record in index.by_kind['NeuronGroup']) == ['neurongroup', 'neurongroup_1']
+    assert index.by_name['synapses'].kind == 'Synapses'
+    assert index.parents == {'neurongroup_subgroup': 'neurongroup'}
+    assert index_network(index) is index
+
+
+def test_log_of_a_group():
+    index = index_network(_network(), LOG)
+    # the statements of neurongroup_1 are not those of neurongroup, subgroups belong to their parent
+    expected = {'neurongroup': [('neurongroup', ['v = 1']), ('neurongroup_subgroup', ['v = 3']),
+                                ('neurongroup_subgroup_1', ['v = 4'])],
+                'neurongroup_1': [('neurongroup_1', ['v = 2'])],
+                'synapses': [('synapses', ['w = 1'])],
+                'spikemonitor': []}
+    for name, entries in expected.items():
+        assert group_log(index, name) == entries
+        assert group_log(LOG, name) == entries
+    assert group_log(None, 'neurongroup') == []
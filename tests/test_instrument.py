@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import brian2docs.instrument as instrument
+from brian2docs.instrument import instrumented, add_tracer, remove_tracer, file_size, Profile
+
+
+class _Group(object):
+    name = 'neurongroup'
+
+
+@instrumented('fragment')
+def _fragment(group, n=3):
+    return 'x' * n
+
+
+@instrumented('document', size=lambda path, arguments: file_size(path), obj=False)
+def _document(path, text='abc', fail=False):
+    with open(path, 'w') as f:
+        f.write(_fragment(_Group(), len(text)))
+    if fail:
+        raise ValueError('no document')
+    return path
+
+
+def test_tracer_receives_the_events(tmp_path):
+    events = []
+    add_tracer(events.append)
+    try:
+        _document(str(tmp_path / 'doc.tex'), text='abcd')
+        with pytest.raises(ValueError):
+            _document(str(tmp_path / 'failed.tex'), fail=True)
+    finally:
+        remove_tracer(events.append)
+    _document(str(tmp_path / 'untraced.tex'))
+
+    assert [event['stage'] for event in events] == ['fragment', 'document', 'fragment', 'document']
+    fragment, document = events[:2]
+    assert fragment['object'] == 'neurongroup' and fragment['parent'] == 'document' and fragment['depth'] == 1
+    assert fragment['output_bytes'] == 4
+    assert document['object'] is None and document['parent'] is None and document['depth'] == 0
+    # the size callback gets the arguments by name, whether they were given by position or not
+    assert document['output_bytes'] == 4 and document['error'] is None
+    assert document['wall_seconds'] >= fragment['wall_seconds'] >= 0
+    assert events[3]['error'] == repr(ValueError('no document')) and events[3]['output_bytes'] is None
+
+
+def test_no_tracer_calls_the_function_directly(monkeypatch):
+    assert not instrument._tracers
+    monkeypatch.setattr(instrument.time, 'perf_counter', None)
+    monkeypatch.setattr(instrument, 'max_rss', None)
+    assert _fragment(_Group(), n=2) == 'xx'
+    assert not instrument._stack
+
+
+def test_profile_reports(tmp_path):
+    with Profile() as profile:
+        _document(str(tmp_path / 'doc.tex'))
+        _document(str(tmp_path / 'doc.tex'), 'abcdef')
+    assert not instrument._tracers
+
+    stages = profile.stages()
+    assert list(stages) == ['fragment', 'document']
+    assert stages['fragment']['calls'] == stages['document']['calls'] == 2
+    assert stages['document']['output_bytes'] == 9
+    assert stages['document']['wall_seconds'] == sum(event['wall_seconds'] for event in profile.events
+                                                     if event['stage'] == 'document')
+    assert [event['stage'] for event in profile.objects()] == ['fragment', 'fragment']
+
+    path = str(tmp_path / 'profile.json')
+    profile.write_json(path)
+    with open(path) as f:
+        report = json.load(f)
+    assert report['stages']['document']['calls'] == 2 and len(report['events']) == 4
+
+    summary = profile.summary()
+    latex = profile.latex()
+    for stage in ['fragment', 'document']:
+        total = stages[stage]
+        assert stage in summary and '%.3f' % total['wall_seconds'] in summary
+        assert stage in latex and '%.3f' % total['wall_seconds'] in latex
+    assert 'neurongroup' in latex and '\\section{Documentation Profile}' in latex
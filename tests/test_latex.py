@@ -0,0 +1,26 @@
+import sympy
+from brian2 import Equations
+
+from brian2docs.brian2docs import latex_equations, configure_latex_memo
+
+
+def test_memo_follows_the_order_of_the_equations():
+    configure_latex_memo()
+    first = Equations('''dv/dt = -v/tau : 1
+                         tau : second''')
+    second = Equations('''tau : second
+                          dv/dt = -v/tau : 1''')
+    assert str(first) == str(second)
+    assert sympy.latex(first) != sympy.latex(second)
+    assert latex_equations(first) == sympy.latex(first)
+    assert latex_equations(second) == sympy.latex(second)
+    # taken from the memo
+    assert latex_equations(Equations('dv/dt = -v/tau : 1\ntau : second')) == sympy.latex(first)
+
+
+def test_memo_tells_flags_apart():
+    configure_latex_memo()
+    plain = Equations('w : 1')
+    constant = Equations('w : 1 (constant)')
+    assert latex_equations(plain) == sympy.latex(plain)
+    assert latex_equations(constant) == sympy.latex(constant)
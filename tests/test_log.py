@@ -0,0 +1,96 @@
+import re
+import shutil
+import logging
+from collections import defaultdict
+
+import pytest
+from brian2 import (BrianLogger, start_scope, NeuronGroup, Synapses, StateMonitor, Network, Equations, ms)
+from brian2.utils.logger import DIAGNOSTIC
+
+from brian2docs.brian2docs import generate_log_dict, SIMULATION_STARTED
+
+
+def regex_log_dict(text):
+    '''
+    the parser generate_log_dict replaced, reading the whole log with one regular expression
+    '''
+    ll = re.findall('Creating code object \\(group=.*\n[ ]*Key condition:\n[ ]*_cond = True\n[ ]*Key statement:\n[ ]*.*',
+                    text)
+    d = defaultdict(list)
+    for x in ll:
+        k = re.search('group=.*,', x).group(0).strip('group=').rstrip(',')
+        v = re.search('Key statement:\n[ ]*.*', x).group(0).strip('Key statement:').strip()
+        d[k].append(v)
+    return d
+
+
+@pytest.fixture(scope='module')
+def diagnostic_log(tmp_path_factory):
+    '''
+    text of the brian2 log of a network whose variables are set with statements, at the diagnostic level
+    '''
+    logger = logging.getLogger('brian2')
+    levels = logger.level, BrianLogger.file_handler.level
+    logger.setLevel(DIAGNOSTIC)
+    BrianLogger.file_handler.setLevel(DIAGNOSTIC)
+    try:
+        start_scope()
+        G = NeuronGroup(10, Equations('dv/dt = -v/(10*ms) : volt\nx : 1'), threshold='v > 1*mV', reset='v = 0*mV',
+                        method='exact', name='neurongroup')
+        G.v = 'rand()*mV'
+        G.x = 'i*2'
+        G[2:5].v = '2*mV'
+        S = Synapses(G, G, 'w : 1', on_pre='v += w*mV', name='synapses')
+        S.connect(p=0.5)
+        S.w = 'rand()'
+        net = Network(G, S, StateMonitor(G, 'v', record=0))
+        net.run(1 * ms)
+        BrianLogger.file_handler.flush()
+        path = str(tmp_path_factory.mktemp('log') / 'brian_debug.log')
+        shutil.copyfile(BrianLogger.tmp_log, path)
+    finally:
+        logger.setLevel(levels[0])
+        BrianLogger.file_handler.setLevel(levels[1])
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def _parse(tmp_path, text, stop_at=None):
+    path = tmp_path / 'log'
+    path.write_text(text)
+    return generate_log_dict(str(path), stop_at)
+
+
+def test_same_as_regex_parser(diagnostic_log, tmp_path):
+    expected = regex_log_dict(diagnostic_log)
+    assert expected['neurongroup'] and expected['synapses']
+    assert _parse(tmp_path, diagnostic_log) == expected
+
+
+def test_block_cut_off_at_the_end(diagnostic_log, tmp_path):
+    lines = diagnostic_log.splitlines(True)
+    cut = max(n for n, line in enumerate(lines) if 'Key statement:' in line)
+    for text in [''.join(lines[:cut + 1]), ''.join(lines[:cut + 1]).rstrip('\n'), ''.join(lines[:cut])]:
+        assert _parse(tmp_path, text) == regex_log_dict(text)
+
+
+def test_empty_statement(tmp_path):
+    text = ('2020-01-01 DIAGNOSTIC brian2.codegen.codeobject: Creating code object (group=neurongroup, '
+            'template name=group_variable_set_conditional) for abstract code:\n'
+            '    Key condition:\n'
+            '        _cond = True\n'
+            '    Key statement:\n'
+            '\n'
+            '2020-01-01 DIAGNOSTIC brian2.codegen.codeobject: Creating code object (group=neurongroup, '
+            'template name=group_variable_set_conditional) for abstract code:\n'
+            '    Key condition:\n'
+            '        _cond = True\n'
+            '    Key statement:\n'
+            '        v = 0*mV\n')
+    assert _parse(tmp_path, text) == regex_log_dict(text) == {'neurongroup': ['', 'v = 0*mV']}
+
+
+def test_stop_at(diagnostic_log, tmp_path):
+    assert SIMULATION_STARTED in diagnostic_log
+    before_run = diagnostic_log[:diagnostic_log.rfind('\n', 0, diagnostic_log.find(SIMULATION_STARTED)) + 1]
+    assert _parse(tmp_path, diagnostic_log, SIMULATION_STARTED) == regex_log_dict(before_run)
@@ -0,0 +1,28 @@
+import numpy as np
+from brian2 import Soma, Cylinder, Section, um, meter
+
+from brian2docs.morphology import flatten_morphology, section_table, total_length
+from brian2docs.snapshot import describe_morphology
+
+
+def _morphology():
+    soma = Soma(30 * um)
+    soma.axon = Cylinder(1 * um, n=10, length=100 * um)
+    soma.dend = Section(n=3, diameter=[4, 3, 2, 1] * um, length=[10, 20, 30] * um)
+    soma.dend.L = Cylinder(0.5 * um, n=2, length=15 * um)
+    return soma
+
+
+def test_section_table_matches_brian2():
+    morpho = _morphology()
+    flat = flatten_morphology(describe_morphology(morpho))
+    table = section_table(flat)
+    sections = {'root': morpho, 'axon': morpho.axon, 'dend': morpho.dend, 'dend.L': morpho.dend.L}
+    assert sorted(flat['name']) == sorted(sections)
+    for i, name in enumerate(flat['name']):
+        np.testing.assert_allclose(table['area'][i], np.sum(sections[name].area / meter ** 2))
+
+
+def test_total_length_leaves_out_the_soma():
+    flat = flatten_morphology(describe_morphology(_morphology()))
+    np.testing.assert_allclose(total_length(flat, section_table(flat)), 175e-6)
@@ -0,0 +1,45 @@
+from xml.etree import ElementTree
+
+from brian2 import ms
+
+from brian2docs.brian2docs import generate_object_latex, generate_constant_list
+from brian2docs.preview import create_NN_preview, generate_object_html, generate_constant_html
+
+
+def test_preview_is_self_contained(monitored_network, tmp_path, monkeypatch, no_graphviz):
+    monkeypatch.chdir(tmp_path)
+    path = create_NN_preview(monitored_network, 'net', {'tau_m': 10 * ms, 'v_th': '1*mV + 2*mV', 'n': 3})
+    with open(path) as f:
+        html = f.read()
+    assert '<script' not in html and 'http' not in html.split('<body>')[0]
+    assert html.count('<math display="block">') == 4
+
+
+def test_equations_are_mathml(monitored_network):
+    group = [obj for obj in monitored_network.objects if type(obj).__name__ == 'NeuronGroup'][0]
+    html = generate_object_html(group, None)
+    math = html[html.index('<math'):html.index('</math>') + len('</math>')]
+    table = ElementTree.fromstring(math.replace('&InvisibleTimes;', '&#8290;'))
+    rows = table.findall('./mtable/mtr')
+    # in the order of the latex, i.e. as the equations were defined
+    assert len(rows) == len(group.equations)
+    assert [''.join(row.find('mtd').itertext()) for row in rows[:2]] == ['dvdt', 'dwdt']
+
+
+def test_latex_and_html_share_the_figures(monitored_network):
+    for obj in monitored_network.objects:
+        latex_jobs, html_jobs = [], []
+        if generate_object_latex(obj, None, latex_jobs, {'state_layout': 'separate'}) is None:
+            continue
+        generate_object_html(obj, None, html_jobs, {'state_layout': 'separate'})
+        assert [job['path'][:-4] for job in latex_jobs] == [job['path'][:-4] for job in html_jobs]
+
+
+def test_constants():
+    constants = {'tau_m': 10 * ms, 'v_th': '1*mV + 2*mV', 'n_neurons_x': 3}
+    assert len(generate_constant_html(constants)) == len(generate_constant_list(constants)) == 3
+    html = generate_constant_html(constants)
+    assert '<msub><mi>tau</mi><mi>m</mi></msub>' in html[0]
+    assert '<mtext>10. ms</mtext>' in html[0]
+    assert '<mo>+</mo>' not in html[1] and '<mi>mV</mi>' in html[1]
+    assert '<mtext>n_neurons_x</mtext>' in html[2]
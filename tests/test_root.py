@@ -0,0 +1,52 @@
+import os
+
+import brian2docs.texbuild as texbuild
+from brian2docs.brian2docs import create_NN_pdf
+from brian2docs.preview import create_NN_preview
+
+
+def _no_chdir(path):
+    raise AssertionError('the current directory was changed to ' + path)
+
+
+class _Latex(object):
+    # records the runs of latex instead of starting it
+    runs = []
+
+    def __init__(self, command, env=None, cwd=None):
+        _Latex.runs.append((command, cwd))
+
+    def wait(self):
+        return 0
+
+
+def test_pdf_in_root(monitored_network, tmp_path, monkeypatch, no_graphviz):
+    monkeypatch.setattr(texbuild.subprocess, 'Popen', _Latex)
+    monkeypatch.chdir(tmp_path)
+    os.mkdir('cwd')
+    os.chdir('cwd')
+    monkeypatch.setattr(os, 'chdir', _no_chdir)
+    root = str(tmp_path / 'doc')
+    result = create_NN_pdf(monitored_network, 'net', root=root, profile=True)
+
+    assert os.getcwd() == str(tmp_path / 'cwd') and os.listdir('.') == []
+    command, cwd = _Latex.runs[-1]
+    assert cwd == root and command[-1] == 'tmp/net.tex'
+    assert result['log'] == os.path.join(root, 'pdf/net.log')
+    assert os.path.exists(result['profile']) and result['profile'].startswith(root)
+    with open(os.path.join(root, 'tmp', 'net.tex')) as f:
+        tex = f.read()
+    figures = [name for name in os.listdir(os.path.join(root, 'tmp')) if name.endswith('.pdf')]
+    assert figures and all('{tmp/' + name + '}' in tex for name in figures)
+
+
+def test_preview_in_root(monitored_network, tmp_path, monkeypatch, no_graphviz):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(os, 'chdir', _no_chdir)
+    root = str(tmp_path / 'doc')
+    path = create_NN_preview(monitored_network, 'net', root=root)
+
+    assert path == os.path.join(root, 'preview/net.html')
+    assert os.getcwd() == str(tmp_path) and sorted(os.listdir('.')) == ['doc']
+    with open(path) as f:
+        assert '<!--figure:' not in f.read()
@@ -0,0 +1,68 @@
+import pickle
+import tracemalloc
+
+import numpy as np
+from brian2 import start_scope, NeuronGroup, Synapses
+
+from brian2docs.snapshot import describe_object, IndexView
+from brian2docs.figures import aggregate_connectivity, synapse_job, render_figures
+
+
+def _synapses(n_source=2000, n_target=1000, p=1.0):
+    start_scope()
+    G = NeuronGroup(n_source + n_target, 'v : 1')
+    S = Synapses(G[:n_source], G[n_source:], 'w : 1')
+    S.connect(p=p)
+    return S, G
+
+
+def test_synapse_indices_are_not_copied():
+    S, G = _synapses(20, 10, 0.5)
+    record = describe_object(S)
+    assert isinstance(record.i, IndexView)
+    assert np.shares_memory(record.i.values, S.variables['_synaptic_pre'].get_value())
+    np.testing.assert_array_equal(np.asarray(record.i), S.i[:])
+    np.testing.assert_array_equal(np.asarray(record.j), S.j[:])
+    np.testing.assert_array_equal(record.j[3:7], S.j[3:7])
+    # a pickled record holds the indices themselves
+    copy = pickle.loads(pickle.dumps(record))
+    np.testing.assert_array_equal(copy.i, S.i[:])
+    assert repr(record.i) == repr(describe_object(S).i)
+
+
+def test_aggregated_view_reads_chunks(tmp_path):
+    S, G = _synapses()
+    expected = aggregate_connectivity(S.i[:], S.j[:], 2000, 1000, 50, 10000)
+    tracemalloc.start()
+    try:
+        record = describe_object(S)
+        job = synapse_job(record, str(tmp_path / 'synapses.png'),
+                          {'synapse_aggregate_threshold': 1000, 'synapse_blocks': 50, 'synapse_chunk': 10000})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # the indices of the two million synapses take 8 MB each, only chunks of them are read
+    assert peak < record.i.values.nbytes / 8
+    for result, reference in zip((job['density'], job['out_degrees'], job['in_degrees']), expected):
+        np.testing.assert_array_equal(result, reference)
+    render_figures([job])
+
+
+def test_connections_of_small_synapses(tmp_path):
+    S, G = _synapses(20, 10, 0.5)
+    job = synapse_job(describe_object(S), str(tmp_path / 'synapses.png'))
+    render_figures([job], workers=2)
+    render_figures([job])
+
+
+def test_recordings_are_not_copied(monitored_network):
+    state, spikes = [describe_object(obj) for obj in monitored_network.objects
+                     if type(obj).__name__ in ('StateMonitor', 'SpikeMonitor')]
+    if state.kind != 'StateMonitor':
+        state, spikes = spikes, state
+    live = [obj for obj in monitored_network.objects if obj.name == state.name][0]
+    for var in ('v', 'w'):
+        assert np.shares_memory(state.values[var], live.variables[var].get_value())
+        np.testing.assert_array_equal(np.asarray(state.values[var]), np.asarray(getattr(live, var).T))
+    assert np.shares_memory(state.t, live.variables['t'].get_value())
+    assert len(spikes.i) == len(spikes.t) > 0
@@ -0,0 +1,102 @@
+import os
+import re
+
+import pytest
+
+import brian2docs.texbuild as texbuild
+from brian2docs.texbuild import build_format, run_latex
+from brian2docs.brian2docs import generate_tex_file
+
+
+class _Latex(object):
+    '''
+    records the runs of latex instead of starting it. The first `reruns` runs write a log asking for
+    a rerun, every run exits with `status`, and a format is only written if `fmt` is set.
+    '''
+    runs = []
+    reruns = 0
+    status = 0
+    fmt = True
+
+    def __init__(self, command, env=None, cwd=None, stdout=None):
+        _Latex.runs.append(command)
+        self.returncode = _Latex.status
+        options = dict(arg[1:].split('=', 1) for arg in command if arg.startswith('-') and '=' in arg)
+        if '-ini' in command:
+            if _Latex.fmt:
+                with open(os.path.join(options['output-directory'], options['jobname'] + '.fmt'), 'w') as f:
+                    f.write('format')
+            return
+        with open(os.path.join(cwd or '', options['job-name'] + '.log'), 'w') as f:
+            f.write('LaTeX Warning: Label(s) may have changed. Rerun to get cross-references right.\n'
+                    if len(_Latex.runs) <= _Latex.reruns else 'Output written\n')
+
+    def wait(self):
+        return self.returncode
+
+
+@pytest.fixture
+def latex(monkeypatch):
+    monkeypatch.setattr(texbuild.subprocess, 'Popen', _Latex)
+    _Latex.runs, _Latex.reruns, _Latex.status, _Latex.fmt = [], 0, 0, True
+    return _Latex
+
+
+def test_rerun_while_the_log_asks_for_it(latex, tmp_path):
+    latex.reruns = 1
+    result = run_latex('net.tex', 'net', cwd=str(tmp_path))
+    assert result['runs'] == 2 and result['returncode'] == 0
+    assert result['log'] == os.path.join(str(tmp_path), 'net.log')
+
+    latex.runs, latex.reruns = [], 5
+    assert run_latex('net.tex', 'net', max_runs=3, cwd=str(tmp_path))['runs'] == 3
+
+    # no rerun after a failed run
+    latex.runs, latex.status = [], 1
+    result = run_latex('net.tex', 'net', cwd=str(tmp_path))
+    assert result['runs'] == 1 and result['returncode'] == 1
+
+
+def test_build_format(latex, tmp_path):
+    directory = str(tmp_path / 'tmp')
+    # the directory is created
+    fmt = build_format('\\documentclass{article}\n', directory)
+    assert fmt is not None and os.path.exists(os.path.join(directory, fmt + '.fmt'))
+    assert len(latex.runs) == 1
+
+    # the format of the same preamble is reused
+    assert build_format('\\documentclass{article}\n', directory) == fmt
+    assert len(latex.runs) == 1
+
+    # the documents are compiled without a format if latex cannot build it
+    latex.fmt = False
+    with pytest.warns(UserWarning, match='see .*%s' % re.escape('.log')):
+        assert build_format('\\documentclass{report}\n', directory) is None
+    assert len(latex.runs) == 2
+
+
+def _included(tex):
+    return re.findall(r'\\include\{(.*)\}', tex), re.findall(r'\\includeonly\{(.*)\}', tex)
+
+
+def test_chapters_include_only_the_changed_parts(monitored_network, tmp_path, no_graphviz):
+    root = str(tmp_path)
+    tex_path = str(tmp_path / 'net.tex')
+    generate_tex_file(monitored_network, tex_path, None, None, 'net', chapters=True, partial=True, root=root)
+    with open(tex_path) as f:
+        parts, include_only = _included(f.read())
+    assert parts == ['tmp/net_parts/' + obj.name for obj in monitored_network.objects
+                     if os.path.exists(os.path.join(root, 'tmp/net_parts/' + obj.name + '.tex'))]
+    assert len(parts) >= 3 and include_only == [','.join(parts)]
+
+    # a part that is edited is the only one typeset again
+    with open(os.path.join(root, parts[1] + '.tex'), 'w') as f:
+        f.write('edited')
+    generate_tex_file(monitored_network, tex_path, None, None, 'net', chapters=True, partial=True, root=root)
+    with open(tex_path) as f:
+        assert _included(f.read()) == (parts, [parts[1]])
+
+    # nothing changed: the whole document is typeset
+    generate_tex_file(monitored_network, tex_path, None, None, 'net', chapters=True, partial=True, root=root)
+    with open(tex_path) as f:
+        assert _included(f.read()) == (parts, [])